@@ -1,19 +1,357 @@
 import sqlite3
 import os
-from typing import Any
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from config.migrations import MigrationRunner
+
+# Profil PRAGMA yang bisa dipilih lewat AppSettings ('db_pragma_profile').
+# journal_mode bersifat persisten di file database, sisanya diterapkan
+# pada setiap koneksi baru.
+PRAGMA_PROFILES = {
+    'default': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,       # ~16 MB
+        'mmap_size': 67108864,      # 64 MB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,       # ms
+        'wal_autocheckpoint': 1000  # halaman
+    },
+    'safe': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -8000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 10000,
+        'wal_autocheckpoint': 1000
+    },
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,       # ~64 MB
+        'mmap_size': 268435456,     # 256 MB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+        'wal_autocheckpoint': 4000
+    },
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 5000,
+        'wal_autocheckpoint': 1000
+    }
+}
+
+# Setiap N commit lewat pool, jalankan checkpoint PASSIVE (tidak memblokir pembaca)
+CHECKPOINT_EVERY_COMMITS = 200
+
+class ConnectionPool:
+    """Pool koneksi SQLite yang dipakai ulang antar pemanggilan model"""
+    
+    def __init__(self, db_path: str, max_size: int = 5, timeout: float = 30.0,
+                 health_check_interval: float = 60.0,
+                 on_connect: Optional[Callable[[sqlite3.Connection], None]] = None):
+        self.db_path = db_path
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.on_connect = on_connect
+        
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._created = 0
+        self._last_used = {}
+        self._stats = {
+            'opened': 0,
+            'reused': 0,
+            'closed': 0,
+            'health_check_failures': 0,
+            'waits': 0,
+            'wait_time': 0.0
+        }
+    
+    def _open(self) -> sqlite3.Connection:
+        # check_same_thread=False karena koneksi berpindah thread lewat pool,
+        # tetapi tiap koneksi hanya dipegang oleh satu thread pada satu waktu
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        if self.on_connect:
+            self.on_connect(conn)
+        with self._lock:
+            self._stats['opened'] += 1
+        return conn
+    
+    def _discard(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+            self._stats['closed'] += 1
+        self._last_used.pop(id(conn), None)
+    
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """Cek koneksi yang lama menganggur sebelum dipakai ulang"""
+        last_used = self._last_used.get(id(conn), 0)
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            with self._lock:
+                self._stats['health_check_failures'] += 1
+            return False
+    
+    def acquire(self) -> sqlite3.Connection:
+        """Ambil koneksi dari pool (koneksi thread yang sedang aktif dipakai ulang)"""
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            with self._lock:
+                self._stats['reused'] += 1
+            return held
+        
+        conn = None
+        while conn is None:
+            try:
+                conn = self._idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                with self._lock:
+                    can_open = self._created < self.max_size
+                    if can_open:
+                        self._created += 1
+                if can_open:
+                    try:
+                        conn = self._open()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                    reused = False
+                else:
+                    start = time.perf_counter()
+                    try:
+                        conn = self._idle.get(timeout=self.timeout)
+                    except queue.Empty:
+                        raise TimeoutError("Tidak ada koneksi database yang tersedia di pool")
+                    finally:
+                        with self._lock:
+                            self._stats['waits'] += 1
+                            self._stats['wait_time'] += time.perf_counter() - start
+                    reused = True
+            
+            if reused:
+                if self._is_healthy(conn):
+                    with self._lock:
+                        self._stats['reused'] += 1
+                else:
+                    self._discard(conn)
+                    conn = None
+        
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+    
+    def release(self, conn: sqlite3.Connection):
+        """Kembalikan koneksi ke pool"""
+        if getattr(self._local, 'conn', None) is not conn:
+            raise ValueError("Koneksi tidak dipegang oleh thread ini")
+        
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        
+        self._local.conn = None
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        
+        self._last_used[id(conn)] = time.monotonic()
+        self._idle.put(conn)
+    
+    def close_all(self):
+        """Tutup semua koneksi yang sedang menganggur"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Dapatkan statistik pemakaian pool"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self._created
+        stats['idle'] = self._idle.qsize()
+        stats['in_use'] = stats['size'] - stats['idle']
+        stats['max_size'] = self.max_size
+        return stats
+
 
 class DatabaseManager:
-    def __init__(self, db_path: str = "tax_manager.db"):
+    def __init__(self, db_path: str = "tax_manager.db", pool_size: Optional[int] = None,
+                 pragma_profile: Optional[str] = None, fetch_batch_size: Optional[int] = None):
+        if pool_size is None or pragma_profile is None or fetch_batch_size is None:
+            from config.settings import AppSettings
+            settings = AppSettings()
+            if pool_size is None:
+                pool_size = settings.get('db_pool_size', 5)
+            if pragma_profile is None:
+                pragma_profile = settings.get('db_pragma_profile', 'default')
+            if fetch_batch_size is None:
+                fetch_batch_size = settings.get('db_fetch_batch_size', 500)
+        
+        if pragma_profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Profil PRAGMA tidak dikenal: {pragma_profile}")
+        
         self.db_path = db_path
+        self.pragma_profile = pragma_profile
+        self.pragmas = PRAGMA_PROFILES[pragma_profile]
+        self.fetch_batch_size = fetch_batch_size
+        self._commit_count = 0
+        self._commit_lock = threading.Lock()
+        self._tx = threading.local()
+        self.pool = ConnectionPool(
+            db_path,
+            max_size=pool_size,
+            timeout=self.pragmas['busy_timeout'] / 1000,
+            on_connect=self.apply_pragmas
+        )
         self.init_database()
     
+    def apply_pragmas(self, conn: sqlite3.Connection):
+        """Terapkan PRAGMA per-koneksi sesuai profil aktif"""
+        for name in ('synchronous', 'cache_size', 'mmap_size', 'temp_store',
+                     'busy_timeout', 'wal_autocheckpoint'):
+            conn.execute(f"PRAGMA {name}={self.pragmas[name]}")
+    
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        """Buka koneksi baru di luar pool (untuk pekerjaan administratif)"""
+        conn = sqlite3.connect(self.db_path, timeout=self.pragmas['busy_timeout'] / 1000)
+        self.apply_pragmas(conn)
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """
+        Pinjam koneksi dari pool. Perubahan di-commit saat blok selesai
+        tanpa error dan di-rollback jika terjadi error.
+        """
+        conn = self.pool.acquire()
+        try:
+            yield conn
+            # Di dalam transaction(), commit diserahkan ke blok terluar
+            if conn.in_transaction and not self._transaction_depth():
+                conn.commit()
+                self._after_commit(conn)
+        except BaseException:
+            if conn.in_transaction and not self._transaction_depth():
+                conn.rollback()
+            raise
+        finally:
+            self.pool.release(conn)
+    
+    def iter_query(self, sql: str, params: tuple = (), batch_size: Optional[int] = None) -> Iterator[tuple]:
+        """Iterasi hasil query per batch (fetchmany) agar memori tetap datar"""
+        batch_size = batch_size or self.fetch_batch_size
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+    
+    def _transaction_depth(self) -> int:
+        return getattr(self._tx, 'depth', 0)
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Jalankan beberapa operasi dalam satu transaksi tulis (BEGIN IMMEDIATE).
+        Pemanggilan model di dalam blok ini memakai koneksi yang sama dan
+        baru di-commit saat blok terluar selesai.
+        """
+        with self.connection() as conn:
+            depth = self._transaction_depth()
+            if depth == 0 and not conn.in_transaction:
+                conn.execute('BEGIN IMMEDIATE')
+            self._tx.depth = depth + 1
+            try:
+                yield conn
+            finally:
+                self._tx.depth = depth
+    
+    def _after_commit(self, conn: sqlite3.Connection):
+        """Checkpoint WAL berkala agar file -wal tidak terus membesar"""
+        if self.pragmas['journal_mode'] != 'WAL':
+            return
+        with self._commit_lock:
+            self._commit_count += 1
+            due = self._commit_count % CHECKPOINT_EVERY_COMMITS == 0
+        if due:
+            try:
+                conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+            except sqlite3.Error:
+                pass
+    
+    def checkpoint(self, mode: str = 'PASSIVE') -> Dict[str, int]:
+        """
+        Jalankan checkpoint WAL. PASSIVE tidak pernah menunggu pembaca/penulis,
+        TRUNCATE mengosongkan file -wal (dipakai sebelum backup/penutupan).
+        """
+        mode = mode.upper()
+        if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            raise ValueError(f"Mode checkpoint tidak dikenal: {mode}")
+        with self.connection() as conn:
+            busy, log_frames, checkpointed = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+        return {
+            'busy': busy,
+            'log_frames': log_frames,
+            'checkpointed_frames': checkpointed
+        }
+    
+    def explain_query_plan(self, sql: str, params: tuple = ()) -> List[str]:
+        """Dapatkan detail EXPLAIN QUERY PLAN untuk sebuah query"""
+        with self.connection() as conn:
+            rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+        return [row[3] for row in rows]
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Dapatkan statistik pool koneksi"""
+        return self.pool.get_stats()
+    
+    def close_all(self):
+        """Tutup semua koneksi di pool (misalnya sebelum restore backup)"""
+        if self.pragmas['journal_mode'] == 'WAL':
+            try:
+                self.checkpoint('TRUNCATE')
+            except sqlite3.Error:
+                pass
+        self.pool.close_all()
     
     def init_database(self):
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        # Mode jurnal (WAL: pembaca tidak terblokir oleh penulis)
+        cursor.execute(f"PRAGMA journal_mode={self.pragmas['journal_mode']}")
+        
         # Tabel pegawai
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS employees (
@@ -58,6 +396,9 @@ class DatabaseManager:
         ''')
         
         conn.commit()
+        
+        # Terapkan migrasi skema/data yang tertunda (lihat config/migrations.py)
+        MigrationRunner(conn).run()
         conn.close()
 
 # Inisialisasi database
@@ -0,0 +1,327 @@
+import sqlite3
+import time
+from typing import Callable, Dict, List, Optional, Any
+
+class Backfill:
+    """
+    Migrasi data yang dijalankan per batch berdasarkan rentang id,
+    sehingga kunci tulis hanya dipegang sebentar untuk setiap batch.
+    """
+    
+    def __init__(self, table: str, sql: str, batch_size: int = 5000):
+        # sql harus memiliki dua parameter: batas bawah (eksklusif) dan atas (inklusif) id
+        self.table = table
+        self.sql = sql
+        self.batch_size = batch_size
+
+
+class Migration:
+    """Satu langkah skema berversi (dicatat di PRAGMA user_version)"""
+    
+    def __init__(self, version: int, description: str, statements: List[str] = None,
+                 backfills: List[Backfill] = None,
+                 apply: Optional[Callable[[sqlite3.Connection], None]] = None):
+        self.version = version
+        self.description = description
+        self.statements = statements or []
+        self.backfills = backfills or []
+        self.apply = apply
+
+
+def _data_version_triggers(table: str, scope: str) -> List[str]:
+    """
+    Trigger insert/update/delete yang menaikkan data_versions untuk setiap
+    baris `table` yang berubah. `scope` adalah ekspresi SQL dengan {row}
+    (NEW/OLD) yang menghasilkan tahun data (YYYY) atau '*' (semua tahun).
+    """
+    def bump(row: str) -> str:
+        return f'''
+            INSERT INTO data_versions (scope, version) VALUES ({scope.format(row=row)}, 1)
+            ON CONFLICT (scope) DO UPDATE SET version = version + 1;'''
+    
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_version_{table}_insert AFTER INSERT ON {table}\n"
+        f"        BEGIN{bump('NEW')}\n        END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_version_{table}_delete AFTER DELETE ON {table}\n"
+        f"        BEGIN{bump('OLD')}\n        END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_version_{table}_update AFTER UPDATE ON {table}\n"
+        f"        BEGIN{bump('OLD')}{bump('NEW')}\n        END"
+    ]
+
+# Daftar migrasi berurutan. Jangan ubah migrasi yang sudah dirilis,
+# tambahkan versi baru di akhir daftar.
+MIGRATIONS = [
+    Migration(1, "Indeks sekunder untuk transaksi, catatan pajak dan pegawai", [
+        # Transaction.get_all: ORDER BY transaction_date DESC, id DESC
+        "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (transaction_date)",
+        # Filter jenis transaksi + rentang tanggal
+        "CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON transactions (type, transaction_date)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_invoice ON transactions (invoice_number)",
+        # TaxRecord.get_by_employee: WHERE employee_id=? ORDER BY period DESC
+        "CREATE INDEX IF NOT EXISTS idx_tax_records_employee_period ON tax_records (employee_id, period)",
+        # TaxRecord.get_by_period: WHERE period=? [AND tax_type=?]
+        "CREATE INDEX IF NOT EXISTS idx_tax_records_period_type ON tax_records (period, tax_type)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_npwp ON employees (npwp)"
+    ]),
+    Migration(2, "Profil pajak pegawai: status PTKP, tanggungan dan metode PPh 21", [
+        "ALTER TABLE employees ADD COLUMN marital_status TEXT NOT NULL DEFAULT 'TK'",  # TK/K/K/I
+        "ALTER TABLE employees ADD COLUMN dependants INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE employees ADD COLUMN pph21_method TEXT NOT NULL DEFAULT 'progressive'"  # progressive/ter
+    ]),
+    Migration(3, "Kolom nilai uang dalam sen (INTEGER) untuk transaksi dan catatan pajak", [
+        # Kolom REAL lama tetap diisi untuk kompatibilitas, kolom sen menjadi acuan perhitungan
+        "ALTER TABLE transactions ADD COLUMN amount_cents INTEGER",
+        "ALTER TABLE transactions ADD COLUMN ppn_amount_cents INTEGER",
+        "ALTER TABLE tax_records ADD COLUMN gross_income_cents INTEGER",
+        "ALTER TABLE tax_records ADD COLUMN taxable_income_cents INTEGER",
+        "ALTER TABLE tax_records ADD COLUMN tax_amount_cents INTEGER"
+    ], backfills=[
+        # ROUND() SQLite membulatkan setengah menjauhi nol, sama dengan utils.money.to_cents
+        Backfill('transactions', '''
+            UPDATE transactions
+            SET amount_cents = CAST(ROUND(amount * 100) AS INTEGER),
+                ppn_amount_cents = CAST(ROUND(COALESCE(ppn_amount, 0) * 100) AS INTEGER)
+            WHERE id > ? AND id <= ?
+        '''),
+        Backfill('tax_records', '''
+            UPDATE tax_records
+            SET gross_income_cents = CAST(ROUND(COALESCE(gross_income, 0) * 100) AS INTEGER),
+                taxable_income_cents = CAST(ROUND(COALESCE(taxable_income, 0) * 100) AS INTEGER),
+                tax_amount_cents = CAST(ROUND(COALESCE(tax_amount, 0) * 100) AS INTEGER)
+            WHERE id > ? AND id <= ?
+        ''')
+    ]),
+    Migration(4, "Buku besar PPN bulanan yang diperbarui trigger transaksi", [
+        '''
+        CREATE TABLE IF NOT EXISTS ppn_monthly_ledger (
+            month TEXT NOT NULL, -- YYYY-MM
+            type TEXT NOT NULL, -- penjualan/belanja
+            total_amount_cents INTEGER NOT NULL DEFAULT 0,
+            total_ppn_cents INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, type)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_ppn_ledger_insert AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO ppn_monthly_ledger (month, type, total_amount_cents, total_ppn_cents, count)
+            VALUES (COALESCE(substr(NEW.transaction_date, 1, 7), ''), NEW.type,
+                    COALESCE(NEW.amount_cents, 0), COALESCE(NEW.ppn_amount_cents, 0), 1)
+            ON CONFLICT (month, type) DO UPDATE SET
+                total_amount_cents = total_amount_cents + excluded.total_amount_cents,
+                total_ppn_cents = total_ppn_cents + excluded.total_ppn_cents,
+                count = count + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_ppn_ledger_delete AFTER DELETE ON transactions
+        BEGIN
+            UPDATE ppn_monthly_ledger
+            SET total_amount_cents = total_amount_cents - COALESCE(OLD.amount_cents, 0),
+                total_ppn_cents = total_ppn_cents - COALESCE(OLD.ppn_amount_cents, 0),
+                count = count - 1
+            WHERE month = COALESCE(substr(OLD.transaction_date, 1, 7), '') AND type = OLD.type;
+            DELETE FROM ppn_monthly_ledger
+            WHERE month = COALESCE(substr(OLD.transaction_date, 1, 7), '') AND type = OLD.type AND count <= 0;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_ppn_ledger_update
+        AFTER UPDATE OF type, transaction_date, amount_cents, ppn_amount_cents ON transactions
+        BEGIN
+            UPDATE ppn_monthly_ledger
+            SET total_amount_cents = total_amount_cents - COALESCE(OLD.amount_cents, 0),
+                total_ppn_cents = total_ppn_cents - COALESCE(OLD.ppn_amount_cents, 0),
+                count = count - 1
+            WHERE month = COALESCE(substr(OLD.transaction_date, 1, 7), '') AND type = OLD.type;
+            DELETE FROM ppn_monthly_ledger
+            WHERE month = COALESCE(substr(OLD.transaction_date, 1, 7), '') AND type = OLD.type AND count <= 0;
+            INSERT INTO ppn_monthly_ledger (month, type, total_amount_cents, total_ppn_cents, count)
+            VALUES (COALESCE(substr(NEW.transaction_date, 1, 7), ''), NEW.type,
+                    COALESCE(NEW.amount_cents, 0), COALESCE(NEW.ppn_amount_cents, 0), 1)
+            ON CONFLICT (month, type) DO UPDATE SET
+                total_amount_cents = total_amount_cents + excluded.total_amount_cents,
+                total_ppn_cents = total_ppn_cents + excluded.total_ppn_cents,
+                count = count + 1;
+        END
+        ''',
+        # Isi awal dari transaksi yang sudah ada (dalam transaksi skema yang sama)
+        '''
+        INSERT INTO ppn_monthly_ledger (month, type, total_amount_cents, total_ppn_cents, count)
+        SELECT COALESCE(substr(transaction_date, 1, 7), ''), type,
+               COALESCE(SUM(amount_cents), 0), COALESCE(SUM(ppn_amount_cents), 0), COUNT(*)
+        FROM transactions
+        GROUP BY 1, 2
+        '''
+    ]),
+    Migration(5, "Versi data per tahun dan cache hasil laporan", [
+        '''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            scope TEXT PRIMARY KEY, -- tahun (YYYY) atau '*' untuk data yang berlaku semua tahun
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS report_cache (
+            report TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            stamp TEXT NOT NULL, -- versi data dan tarif saat laporan dibuat
+            payload TEXT NOT NULL, -- JSON
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (report, year)
+        )
+        '''
+    ] + _data_version_triggers('transactions', "COALESCE(substr({row}.transaction_date, 1, 4), '')")
+      + _data_version_triggers('tax_records', "COALESCE(substr({row}.period, 1, 4), '')")
+      # Laporan memakai profil pegawai saat ini, jadi perubahan pegawai berlaku untuk semua tahun
+      + _data_version_triggers('employees', "'*'"))
+]
+
+
+class MigrationRunner:
+    """
+    Menjalankan migrasi yang tertunda secara berurutan. Perubahan skema
+    setiap versi diterapkan dalam satu transaksi; backfill data dijalankan
+    per batch dan progresnya disimpan sehingga bisa dilanjutkan jika terhenti.
+    """
+    
+    PROGRESS_TABLE = 'schema_migration_progress'
+    
+    def __init__(self, conn: sqlite3.Connection, migrations: List[Migration] = None,
+                 pause_between_batches: float = 0.0):
+        self.conn = conn
+        self.migrations = sorted(migrations if migrations is not None else MIGRATIONS,
+                                 key=lambda m: m.version)
+        self.pause_between_batches = pause_between_batches
+        self._ensure_progress_table()
+    
+    def _ensure_progress_table(self):
+        self.conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.PROGRESS_TABLE} (
+                version INTEGER NOT NULL,
+                step INTEGER NOT NULL, -- -1 = perubahan skema selesai, >=0 = indeks backfill
+                last_id INTEGER DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (version, step)
+            )
+        ''')
+        self.conn.commit()
+    
+    def get_current_version(self) -> int:
+        return self.conn.execute('PRAGMA user_version').fetchone()[0]
+    
+    def get_pending(self) -> List[Migration]:
+        current_version = self.get_current_version()
+        return [m for m in self.migrations if m.version > current_version]
+    
+    def _get_progress(self, version: int, step: int) -> Optional[int]:
+        row = self.conn.execute(
+            f'SELECT last_id FROM {self.PROGRESS_TABLE} WHERE version=? AND step=?',
+            (version, step)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def _set_progress(self, version: int, step: int, last_id: int):
+        self.conn.execute(f'''
+            INSERT INTO {self.PROGRESS_TABLE} (version, step, last_id, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (version, step) DO UPDATE SET last_id=excluded.last_id, updated_at=excluded.updated_at
+        ''', (version, step, last_id))
+    
+    def _apply_schema(self, migration: Migration):
+        # Langkah skema sudah selesai pada percobaan sebelumnya (backfill terhenti)
+        if self._get_progress(migration.version, -1) is not None:
+            return
+        try:
+            self.conn.execute('BEGIN IMMEDIATE')
+            for statement in migration.statements:
+                self.conn.execute(statement)
+            if migration.apply:
+                migration.apply(self.conn)
+            self._set_progress(migration.version, -1, 0)
+            self.conn.commit()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            raise Exception(f"Gagal menerapkan skema versi {migration.version} ({migration.description}): {e}")
+    
+    def _run_backfill(self, migration: Migration, step: int, backfill: Backfill,
+                      progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None):
+        last_id = self._get_progress(migration.version, step) or 0
+        max_id = self.conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {backfill.table}').fetchone()[0]
+        
+        while last_id < max_id:
+            upper_id = min(last_id + backfill.batch_size, max_id)
+            try:
+                self.conn.execute('BEGIN IMMEDIATE')
+                self.conn.execute(backfill.sql, (last_id, upper_id))
+                self._set_progress(migration.version, step, upper_id)
+                self.conn.commit()
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                raise Exception(f"Gagal backfill versi {migration.version} pada id {last_id}-{upper_id}: {e}")
+            last_id = upper_id
+            
+            if progress_callback:
+                progress_callback({
+                    'version': migration.version,
+                    'table': backfill.table,
+                    'last_id': last_id,
+                    'max_id': max_id
+                })
+            # Beri kesempatan penulis lain mengambil kunci di antara batch
+            if self.pause_between_batches:
+                time.sleep(self.pause_between_batches)
+    
+    def _finish(self, migration: Migration):
+        try:
+            self.conn.execute('BEGIN IMMEDIATE')
+            self.conn.execute(f'DELETE FROM {self.PROGRESS_TABLE} WHERE version=?', (migration.version,))
+            self.conn.execute(f'PRAGMA user_version={migration.version}')
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+    
+    def run(self, progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[int]:
+        """Jalankan semua migrasi tertunda, kembalikan daftar versi yang diterapkan"""
+        applied = []
+        for migration in self.get_pending():
+            self._apply_schema(migration)
+            for step, backfill in enumerate(migration.backfills):
+                self._run_backfill(migration, step, backfill, progress_callback)
+            self._finish(migration)
+            applied.append(migration.version)
+        
+        if applied:
+            self.conn.execute('ANALYZE')
+            self.conn.commit()
+        return applied
+    
+    def status(self) -> Dict[str, Any]:
+        """Dapatkan status migrasi: versi saat ini, migrasi tertunda dan backfill yang belum selesai"""
+        in_progress = self.conn.execute(
+            f'SELECT version, step, last_id, updated_at FROM {self.PROGRESS_TABLE} WHERE step >= 0 ORDER BY version, step'
+        ).fetchall()
+        return {
+            'current_version': self.get_current_version(),
+            'latest_version': self.migrations[-1].version if self.migrations else 0,
+            'pending': [(m.version, m.description) for m in self.get_pending()],
+            'in_progress': [
+                {'version': row[0], 'step': row[1], 'last_id': row[2], 'updated_at': row[3]}
+                for row in in_progress
+            ]
+        }
+
+
+if __name__ == "__main__":
+    # python -m config.migrations : jalankan migrasi tertunda dan tampilkan status
+    from config.database import db_manager
+    
+    conn = db_manager.get_connection()
+    runner = MigrationRunner(conn)
+    applied = runner.run(lambda p: print(f"  versi {p['version']} {p['table']}: id {p['last_id']}/{p['max_id']}"))
+    status = runner.status()
+    print(f"Versi skema: {status['current_version']} (terbaru: {status['latest_version']})")
+    print(f"Migrasi diterapkan: {applied or '-'}")
+    conn.close()
\ No newline at end of file
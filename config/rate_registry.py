@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import threading
+from bisect import bisect_right
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+# File set tarif berversi (PTKP, tarif progresif, TER, PPN, pajak badan)
+RATES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tax_rates.json')
+
+def _to_table(rows: List[list]) -> List[Tuple[float, float]]:
+    # Batas null di file berarti tak terhingga (lapisan terakhir)
+    return [(float('inf') if limit is None else limit, rate) for limit, rate in rows]
+
+
+class RateSet:
+    """Satu set tarif pajak yang berlaku mulai effective_date (YYYY-MM-DD)"""
+    
+    def __init__(self, data: Dict[str, Any], registry_version: int = 0):
+        self.effective_date = data['effective_date']
+        self.source = data.get('source', '')
+        self.ptkp_self = data['ptkp']['self']
+        self.ptkp_spouse = data['ptkp']['spouse']
+        self.ptkp_child = data['ptkp']['child']
+        self.tax_rates = _to_table(data['progressive'])
+        self.ter_rates = {category: _to_table(rows) for category, rows in data['ter'].items()}
+        self.ppn_rate = data['ppn_rate']
+        self.corporate_tax_rate = data['corporate_tax_rate']
+        # Berbeda untuk setiap set dan setiap kali registry dimuat ulang (kunci cache)
+        self.version = f"{self.effective_date}#{registry_version}"
+    
+    @property
+    def fingerprint(self) -> str:
+        """Sidik isi tarif: sama antar proses selama nilainya sama (berbeda dengan version)"""
+        content = repr((self.effective_date, self.ptkp_self, self.ptkp_spouse, self.ptkp_child,
+                        self.tax_rates, sorted(self.ter_rates.items()), self.ppn_rate, self.corporate_tax_rate))
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+    
+    def __repr__(self) -> str:
+        return f"RateSet({self.version}, ppn={self.ppn_rate}, badan={self.corporate_tax_rate})"
+
+
+class RateRegistry:
+    """
+    Registry set tarif berversi berdasarkan tanggal berlaku. File dimuat sekali
+    per proses; ppn_rate dan corporate_tax_rate yang diisi pengguna di
+    AppSettings['rate_overrides'] hanya menggantikan nilai pada set yang berlaku
+    saat ini (hari ini). Transaksi bertanggal sebelum set itu berlaku tetap
+    memakai tarif set masing-masing, tanpa override.
+    """
+    
+    def __init__(self, path: str = RATES_FILE, use_settings: bool = True):
+        self.path = path
+        self.use_settings = use_settings
+        self.version = 0
+        self._lock = threading.Lock()
+        self._sets: Optional[List[RateSet]] = None
+        self._dates: List[str] = []
+        self._by_year: Dict[int, RateSet] = {}
+    
+    def load(self):
+        """Muat (ulang) file tarif dan terapkan override AppSettings"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        with self._lock:
+            self.version += 1
+            sets = sorted((RateSet(item, self.version) for item in data['rate_sets']),
+                          key=lambda s: s.effective_date)
+            if not sets:
+                raise ValueError(f"Tidak ada set tarif di {self.path}")
+            dates = [s.effective_date for s in sets]
+            
+            if self.use_settings:
+                from config.settings import AppSettings
+                overrides = AppSettings().get('rate_overrides') or {}
+                current = sets[max(0, bisect_right(dates, date.today().isoformat()) - 1)]
+                current.ppn_rate = overrides.get('ppn_rate', current.ppn_rate)
+                current.corporate_tax_rate = overrides.get('corporate_tax_rate', current.corporate_tax_rate)
+            
+            self._sets = sets
+            self._dates = dates
+            self._by_year = {}
+    
+    def reload(self):
+        self.load()
+    
+    def _ensure_loaded(self):
+        if self._sets is None:
+            self.load()
+    
+    def for_date(self, on_date: str) -> RateSet:
+        """Set tarif yang berlaku pada tanggal (YYYY-MM-DD); sebelum set pertama memakai set pertama"""
+        self._ensure_loaded()
+        index = bisect_right(self._dates, on_date) - 1
+        return self._sets[max(0, index)]
+    
+    def for_year(self, year: int) -> RateSet:
+        """Set tarif untuk perhitungan tahunan: yang berlaku pada akhir tahun tersebut"""
+        self._ensure_loaded()
+        rate_set = self._by_year.get(year)
+        if rate_set is None:
+            rate_set = self._by_year[year] = self.for_date(f"{year:04d}-12-31")
+        return rate_set
+    
+    def current(self) -> RateSet:
+        return self.for_date(date.today().isoformat())
+    
+    def get_all(self) -> List[RateSet]:
+        self._ensure_loaded()
+        return list(self._sets)
+
+
+# Registry bersama untuk seluruh aplikasi
+rate_registry = RateRegistry()
\ No newline at end of file
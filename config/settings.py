@@ -4,6 +4,10 @@ from datetime import datetime
 from typing import Dict, Any
 
 class AppSettings:
+    # Versi lama menyimpan tarif langsung di pengaturan dan selalu berisi nilai default ini;
+    # hanya nilai yang diubah pengguna yang dipindahkan ke rate_overrides
+    LEGACY_RATE_DEFAULTS = {"ppn_rate": 0.11, "corporate_tax_rate": 0.25}
+    
     def __init__(self):
         self.settings_file = "config/app_settings.json"
         self.default_settings = {
@@ -11,13 +15,17 @@ class AppSettings:
             "company_npwp": "",
             "company_address": "",
             "default_currency": "IDR",
-            "ppn_rate": 0.11,
-            "corporate_tax_rate": 0.25,
+            # Tarif yang sengaja diubah pengguna (ppn_rate/corporate_tax_rate), hanya untuk set
+            # tarif yang berlaku saat ini; tanpa isi, tarif mengikuti config/tax_rates.json
+            "rate_overrides": {},
             "reminder_days": 7,
             "auto_backup": True,
             "backup_frequency": "weekly",
             "theme": "default",
             "language": "id",
+            "db_pragma_profile": "default",  # default/safe/performance/legacy
+            "db_pool_size": 5,
+            "db_fetch_batch_size": 500,
             "created_at": datetime.now().isoformat(),
             "updated_at": datetime.now().isoformat()
         }
@@ -29,6 +37,13 @@ class AppSettings:
             try:
                 with open(self.settings_file, 'r', encoding='utf-8') as f:
                     settings = json.load(f)
+                    if "rate_overrides" not in settings:
+                        settings["rate_overrides"] = {
+                            key: settings[key] for key, default in self.LEGACY_RATE_DEFAULTS.items()
+                            if key in settings and settings[key] != default
+                        }
+                    for key in self.LEGACY_RATE_DEFAULTS:
+                        settings.pop(key, None)
                     # Pastikan semua key default ada
                     for key, value in self.default_settings.items():
                         if key not in settings:
@@ -72,6 +87,7 @@ class AppSettings:
     def reset_to_default(self) -> bool:
         """Reset pengaturan ke default"""
         self.settings = self.default_settings.copy()
+        self.settings["rate_overrides"] = {}
         return self.save_settings(self.settings)
     
     def update_settings(self, new_settings: Dict[str, Any]) -> bool:
@@ -3,11 +3,89 @@
 Tax Manager - Aplikasi CLI untuk mengelola kewajiban perpajakan
 """
 
+import argparse
+import os
+import sys
 from ui.dashboard import TaxDashboard
 
+def run_payroll(args):
+    """Proses PPh 21 bulanan tanpa UI (python main.py payroll --year 2024 --month 5)"""
+    from services.payroll_engine import PayrollEngine
+    
+    engine = PayrollEngine(workers=args.workers, chunk_size=args.chunk_size)
+    summary = engine.run_month(args.year, args.month, recompute=args.recompute)
+    print(f"Periode  : {summary['period']} ({summary['method']})")
+    print(f"Diproses : {summary['processed']} pegawai")
+    print(f"Dilewati : {summary['skipped']} pegawai")
+    print(f"Total    : Rp {summary['total_tax']:,.0f}")
+
+def run_ppn_ledger(args):
+    """Periksa atau bangun ulang ledger PPN bulanan (python main.py ppn-ledger --verify)"""
+    from models.ppn_ledger import PPNLedger
+    
+    if args.rebuild:
+        print(f"Ledger dibangun ulang: {PPNLedger.rebuild()} baris bulan/jenis")
+    differences = PPNLedger.verify()
+    for diff in differences:
+        print(f"Selisih {diff['month']} {diff['type']}: transaksi={diff['expected']} ledger={diff['ledger']}")
+    print("Ledger sesuai dengan transaksi" if not differences else f"{len(differences)} selisih ditemukan")
+    return 0 if not differences else 1
+
+def run_import(args):
+    """Impor transaksi massal dari CSV (python main.py import-transactions pos.csv --type penjualan)"""
+    from utils.importer import TransactionImporter
+    
+    summary = TransactionImporter(chunk_size=args.chunk_size).import_csv(
+        args.file, args.type, include_ppn=args.include_ppn, delimiter=args.delimiter)
+    print(f"Diimpor  : {summary['imported']:,} transaksi")
+    print(f"Dilewati : {summary['skipped']:,} baris")
+    print(f"Jumlah   : Rp {summary['total_amount']:,.0f}")
+    print(f"PPN      : Rp {summary['total_ppn']:,.0f}")
+    for line, message in summary['errors']:
+        print(f"Baris {line}: {message}")
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Tax Manager")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    payroll = subparsers.add_parser("payroll", help="Proses PPh 21 bulanan semua pegawai")
+    payroll.add_argument("--year", type=int, required=True)
+    payroll.add_argument("--month", type=int, required=True)
+    payroll.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                         help="Jumlah proses perhitungan (default: jumlah CPU)")
+    payroll.add_argument("--chunk-size", type=int, default=5000,
+                         help="Jumlah pegawai per potongan kerja")
+    payroll.add_argument("--recompute", action="store_true",
+                         help="Hitung ulang pegawai yang sudah diproses pada periode tersebut")
+    
+    ledger = subparsers.add_parser("ppn-ledger", help="Verifikasi ledger PPN bulanan terhadap transaksi")
+    ledger.add_argument("--rebuild", action="store_true",
+                        help="Bangun ulang ledger dari tabel transaksi sebelum verifikasi")
+    
+    importer = subparsers.add_parser("import-transactions", help="Impor transaksi massal dari file CSV")
+    importer.add_argument("file", help="CSV dengan kolom Tanggal, Jumlah (opsional Jenis, Deskripsi, No_Faktur)")
+    importer.add_argument("--type", choices=["penjualan", "belanja"], default="penjualan",
+                          help="Jenis transaksi jika kolom Jenis tidak ada/kosong")
+    importer.add_argument("--include-ppn", action="store_true",
+                          help="Kolom Jumlah adalah total termasuk PPN (faktur masukan)")
+    importer.add_argument("--delimiter", default=",")
+    importer.add_argument("--chunk-size", type=int, default=10000,
+                          help="Jumlah baris per potongan perhitungan/penyimpanan")
+    return parser.parse_args(argv)
+
 def main():
     """Entry point aplikasi"""
+    args = parse_args(sys.argv[1:])
     try:
+        if args.command == "payroll":
+            run_payroll(args)
+            return
+        if args.command == "ppn-ledger":
+            sys.exit(run_ppn_ledger(args))
+        if args.command == "import-transactions":
+            run_import(args)
+            return
+        
         dashboard = TaxDashboard()
         dashboard.run()
     except KeyboardInterrupt:
@@ -1,9 +1,11 @@
 from dataclasses import dataclass
-from typing import Optional
+from itertools import starmap
+from typing import Iterable, Iterator, List, Optional
 import sqlite3
 from config.database import db_manager
+from utils.helpers import chunked
 
-@dataclass
+@dataclass(slots=True)
 class Employee:
     id: Optional[int] = None
     name: str = ""
@@ -12,73 +14,155 @@ class Employee:
     allowances: float = 0.0
     npwp: Optional[str] = None
     created_at: Optional[str] = None
+    marital_status: str = "TK"  # TK/K/K/I
+    dependants: int = 0  # jumlah tanggungan untuk PTKP (maksimal 3 yang dihitung)
+    pph21_method: str = "progressive"  # progressive/ter
+    
+    _COLUMNS = ('id, name, status, monthly_salary, allowances, npwp, created_at, '
+                'marital_status, dependants, pph21_method')
+    # Kolom yang ditulis saat insert/update, urutannya sama dengan _values()
+    _FIELDS = ('name, status, monthly_salary, allowances, npwp, '
+               'marital_status, dependants, pph21_method')
+    
+    @property
+    def ptkp_status(self) -> str:
+        """Status PTKP lengkap, mis. TK/0, K/1 atau K/I/2"""
+        return f"{self.marital_status}/{min(self.dependants, 3)}"
+    
+    def _values(self) -> tuple:
+        return (self.name, self.status, self.monthly_salary, self.allowances, self.npwp,
+                self.marital_status, self.dependants, self.pph21_method)
     
     def save(self):
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        
-        if self.id is None:
-            cursor.execute('''
-                INSERT INTO employees (name, status, monthly_salary, allowances, npwp)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (self.name, self.status, self.monthly_salary, self.allowances, self.npwp))
-            self.id = cursor.lastrowid
-        else:
-            cursor.execute('''
-                UPDATE employees 
-                SET name=?, status=?, monthly_salary=?, allowances=?, npwp=?
-                WHERE id=?
-            ''', (self.name, self.status, self.monthly_salary, self.allowances, self.npwp, self.id))
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
         
-        conn.commit()
-        conn.close()
+            if self.id is None:
+                cursor.execute(f'''
+                    INSERT INTO employees ({self._FIELDS})
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', self._values())
+                self.id = cursor.lastrowid
+            else:
+                cursor.execute('''
+                    UPDATE employees
+                    SET name=?, status=?, monthly_salary=?, allowances=?, npwp=?,
+                        marital_status=?, dependants=?, pph21_method=?
+                    WHERE id=?
+                ''', self._values() + (self.id,))
+    
+    @classmethod
+    def bulk_upsert(cls, employees: Iterable['Employee'], chunk_size: int = 1000) -> List[int]:
+        """
+        Simpan banyak pegawai sekaligus dalam satu transaksi database.
+        Pegawai dengan id, atau tanpa id tetapi NPWP-nya sudah terdaftar,
+        diperbarui; id yang belum ada di database ditambahkan dengan id tersebut.
+        Pegawai baru dengan NPWP yang sama di dalam input adalah satu pegawai:
+        satu baris ditambahkan dengan data kemunculan terakhir.
+        Kembalikan id sesuai urutan input.
+        """
+        ids = []
+        with db_manager.transaction() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(employees, chunk_size):
+                # Cocokkan pegawai baru dengan data lama berdasarkan NPWP
+                npwps = list({e.npwp for e in chunk if e.id is None and e.npwp})
+                if npwps:
+                    placeholders = ','.join('?' * len(npwps))
+                    cursor.execute(f'SELECT npwp, id FROM employees WHERE npwp IN ({placeholders})', npwps)
+                    existing = dict(cursor.fetchall())
+                    for employee in chunk:
+                        if employee.id is None and employee.npwp in existing:
+                            employee.id = existing[employee.npwp]
+                
+                updates = [e for e in chunk if e.id is not None]
+                # Satu baris per NPWP baru (posisi kemunculan pertama, data kemunculan terakhir)
+                new_rows = {}
+                for employee in chunk:
+                    if employee.id is None:
+                        new_rows[employee.npwp or id(employee)] = employee
+                inserts = list(new_rows.values())
+                
+                if updates:
+                    cursor.executemany('''
+                        UPDATE employees
+                        SET name=?, status=?, monthly_salary=?, allowances=?, npwp=?,
+                            marital_status=?, dependants=?, pph21_method=?
+                        WHERE id=?
+                    ''', [e._values() + (e.id,) for e in updates])
+                    # Id yang tidak ada di database tidak memperbarui apa pun: tambahkan dengan id tersebut
+                    if cursor.rowcount < len(updates):
+                        update_ids = list({e.id for e in updates})
+                        placeholders = ','.join('?' * len(update_ids))
+                        found = {row[0] for row in cursor.execute(
+                            f'SELECT id FROM employees WHERE id IN ({placeholders})', update_ids)}
+                        missing = {}
+                        for employee in updates:
+                            if employee.id not in found:
+                                missing[employee.id] = employee
+                        cursor.executemany(f'''
+                            INSERT INTO employees (id, {cls._FIELDS})
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ''', [(e.id,) + e._values() for e in missing.values()])
+                
+                if inserts:
+                    cursor.executemany(f'''
+                        INSERT INTO employees ({cls._FIELDS})
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', [e._values() for e in inserts])
+                    # Kunci tulis dipegang selama transaksi, jadi id AUTOINCREMENT berurutan
+                    last_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+                    first_id = last_id - len(inserts) + 1
+                    for offset, employee in enumerate(inserts):
+                        employee.id = first_id + offset
+                    # Duplikat NPWP memakai id baris yang sama
+                    for employee in chunk:
+                        if employee.id is None:
+                            employee.id = new_rows[employee.npwp].id
+                
+                ids.extend(e.id for e in chunk)
+        return ids
+    
+    @classmethod
+    def _from_row(cls, row):
+        # Urutan _COLUMNS sama dengan urutan field dataclass
+        return cls(*row)
+    
+    @classmethod
+    def iter_where(cls, where: str = None, params: tuple = (), order_by: str = None,
+                   batch_size: int = None) -> Iterator['Employee']:
+        """
+        Iterasi pegawai secara bertahap (fetchmany) tanpa memuat semuanya ke memori.
+        `where` adalah potongan SQL dengan placeholder '?' untuk `params`.
+        """
+        sql = f'SELECT {cls._COLUMNS} FROM employees'
+        if where:
+            sql += f' WHERE {where}'
+        if order_by:
+            sql += f' ORDER BY {order_by}'
+        yield from starmap(cls, db_manager.iter_query(sql, params, batch_size))
+    
+    @classmethod
+    def iter_all(cls, batch_size: int = None) -> Iterator['Employee']:
+        return cls.iter_where(batch_size=batch_size)
     
     @classmethod
     def get_all(cls):
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, name, status, monthly_salary, allowances, npwp, created_at FROM employees')
-        rows = cursor.fetchall()
-        conn.close()
-        
-        employees = []
-        for row in rows:
-            employee = cls()
-            employee.id = row[0]
-            employee.name = row[1]
-            employee.status = row[2]
-            employee.monthly_salary = row[3]
-            employee.allowances = row[4]
-            employee.npwp = row[5]
-            employee.created_at = row[6]
-            employees.append(employee)
-        
-        return employees
+        return list(cls.iter_all())
     
     @classmethod
     def get_by_id(cls, emp_id):
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, name, status, monthly_salary, allowances, npwp, created_at FROM employees WHERE id=?', (emp_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT {cls._COLUMNS} FROM employees WHERE id=?', (emp_id,))
+            row = cursor.fetchone()
         
         if row:
-            employee = cls()
-            employee.id = row[0]
-            employee.name = row[1]
-            employee.status = row[2]
-            employee.monthly_salary = row[3]
-            employee.allowances = row[4]
-            employee.npwp = row[5]
-            employee.created_at = row[6]
-            return employee
+            return cls._from_row(row)
         return None
     
     def delete(self):
         if self.id:
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM employees WHERE id=?', (self.id,))
-            conn.commit()
-            conn.close()
\ No newline at end of file
+            with db_manager.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM employees WHERE id=?', (self.id,))
\ No newline at end of file
@@ -0,0 +1,115 @@
+from typing import Any, Dict, List, Sequence
+from config.database import db_manager
+from utils.money import from_cents
+
+class PPNLedger:
+    """
+    Rekap transaksi per bulan dan jenis di tabel ppn_monthly_ledger.
+    Tabel diperbarui trigger pada setiap insert/update/delete transaksi
+    (migrasi versi 4), sehingga rekap bulan/tahun hanya membaca satu baris
+    per bulan berapa pun jumlah transaksinya.
+    """
+    
+    TABLE = 'ppn_monthly_ledger'
+    
+    # Kolom yang boleh dipakai untuk pengelompokan, sama dengan Transaction.aggregate
+    _GROUP_COLUMNS = {
+        'type': 'type',
+        'year': 'substr(month, 1, 4)',
+        'month': 'month'
+    }
+    
+    # Rekap yang seharusnya ada di ledger, dihitung langsung dari tabel transaksi
+    _SOURCE_SQL = '''
+        SELECT COALESCE(substr(transaction_date, 1, 7), '') AS month, type,
+               COALESCE(SUM(amount_cents), 0), COALESCE(SUM(ppn_amount_cents), 0), COUNT(*)
+        FROM transactions
+        GROUP BY 1, 2
+    '''
+    
+    @classmethod
+    def aggregate(cls, year: int = None, month: int = None, type: str = None,
+                  group_by: Sequence[str] = ('type',)) -> List[Dict[str, Any]]:
+        """
+        Sama dengan Transaction.aggregate (parameter dan bentuk baris),
+        tetapi dibaca dari ledger bulanan, bukan dari tabel transaksi.
+        """
+        unknown = [g for g in group_by if g not in cls._GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"Kolom pengelompokan tidak dikenal: {', '.join(unknown)}")
+        
+        conditions = []
+        params = []
+        if type:
+            conditions.append('type = ?')
+            params.append(type)
+        if year is not None:
+            if month is not None:
+                conditions.append('month = ?')
+                params.append(f"{year:04d}-{month:02d}")
+            else:
+                conditions.append('month >= ? AND month <= ?')
+                params.extend([f"{year:04d}-01", f"{year:04d}-12"])
+        
+        group_exprs = [cls._GROUP_COLUMNS[g] for g in group_by]
+        select = ''.join(f'{expr} AS {name}, ' for name, expr in zip(group_by, group_exprs))
+        sql = f'''
+            SELECT {select}COALESCE(SUM(total_amount_cents), 0), COALESCE(SUM(total_ppn_cents), 0),
+                   COALESCE(SUM(count), 0)
+            FROM {cls.TABLE}
+        '''
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        if group_by:
+            sql += f" GROUP BY {', '.join(group_exprs)} ORDER BY {', '.join(group_exprs)}"
+        
+        with db_manager.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        
+        result = []
+        key_count = len(group_by)
+        for row in rows:
+            if not row[key_count + 2]:
+                continue
+            item = dict(zip(group_by, row[:key_count]))
+            item['total_amount_cents'] = row[key_count]
+            item['total_ppn_cents'] = row[key_count + 1]
+            item['total_amount'] = from_cents(row[key_count])
+            item['total_ppn'] = from_cents(row[key_count + 1])
+            item['count'] = row[key_count + 2]
+            result.append(item)
+        return result
+    
+    @classmethod
+    def rebuild(cls) -> int:
+        """Bangun ulang seluruh ledger dari tabel transaksi, kembalikan jumlah baris ledger"""
+        with db_manager.transaction() as conn:
+            conn.execute(f'DELETE FROM {cls.TABLE}')
+            conn.execute(f'''
+                INSERT INTO {cls.TABLE} (month, type, total_amount_cents, total_ppn_cents, count)
+                {cls._SOURCE_SQL}
+            ''')
+            return conn.execute(f'SELECT COUNT(*) FROM {cls.TABLE}').fetchone()[0]
+    
+    @classmethod
+    def verify(cls) -> List[Dict[str, Any]]:
+        """
+        Bandingkan ledger dengan rekap langsung dari tabel transaksi.
+        Kembalikan daftar selisih (kosong berarti ledger sesuai).
+        """
+        with db_manager.connection() as conn:
+            expected = {(r[0], r[1]): r[2:] for r in conn.execute(cls._SOURCE_SQL)}
+            actual = {(r[0], r[1]): r[2:] for r in conn.execute(
+                f'SELECT month, type, total_amount_cents, total_ppn_cents, count FROM {cls.TABLE}'
+            )}
+        
+        differences = []
+        for key in sorted(set(expected) | set(actual)):
+            if expected.get(key) != actual.get(key):
+                differences.append({
+                    'month': key[0],
+                    'type': key[1],
+                    'expected': expected.get(key),  # (amount_cents, ppn_cents, count)
+                    'ledger': actual.get(key)
+                })
+        return differences
\ No newline at end of file
@@ -1,9 +1,12 @@
 from dataclasses import dataclass
-from typing import Optional
+from itertools import starmap
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 import sqlite3
 from config.database import db_manager
+from utils.helpers import chunked
+from utils.money import to_cents, from_cents
 
-@dataclass
+@dataclass(slots=True)
 class TaxRecord:
     id: Optional[int] = None
     employee_id: Optional[int] = None
@@ -15,98 +18,137 @@ class TaxRecord:
     description: str = ""
     created_at: Optional[str] = None
     
+    # Nilai uang dibaca dari kolom sen (eksak) dan dibagi 100 di SQLite; hasilnya
+    # sama dengan utils.money.from_cents. Urutan kolom sama dengan urutan field.
+    _COLUMNS = ('id, employee_id, period, gross_income_cents / 100.0, taxable_income_cents / 100.0, '
+                'tax_amount_cents / 100.0, tax_type, description, created_at')
+    
+    @property
+    def tax_amount_cents(self) -> int:
+        return to_cents(self.tax_amount)
+    
+    def _values(self) -> tuple:
+        gross_cents = to_cents(self.gross_income)
+        taxable_cents = to_cents(self.taxable_income)
+        tax_cents = self.tax_amount_cents
+        return (self.employee_id, self.period, from_cents(gross_cents), from_cents(taxable_cents),
+                from_cents(tax_cents), gross_cents, taxable_cents, tax_cents, self.tax_type, self.description)
+    
     def save(self):
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
         
-        if self.id is None:
-            cursor.execute('''
-                INSERT INTO tax_records 
-                (employee_id, period, gross_income, taxable_income, tax_amount, tax_type, description)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (self.employee_id, self.period, self.gross_income, self.taxable_income, 
-                  self.tax_amount, self.tax_type, self.description))
-            self.id = cursor.lastrowid
-        else:
-            cursor.execute('''
-                UPDATE tax_records 
-                SET employee_id=?, period=?, gross_income=?, taxable_income=?, 
-                    tax_amount=?, tax_type=?, description=?
-                WHERE id=?
-            ''', (self.employee_id, self.period, self.gross_income, self.taxable_income,
-                  self.tax_amount, self.tax_type, self.description, self.id))
-        
-        conn.commit()
-        conn.close()
+            if self.id is None:
+                cursor.execute('''
+                    INSERT INTO tax_records
+                    (employee_id, period, gross_income, taxable_income, tax_amount,
+                     gross_income_cents, taxable_income_cents, tax_amount_cents, tax_type, description)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', self._values())
+                self.id = cursor.lastrowid
+            else:
+                cursor.execute('''
+                    UPDATE tax_records
+                    SET employee_id=?, period=?, gross_income=?, taxable_income=?, tax_amount=?,
+                        gross_income_cents=?, taxable_income_cents=?, tax_amount_cents=?,
+                        tax_type=?, description=?
+                    WHERE id=?
+                ''', self._values() + (self.id,))
+    
+    @classmethod
+    def bulk_insert(cls, records: Iterable['TaxRecord'], chunk_size: int = 1000) -> List[int]:
+        """
+        Simpan banyak catatan pajak sekaligus dalam satu transaksi database
+        (executemany per chunk). Id yang diberikan database diisi ke setiap objek.
+        """
+        ids = []
+        with db_manager.transaction() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(records, chunk_size):
+                cursor.executemany('''
+                    INSERT INTO tax_records
+                    (employee_id, period, gross_income, taxable_income, tax_amount,
+                     gross_income_cents, taxable_income_cents, tax_amount_cents, tax_type, description)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [r._values() for r in chunk])
+                # Kunci tulis dipegang selama transaksi, jadi id AUTOINCREMENT berurutan
+                last_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+                first_id = last_id - len(chunk) + 1
+                for offset, record in enumerate(chunk):
+                    record.id = first_id + offset
+                ids.extend(range(first_id, last_id + 1))
+        return ids
+    
+    @classmethod
+    def _from_row(cls, row):
+        return cls(*row)
+    
+    @classmethod
+    def iter_where(cls, where: str = None, params: tuple = (), order_by: str = None,
+                   batch_size: int = None) -> Iterator['TaxRecord']:
+        """
+        Iterasi catatan pajak secara bertahap (fetchmany) tanpa memuat semuanya ke memori.
+        `where` adalah potongan SQL dengan placeholder '?' untuk `params`.
+        """
+        sql = f'SELECT {cls._COLUMNS} FROM tax_records'
+        if where:
+            sql += f' WHERE {where}'
+        if order_by:
+            sql += f' ORDER BY {order_by}'
+        yield from starmap(cls, db_manager.iter_query(sql, params, batch_size))
+    
+    @classmethod
+    def iter_all(cls, batch_size: int = None) -> Iterator['TaxRecord']:
+        return cls.iter_where(batch_size=batch_size)
     
     @classmethod
     def get_all(cls):
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, employee_id, period, gross_income, taxable_income, tax_amount, tax_type, description, created_at FROM tax_records')
-        rows = cursor.fetchall()
-        conn.close()
-        
-        tax_records = []
-        for row in rows:
-            record = cls()
-            record.id = row[0]
-            record.employee_id = row[1]
-            record.period = row[2]
-            record.gross_income = row[3]
-            record.taxable_income = row[4]
-            record.tax_amount = row[5]
-            record.tax_type = row[6]
-            record.description = row[7]
-            record.created_at = row[8]
-            tax_records.append(record)
-        
-        return tax_records
+        return list(cls.iter_all())
     
     @classmethod
     def get_by_employee(cls, employee_id: int):
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, employee_id, period, gross_income, taxable_income, tax_amount, tax_type, description, created_at FROM tax_records WHERE employee_id=? ORDER BY period DESC', (employee_id,))
-        rows = cursor.fetchall()
-        conn.close()
-        
-        tax_records = []
-        for row in rows:
-            record = cls()
-            record.id = row[0]
-            record.employee_id = row[1]
-            record.period = row[2]
-            record.gross_income = row[3]
-            record.taxable_income = row[4]
-            record.tax_amount = row[5]
-            record.tax_type = row[6]
-            record.description = row[7]
-            record.created_at = row[8]
-            tax_records.append(record)
-        
-        return tax_records
+        return list(cls.iter_where('employee_id=?', (employee_id,), order_by='period DESC'))
     
     @classmethod
     def get_by_period(cls, period: str):
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, employee_id, period, gross_income, taxable_income, tax_amount, tax_type, description, created_at FROM tax_records WHERE period=?', (period,))
-        rows = cursor.fetchall()
-        conn.close()
-        
-        tax_records = []
-        for row in rows:
-            record = cls()
-            record.id = row[0]
-            record.employee_id = row[1]
-            record.period = row[2]
-            record.gross_income = row[3]
-            record.taxable_income = row[4]
-            record.tax_amount = row[5]
-            record.tax_type = row[6]
-            record.description = row[7]
-            record.created_at = row[8]
-            tax_records.append(record)
-        
-        return tax_records
\ No newline at end of file
+        return list(cls.iter_where('period=?', (period,)))
+    
+    @classmethod
+    def get_employee_ids_for_period(cls, period: str, tax_type: str = "pph21") -> Set[int]:
+        """Id pegawai yang sudah memiliki catatan pajak untuk periode tersebut"""
+        with db_manager.connection() as conn:
+            rows = conn.execute(
+                'SELECT DISTINCT employee_id FROM tax_records WHERE period=? AND tax_type=?',
+                (period, tax_type)
+            ).fetchall()
+        return {row[0] for row in rows}
+    
+    @classmethod
+    def sum_by_employee(cls, start_period: str, end_period: str,
+                        tax_type: str = "pph21") -> Dict[int, Tuple[float, float, int]]:
+        """
+        Total per pegawai untuk periode start_period s.d. end_period (inklusif):
+        {employee_id: (total bruto, total pajak, jumlah catatan)}. Dijumlahkan eksak dalam sen.
+        """
+        with db_manager.connection() as conn:
+            rows = conn.execute('''
+                SELECT employee_id, SUM(gross_income_cents), SUM(tax_amount_cents), COUNT(*)
+                FROM tax_records
+                WHERE period >= ? AND period <= ? AND tax_type=?
+                GROUP BY employee_id
+            ''', (start_period, end_period, tax_type)).fetchall()
+        return {row[0]: (from_cents(row[1]), from_cents(row[2]), row[3]) for row in rows}
+    
+    @classmethod
+    def delete_for_period(cls, period: str, employee_ids: Iterable[int], tax_type: str = "pph21") -> int:
+        """Hapus catatan pajak periode tertentu untuk pegawai yang diberikan"""
+        deleted = 0
+        with db_manager.transaction() as conn:
+            for chunk in chunked(employee_ids, 500):
+                placeholders = ', '.join('?' * len(chunk))
+                cursor = conn.execute(
+                    f'DELETE FROM tax_records WHERE period=? AND tax_type=? AND employee_id IN ({placeholders})',
+                    (period, tax_type, *chunk)
+                )
+                deleted += cursor.rowcount
+        return deleted
\ No newline at end of file
@@ -1,9 +1,14 @@
+from array import array
 from dataclasses import dataclass
-from typing import Optional
+from itertools import starmap
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 import sqlite3
 from config.database import db_manager
+from utils.helpers import chunked, get_year_date_range, get_month_date_range
+from utils.money import to_cents, from_cents
 
-@dataclass
+@dataclass(slots=True)
 class Transaction:
     id: Optional[int] = None
     type: str = "penjualan"  # penjualan/belanja
@@ -14,77 +19,288 @@ class Transaction:
     invoice_number: Optional[str] = None
     created_at: Optional[str] = None
     
+    # Nilai uang dibaca dari kolom sen (eksak) dan dibagi 100 di SQLite; hasilnya
+    # sama dengan utils.money.from_cents. Urutan kolom sama dengan urutan field.
+    _COLUMNS = ('id, type, description, amount_cents / 100.0, ppn_amount_cents / 100.0, '
+                'transaction_date, invoice_number, created_at')
+    # Kolom untuk TransactionBatch (nilai tetap dalam sen)
+    _BATCH_COLUMNS = 'id, type, description, amount_cents, ppn_amount_cents, transaction_date, invoice_number, created_at'
+    
+    _INSERT_SQL = '''
+        INSERT INTO transactions
+        (type, description, amount, ppn_amount, amount_cents, ppn_amount_cents,
+         transaction_date, invoice_number)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    
+    # Kolom yang boleh dipakai untuk pengelompokan di aggregate()
+    _GROUP_COLUMNS = {
+        'type': 'type',
+        'year': 'substr(transaction_date, 1, 4)',
+        'month': 'substr(transaction_date, 1, 7)'  # YYYY-MM
+    }
+    
+    @property
+    def amount_cents(self) -> int:
+        return to_cents(self.amount)
+    
+    @property
+    def ppn_amount_cents(self) -> int:
+        return to_cents(self.ppn_amount)
+    
+    def _values(self) -> tuple:
+        amount_cents = self.amount_cents
+        ppn_amount_cents = self.ppn_amount_cents
+        return (self.type, self.description, from_cents(amount_cents), from_cents(ppn_amount_cents),
+                amount_cents, ppn_amount_cents, self.transaction_date, self.invoice_number)
+    
     def save(self):
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        
-        if self.id is None:
-            cursor.execute('''
-                INSERT INTO transactions 
-                (type, description, amount, ppn_amount, transaction_date, invoice_number)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (self.type, self.description, self.amount, self.ppn_amount,
-                  self.transaction_date, self.invoice_number))
-            self.id = cursor.lastrowid
-        else:
-            cursor.execute('''
-                UPDATE transactions 
-                SET type=?, description=?, amount=?, ppn_amount=?, transaction_date=?, invoice_number=?
-                WHERE id=?
-            ''', (self.type, self.description, self.amount, self.ppn_amount,
-                  self.transaction_date, self.invoice_number, self.id))
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
         
-        conn.commit()
-        conn.close()
+            if self.id is None:
+                cursor.execute(self._INSERT_SQL, self._values())
+                self.id = cursor.lastrowid
+            else:
+                cursor.execute('''
+                    UPDATE transactions
+                    SET type=?, description=?, amount=?, ppn_amount=?, amount_cents=?, ppn_amount_cents=?,
+                        transaction_date=?, invoice_number=?
+                    WHERE id=?
+                ''', self._values() + (self.id,))
+    
+    @classmethod
+    def bulk_insert(cls, transactions: Iterable['Transaction'], chunk_size: int = 1000) -> List[int]:
+        """
+        Simpan banyak transaksi sekaligus dalam satu transaksi database
+        (executemany per chunk). Id yang diberikan database diisi ke setiap objek.
+        """
+        ids = []
+        with db_manager.transaction() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(transactions, chunk_size):
+                chunk_ids = cls._insert_values(cursor, [t._values() for t in chunk])
+                for transaction, trans_id in zip(chunk, chunk_ids):
+                    transaction.id = trans_id
+                ids.extend(chunk_ids)
+        return ids
+    
+    @classmethod
+    def bulk_insert_values(cls, rows: Iterable[tuple], chunk_size: int = 10000) -> List[int]:
+        """
+        Seperti bulk_insert, tetapi menerima tuple nilai dengan urutan _values()
+        (type, description, amount, ppn_amount, amount_cents, ppn_amount_cents,
+        tanggal, faktur) sehingga impor massal tidak perlu membuat objek Transaction.
+        """
+        ids = []
+        with db_manager.transaction() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(rows, chunk_size):
+                ids.extend(cls._insert_values(cursor, chunk))
+        return ids
+    
+    @classmethod
+    def _insert_values(cls, cursor, values: List[tuple]) -> range:
+        cursor.executemany(cls._INSERT_SQL, values)
+        # Kunci tulis dipegang selama transaksi, jadi id AUTOINCREMENT berurutan
+        last_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+        return range(last_id - len(values) + 1, last_id + 1)
+    
+    @classmethod
+    def _from_row(cls, row):
+        return cls(*row)
+    
+    @classmethod
+    def iter_where(cls, where: str = None, params: tuple = (), order_by: str = None,
+                   batch_size: int = None) -> Iterator['Transaction']:
+        """
+        Iterasi transaksi secara bertahap (fetchmany) tanpa memuat semuanya ke memori.
+        `where` adalah potongan SQL dengan placeholder '?' untuk `params`.
+        """
+        sql = f'SELECT {cls._COLUMNS} FROM transactions'
+        if where:
+            sql += f' WHERE {where}'
+        if order_by:
+            sql += f' ORDER BY {order_by}'
+        yield from starmap(cls, db_manager.iter_query(sql, params, batch_size))
+    
+    @classmethod
+    def load_batch(cls, where: str = None, params: tuple = (), order_by: str = 'transaction_date, id',
+                   batch_size: int = None) -> 'TransactionBatch':
+        """Muat transaksi ke TransactionBatch (kolom bertipe) tanpa membuat objek per baris"""
+        sql = f'SELECT {cls._BATCH_COLUMNS} FROM transactions'
+        if where:
+            sql += f' WHERE {where}'
+        if order_by:
+            sql += f' ORDER BY {order_by}'
+        batch = TransactionBatch()
+        batch.extend_rows(db_manager.iter_query(sql, params, batch_size))
+        return batch
+    
+    @classmethod
+    def iter_all(cls, batch_size: int = None) -> Iterator['Transaction']:
+        return cls.iter_where(order_by='transaction_date DESC, id DESC', batch_size=batch_size)
     
     @classmethod
     def get_all(cls):
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, type, description, amount, ppn_amount, transaction_date, invoice_number, created_at FROM transactions ORDER BY transaction_date DESC, id DESC')
-        rows = cursor.fetchall()
-        conn.close()
+        return list(cls.iter_all())
+    
+    @classmethod
+    def iter_by_date_range(cls, start: str, end: str, type: str = None,
+                           batch_size: int = None) -> Iterator['Transaction']:
+        """
+        Iterasi transaksi dengan start <= transaction_date < end (YYYY-MM-DD),
+        opsional hanya satu jenis. Filter dijalankan di SQLite memakai indeks
+        idx_transactions_date / idx_transactions_type_date.
+        """
+        if type:
+            return cls.iter_where('type = ? AND transaction_date >= ? AND transaction_date < ?',
+                                  (type, start, end), order_by='transaction_date, id',
+                                  batch_size=batch_size)
+        return cls.iter_where('transaction_date >= ? AND transaction_date < ?',
+                              (start, end), order_by='transaction_date, id',
+                              batch_size=batch_size)
+    
+    @classmethod
+    def get_by_date_range(cls, start: str, end: str, type: str = None):
+        return list(cls.iter_by_date_range(start, end, type))
+    
+    @classmethod
+    def get_by_year(cls, year: int, type: str = None):
+        start, end = get_year_date_range(year)
+        return cls.get_by_date_range(start, end, type)
+    
+    @classmethod
+    def get_by_month(cls, year: int, month: int, type: str = None):
+        start, end = get_month_date_range(year, month)
+        return cls.get_by_date_range(start, end, type)
+    
+    @classmethod
+    def aggregate(cls, year: int = None, month: int = None, type: str = None,
+                  group_by: Sequence[str] = ('type',)) -> List[Dict[str, Any]]:
+        """
+        Jumlahkan transaksi di SQLite dengan satu query GROUP BY.
+        Setiap baris berisi kolom pengelompokan ('type', 'year', 'month')
+        ditambah total_amount, total_ppn dan count. Total dijumlahkan eksak
+        dalam sen (total_amount_cents, total_ppn_cents). `month` hanya berlaku
+        bersama `year`.
+        """
+        unknown = [g for g in group_by if g not in cls._GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"Kolom pengelompokan tidak dikenal: {', '.join(unknown)}")
         
-        transactions = []
-        for row in rows:
-            transaction = cls()
-            transaction.id = row[0]
-            transaction.type = row[1]
-            transaction.description = row[2]
-            transaction.amount = row[3]
-            transaction.ppn_amount = row[4]
-            transaction.transaction_date = row[5]
-            transaction.invoice_number = row[6]
-            transaction.created_at = row[7]
-            transactions.append(transaction)
+        conditions = []
+        params = []
+        if type:
+            conditions.append('type = ?')
+            params.append(type)
+        if year is not None:
+            if month is not None:
+                start, end = get_month_date_range(year, month)
+            else:
+                start, end = get_year_date_range(year)
+            conditions.append('transaction_date >= ? AND transaction_date < ?')
+            params.extend([start, end])
+        
+        group_exprs = [cls._GROUP_COLUMNS[g] for g in group_by]
+        select = ''.join(f'{expr} AS {name}, ' for name, expr in zip(group_by, group_exprs))
+        sql = f'''
+            SELECT {select}COALESCE(SUM(amount_cents), 0), COALESCE(SUM(ppn_amount_cents), 0), COUNT(*)
+            FROM transactions
+        '''
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        if group_by:
+            sql += f" GROUP BY {', '.join(group_exprs)} ORDER BY {', '.join(group_exprs)}"
         
-        return transactions
+        with db_manager.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        
+        result = []
+        key_count = len(group_by)
+        for row in rows:
+            # Tanpa GROUP BY, tabel kosong tetap menghasilkan satu baris dengan count 0
+            if not row[key_count + 2]:
+                continue
+            item = dict(zip(group_by, row[:key_count]))
+            item['total_amount_cents'] = row[key_count]
+            item['total_ppn_cents'] = row[key_count + 1]
+            item['total_amount'] = from_cents(row[key_count])
+            item['total_ppn'] = from_cents(row[key_count + 1])
+            item['count'] = row[key_count + 2]
+            result.append(item)
+        return result
     
     @classmethod
     def get_by_id(cls, trans_id):
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, type, description, amount, ppn_amount, transaction_date, invoice_number, created_at FROM transactions WHERE id=?', (trans_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT {cls._COLUMNS} FROM transactions WHERE id=?', (trans_id,))
+            row = cursor.fetchone()
         
         if row:
-            transaction = cls()
-            transaction.id = row[0]
-            transaction.type = row[1]
-            transaction.description = row[2]
-            transaction.amount = row[3]
-            transaction.ppn_amount = row[4]
-            transaction.transaction_date = row[5]
-            transaction.invoice_number = row[6]
-            transaction.created_at = row[7]
-            return transaction
+            return cls._from_row(row)
         return None
     
     def delete(self):
         if self.id:
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM transactions WHERE id=?', (self.id,))
-            conn.commit()
-            conn.close()
\ No newline at end of file
+            with db_manager.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM transactions WHERE id=?', (self.id,))
+
+class TransactionBatch:
+    """
+    Transaksi dalam bentuk kolom: id, kode jenis dan nilai sen disimpan di
+    array bertipe (8/1 byte per baris), kolom teks tetap berupa list.
+    Objek Transaction hanya dibuat saat diakses per indeks.
+    """
+    
+    __slots__ = ('ids', 'type_codes', 'type_names', '_type_index', 'descriptions', 'amount_cents',
+                 'ppn_amount_cents', 'transaction_dates', 'invoice_numbers', 'created_at')
+    
+    def __init__(self):
+        self.ids = array('q')
+        self.type_codes = array('B')
+        self.type_names: List[str] = []  # kode -> nama jenis, urut kemunculan
+        self._type_index: Dict[str, int] = {}
+        self.descriptions: List[str] = []
+        self.amount_cents = array('q')
+        self.ppn_amount_cents = array('q')
+        self.transaction_dates: List[str] = []
+        self.invoice_numbers: List[Optional[str]] = []
+        self.created_at: List[Optional[str]] = []
+    
+    def type_code(self, type: str) -> int:
+        code = self._type_index.get(type)
+        if code is None:
+            code = self._type_index[type] = len(self.type_names)
+            self.type_names.append(type)
+        return code
+    
+    def extend_rows(self, rows: Iterable[tuple], chunk_size: int = 10000):
+        """Tambahkan baris (id, type, description, amount_cents, ppn_amount_cents, tanggal, faktur, dibuat)"""
+        # Tanggal berulang di banyak baris, jadi disimpan sebagai satu objek string per nilai
+        dates = {}
+        columns = [itemgetter(i) for i in range(8)]
+        for chunk in chunked(rows, chunk_size):
+            # map(itemgetter) per kolom jauh lebih cepat daripada zip(*chunk) untuk chunk besar
+            self.ids.extend(map(columns[0], chunk))
+            self.type_codes.extend(map(self.type_code, map(columns[1], chunk)))
+            self.descriptions.extend(map(columns[2], chunk))
+            self.amount_cents.extend(map(columns[3], chunk))
+            self.ppn_amount_cents.extend(map(columns[4], chunk))
+            self.transaction_dates.extend(dates.setdefault(d, d) for d in map(columns[5], chunk))
+            self.invoice_numbers.extend(map(columns[6], chunk))
+            self.created_at.extend(dates.setdefault(d, d) for d in map(columns[7], chunk))
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __getitem__(self, index: int) -> Transaction:
+        return Transaction(self.ids[index], self.type_names[self.type_codes[index]], self.descriptions[index],
+                           from_cents(self.amount_cents[index]), from_cents(self.ppn_amount_cents[index]),
+                           self.transaction_dates[index], self.invoice_numbers[index], self.created_at[index])
+    
+    def __iter__(self) -> Iterator[Transaction]:
+        for index in range(len(self.ids)):
+            yield self[index]
\ No newline at end of file
@@ -0,0 +1,197 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Sequence, Tuple
+from config.database import db_manager
+from models.employee import Employee
+from models.tax import TaxRecord
+from services.pp21_calculator import PPh21Calculator
+from utils.helpers import chunked
+from utils.money import from_cents
+
+def _compute_chunk(task) -> List[TaxRecord]:
+    """Dijalankan di proses worker: hitung catatan pajak untuk satu potongan pegawai"""
+    calculator, year, month, employees, status_labels, prior = task
+    return PayrollEngine(calculator).compute_records(year, month, employees, status_labels, prior)
+
+class PayrollEngine:
+    """
+    Pemotongan PPh 21 bulanan: Januari-November sesuai metode di profil
+    pegawai (tarif TER, atau PPh 21 progresif setahun dibagi 12) dan
+    rekonsiliasi tarif progresif tahunan pada bulan Desember. Hasil setiap
+    bulan disimpan ke tax_records (periode YYYY-MM), sehingga proses bulan
+    berikutnya hanya menghitung bulan yang baru.
+    """
+    
+    TAX_TYPE = "pph21"
+    NPWP_DISCOUNT = 0.05  # Sama dengan PPh21Calculator.calculate_with_npwp_discount
+    
+    def __init__(self, calculator=PPh21Calculator, workers: int = 1, chunk_size: int = 5000):
+        self.calculator = calculator
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+    
+    @staticmethod
+    def get_period(year: int, month: int) -> str:
+        if not 1 <= month <= 12:
+            raise ValueError(f"Bulan tidak valid: {month}")
+        return f"{year:04d}-{month:02d}"
+    
+    def run_month(self, year: int, month: int, statuses: Dict[int, str] = None,
+                  recompute: bool = False) -> Dict[str, Any]:
+        """
+        Proses PPh 21 satu bulan untuk semua pegawai. Pegawai yang sudah memiliki
+        catatan untuk periode tersebut dilewati kecuali `recompute` bernilai True.
+        `statuses` opsional memetakan id pegawai ke status PTKP ("TK/0", "K/1",
+        "K/I/2"); defaultnya status PTKP di profil pegawai.
+        Dengan workers > 1 perhitungan dibagi per potongan ke beberapa proses.
+        """
+        period = self.get_period(year, month)
+        employees = list(Employee.iter_all())
+        done = TaxRecord.get_employee_ids_for_period(period, self.TAX_TYPE)
+        pending = employees if recompute else [e for e in employees if e.id not in done]
+        
+        statuses = statuses or {}
+        status_labels = [statuses.get(e.id, e.ptkp_status) for e in pending]
+        
+        # Rekonsiliasi Desember butuh total Januari-November dari database
+        prior = {}
+        if month == 12:
+            prior = TaxRecord.sum_by_employee(f"{year:04d}-01", f"{year:04d}-11", self.TAX_TYPE)
+        
+        if self.workers > 1 and len(pending) > self.chunk_size:
+            records = self._compute_parallel(year, month, pending, status_labels, prior)
+        else:
+            records = self.compute_records(year, month, pending, status_labels, prior)
+        
+        # Hapus hasil lama (jika dihitung ulang) dan simpan hasil baru secara atomik
+        with db_manager.transaction():
+            if recompute and done:
+                TaxRecord.delete_for_period(period, [e.id for e in pending if e.id in done], self.TAX_TYPE)
+            TaxRecord.bulk_insert(records)
+        
+        return {
+            'period': period,
+            'method': 'Sesuai profil pegawai' if month < 12 else 'Rekonsiliasi Desember',
+            'processed': len(records),
+            'skipped': len(employees) - len(pending),
+            'total_tax': from_cents(sum(r.tax_amount_cents for r in records))
+        }
+    
+    def run_through(self, year: int, month: int, statuses: Dict[int, str] = None) -> List[Dict[str, Any]]:
+        """Proses semua bulan Januari s.d. `month` yang belum diproses"""
+        return [self.run_month(year, m, statuses) for m in range(1, month + 1)]
+    
+    def compute_records(self, year: int, month: int, employees: Sequence[Employee],
+                        status_labels: Sequence[str],
+                        prior: Dict[int, Tuple[float, float, int]]) -> List[TaxRecord]:
+        """Hitung catatan pajak satu bulan tanpa akses database"""
+        period = self.get_period(year, month)
+        # Tabel tarif sesuai tahun yang diproses
+        calculator = self.calculator.for_year(year)
+        parsed = calculator.parse_ptkp_statuses(status_labels, len(employees))
+        if month == 12:
+            return self._reconcile_december(calculator, employees, status_labels, parsed, year, period, prior)
+        
+        # Kelompokkan per metode profil pegawai; urutan catatan tetap sesuai urutan pegawai
+        groups = {}
+        for i, employee in enumerate(employees):
+            groups.setdefault(employee.pph21_method, []).append(i)
+        records = [None] * len(employees)
+        for method, indexes in groups.items():
+            withhold = self._withhold_ter if method == 'ter' else self._withhold_progressive
+            group_records = withhold(calculator, [employees[i] for i in indexes],
+                                     [status_labels[i] for i in indexes], [parsed[i] for i in indexes], period)
+            for i, record in zip(indexes, group_records):
+                records[i] = record
+        return records
+    
+    def _compute_parallel(self, year: int, month: int, employees: Sequence[Employee],
+                          status_labels: Sequence[str],
+                          prior: Dict[int, Tuple[float, float, int]]) -> List[TaxRecord]:
+        tasks = []
+        for chunk in chunked(range(len(employees)), self.chunk_size):
+            chunk_employees = [employees[i] for i in chunk]
+            chunk_prior = {e.id: prior[e.id] for e in chunk_employees if e.id in prior}
+            tasks.append((self.calculator, year, month, chunk_employees,
+                          [status_labels[i] for i in chunk], chunk_prior))
+        
+        records = []
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # map menjaga urutan potongan sehingga urutan catatan tetap deterministik
+            for chunk_records in executor.map(_compute_chunk, tasks):
+                records.extend(chunk_records)
+        return records
+    
+    def _apply_npwp_discount(self, employee: Employee, tax: float) -> float:
+        return tax - tax * self.NPWP_DISCOUNT if employee.npwp else tax
+    
+    def _withhold_ter(self, calculator, employees: Sequence[Employee], status_labels: Sequence[str],
+                      parsed: Sequence[Tuple[int, bool, bool]], period: str) -> List[TaxRecord]:
+        """Januari-November: bruto bulan ini x tarif TER kategori pegawai"""
+        monthly_gross = [e.monthly_salary + e.allowances for e in employees]
+        rates = calculator.ter_rates_batch(monthly_gross, parsed)
+        
+        records = []
+        for employee, label, gross, rate in zip(employees, status_labels, monthly_gross, rates):
+            records.append(TaxRecord(
+                employee_id=employee.id,
+                period=period,
+                gross_income=gross,
+                taxable_income=gross,
+                tax_amount=self._apply_npwp_discount(employee, gross * rate),
+                tax_type=self.TAX_TYPE,
+                description=f"PPh 21 TER {label} {period} ({rate*100:.2f}%)"
+            ))
+        return records
+    
+    def _withhold_progressive(self, calculator, employees: Sequence[Employee], status_labels: Sequence[str],
+                              parsed: Sequence[Tuple[int, bool, bool]], period: str) -> List[TaxRecord]:
+        """Januari-November untuk metode progresif: PPh 21 setahun dari gaji saat ini dibagi 12"""
+        annual = calculator.calculate_batch(employees, parsed, 'progressive')
+        
+        records = []
+        for i, (employee, label) in enumerate(zip(employees, status_labels)):
+            records.append(TaxRecord(
+                employee_id=employee.id,
+                period=period,
+                gross_income=employee.monthly_salary + employee.allowances,
+                taxable_income=annual['taxable_income'][i] / 12,
+                tax_amount=annual['monthly_final_tax'][i],
+                tax_type=self.TAX_TYPE,
+                description=f"PPh 21 progresif {label} {period}"
+            ))
+        return records
+    
+    def _reconcile_december(self, calculator, employees: Sequence[Employee], status_labels: Sequence[str],
+                            parsed: Sequence[Tuple[int, bool, bool]], year: int, period: str,
+                            prior: Dict[int, Tuple[float, float, int]]) -> List[TaxRecord]:
+        """
+        Desember: PPh 21 setahun dengan tarif progresif dikurangi PPh 21 yang
+        sudah dipotong Januari-November. Bulan yang belum diproses dihitung
+        dengan gaji saat ini.
+        """
+        monthly_gross = [e.monthly_salary + e.allowances for e in employees]
+        
+        annual_gross = []
+        withheld = []
+        for employee, gross in zip(employees, monthly_gross):
+            prior_gross, prior_tax, months = prior.get(employee.id, (0.0, 0.0, 0))
+            annual_gross.append(prior_gross + gross * max(1, 12 - months))
+            withheld.append(prior_tax)
+        
+        annual = calculator.calculate_batch(employees, parsed, 'progressive', gross_income=annual_gross)
+        
+        records = []
+        for i, (employee, label) in enumerate(zip(employees, status_labels)):
+            # Bisa negatif jika pemotongan TER melebihi pajak setahun (lebih bayar)
+            tax_due = annual['final_tax'][i] - withheld[i]
+            records.append(TaxRecord(
+                employee_id=employee.id,
+                period=period,
+                gross_income=monthly_gross[i],
+                taxable_income=annual['taxable_income'][i],
+                tax_amount=tax_due,
+                tax_type=self.TAX_TYPE,
+                description=f"PPh 21 Desember {label} {year} (setahun Rp {annual['final_tax'][i]:,.0f}, "
+                            f"dipotong Jan-Nov Rp {withheld[i]:,.0f})"
+            ))
+        return records
\ No newline at end of file
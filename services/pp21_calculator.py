@@ -1,163 +1,37 @@
-from typing import Dict, List
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+from config.rate_registry import RateSet, rate_registry
 from models.employee import Employee
+from utils.lru_cache import LRUCache
 
 class PPh21Calculator:
-    # PTKP (Penghasilan Tidak Kena Pajak) berdasarkan Excel - Tahun 2024
-    # Sumber: Baris 198-201 dan 204-207 di Excel
-    PTKP_DIRI_SENDIRI = 54000000  # TK/0 atau K/0
-    PTKP_ISTRI = 54000000         # Tambahan untuk K/I/0, K/I/1, K/I/2, K/I/3
-    PTKP_ANAK = 4500000           # Per anak, maksimal 3 anak (Baris 197)
+    # PTKP, tarif progresif tahunan (TAX_RATES: lebar lapisan PKP, tarif) dan tarif
+    # TER bulanan kategori A (TK/*), B (K/*) dan C (K/I/*) dimuat dari
+    # config/tax_rates.json. Atribut kelas berisi set tarif yang berlaku saat ini
+    # (lihat use_rate_set); PPh21Calculator.for_year(tahun) untuk tahun lain.
+    PTKP_DIRI_SENDIRI = 0  # TK/0 atau K/0
+    PTKP_ISTRI = 0         # Tambahan untuk K/0 s.d. K/I/3
+    PTKP_ANAK = 0          # Per anak, maksimal 3 anak (Baris 197)
+    TAX_RATES: List[Tuple[float, float]] = []
+    TER_RATES_A: List[Tuple[float, float]] = []
+    TER_RATES_B: List[Tuple[float, float]] = []
+    TER_RATES_C: List[Tuple[float, float]] = []
+    EFFECTIVE_DATE = None
+
+    # Tabel lapisan kumulatif hasil kompilasi TAX_RATES, dibuat sekali per tabel tarif
+    _bracket_tables: Dict[tuple, Tuple[List[float], List[float], List[float]]] = {}
+    # Tabel TER hasil kompilasi (batas atas, tarif), dibuat sekali per kategori
+    _ter_tables: Dict[tuple, Tuple[List[float], List[float]]] = {}
     
-    # Tarif PPh 21 Progresif Tahunan (berdasarkan UU & PMK terbaru)
-    # Sumber: Sheet1, baris 174-178
-    TAX_RATES = [
-        (60000000, 0.05),    # 5% untuk penghasilan <= 60 juta
-        (190000000, 0.15),   # 15% untuk penghasilan >60jt s.d 250 juta
-        (250000000, 0.25),   # 25% untuk penghasilan >250jt s.d 500 juta
-        (5000000000, 0.30),  # 30% untuk penghasilan >500jt s.d 5 miliar
-        (float('inf'), 0.35) # 35% untuk penghasilan > 5 miliar
-    ]
+    # Versi set tarif, bagian dari kunci cache hasil; berubah setiap set tarif dimuat ulang
+    RATE_TABLE_VERSION = None
+    # Kelas kalkulator per set tarif (lihat for_year)
+    _year_classes: Dict[str, type] = {}
+    # Cache hasil per kombinasi gaji/tunjangan/status PTKP/NPWP/metode
+    result_cache = LRUCache(maxsize=4096)
+    _RESULT_FIELDS = ('gross_income', 'biaya_jabatan', 'net_income', 'ptkp', 'taxable_income',
+                      'tax_amount', 'monthly_tax', 'discount', 'final_tax', 'monthly_final_tax')
     
-    # Tarif TER Bulanan (Tarif Efektif Rata-rata) - Kategori A (TK/0, TK/1, TK/2, TK/3)
-    # Sumber: Sheet1, baris 117-147
-    TER_RATES_A = [
-        (5400000, 0.00),      # 0% untuk <= 5.4 juta
-        (5650000, 0.0025),    # 0.25% untuk >5.4jt s.d 5.65jt
-        (5950000, 0.0050),    # 0.50% untuk >5.65jt s.d 5.95jt
-        (6300000, 0.0075),    # 0.75% untuk >5.95jt s.d 6.3jt
-        (6750000, 0.0100),    # 1% untuk >6.3jt s.d 6.75jt
-        (7500000, 0.0125),    # 1.25% untuk >6.75jt s.d 7.5jt
-        (8550000, 0.0150),    # 1.5% untuk >7.5jt s.d 8.55jt
-        (9650000, 0.0175),    # 1.75% untuk >8.55jt s.d 9.65jt
-        (10050000, 0.0200),   # 2% untuk >9.65jt s.d 10.05jt
-        (10350000, 0.0225),   # 2.25% untuk >10.05jt s.d 10.35jt
-        (10700000, 0.0250),   # 2.5% untuk >10.35jt s.d 10.7jt
-        (11050000, 0.0300),   # 3% untuk >10.7jt s.d 11.05jt
-        (11600000, 0.0350),   # 3.5% untuk >11.05jt s.d 11.6jt
-        (12500000, 0.0400),   # 4% untuk >11.6jt s.d 12.5jt
-        (13750000, 0.0500),   # 5% untuk >12.5jt s.d 13.75jt
-        (15100000, 0.0600),   # 6% untuk >13.75jt s.d 15.1jt
-        (16950000, 0.0700),   # 7% untuk >15.1jt s.d 16.95jt
-        (19750000, 0.0800),   # 8% untuk >16.95jt s.d 19.75jt
-        (24150000, 0.0900),   # 9% untuk >19.75jt s.d 24.15jt
-        (26450000, 0.1000),   # 10% untuk >24.15jt s.d 26.45jt
-        (28000000, 0.1100),   # 11% untuk >26.45jt s.d 28jt
-        (30050000, 0.1200),   # 12% untuk >28jt s.d 30.05jt
-        (32400000, 0.1300),   # 13% untuk >30.05jt s.d 32.4jt
-        (35400000, 0.1400),   # 14% untuk >32.4jt s.d 35.4jt
-        (39100000, 0.1500),   # 15% untuk >35.4jt s.d 39.1jt
-        (43850000, 0.1600),   # 16% untuk >39.1jt s.d 43.85jt
-        (47800000, 0.1700),   # 17% untuk >43.85jt s.d 47.8jt
-        (51400000, 0.1800),   # 18% untuk >47.8jt s.d 51.4jt
-        (56300000, 0.1900),   # 19% untuk >51.4jt s.d 56.3jt
-        (62200000, 0.2000),   # 20% untuk >56.3jt s.d 62.2jt
-        (68600000, 0.2100),   # 21% untuk >62.2jt s.d 68.6jt
-        (77500000, 0.2200),   # 22% untuk >68.6jt s.d 77.5jt
-        (89000000, 0.2300),   # 23% untuk >77.5jt s.d 89jt
-        (103000000, 0.2400),  # 24% untuk >89jt s.d 103jt
-        (125000000, 0.2500),  # 25% untuk >103jt s.d 125jt
-        (157000000, 0.2600),  # 26% untuk >125jt s.d 157jt
-        (206000000, 0.2700),  # 27% untuk >157jt s.d 206jt
-        (337000000, 0.2800),  # 28% untuk >206jt s.d 337jt
-        (454000000, 0.2900),  # 29% untuk >337jt s.d 454jt
-        (550000000, 0.3000),  # 30% untuk >454jt s.d 550jt
-        (695000000, 0.3100),  # 31% untuk >550jt s.d 695jt
-        (910000000, 0.3200),  # 32% untuk >695jt s.d 910jt
-        (1400000000, 0.3300), # 33% untuk >910jt s.d 1.4miliar
-        (float('inf'), 0.3400) # 34% untuk >1.4miliar
-    ]
-
-    # Tarif TER Bulanan - Kategori B (K/0, K/1, K/2, K/3)
-    # Sumber: Sheet1, baris 150-171
-    TER_RATES_B = [
-        (6200000, 0.00),      # 0% untuk <= 6.2 juta
-        (6500000, 0.0025),    # 0.25% untuk >6.2jt s.d 6.5jt
-        (6850000, 0.0050),    # 0.50% untuk >6.5jt s.d 6.85jt
-        (7300000, 0.0075),    # 0.75% untuk >6.85jt s.d 7.3jt
-        (9200000, 0.0100),    # 1% untuk >7.3jt s.d 9.2jt
-        (10750000, 0.0150),   # 1.5% untuk >9.2jt s.d 10.75jt
-        (11250000, 0.0200),   # 2% untuk >10.75jt s.d 11.25jt
-        (11600000, 0.0250),   # 2.5% untuk >11.25jt s.d 11.6jt
-        (12600000, 0.0300),   # 3% untuk >11.6jt s.d 12.6jt
-        (13600000, 0.0400),   # 4% untuk >12.6jt s.d 13.6jt
-        (14950000, 0.0500),   # 5% untuk >13.6jt s.d 14.95jt
-        (16400000, 0.0600),   # 6% untuk >14.95jt s.d 16.4jt
-        (18450000, 0.0700),   # 7% untuk >16.4jt s.d 18.45jt
-        (21850000, 0.0800),   # 8% untuk >18.45jt s.d 21.85jt
-        (26000000, 0.0900),   # 9% untuk >21.85jt s.d 26jt
-        (27700000, 0.1000),   # 10% untuk >26jt s.d 27.7jt
-        (29350000, 0.1100),   # 11% untuk >27.7jt s.d 29.35jt
-        (31450000, 0.1200),   # 12% untuk >29.35jt s.d 31.45jt
-        (33950000, 0.1300),   # 13% untuk >31.45jt s.d 33.95jt
-        (37100000, 0.1400),   # 14% untuk >33.95jt s.d 37.1jt
-        (41100000, 0.1500),   # 15% untuk >37.1jt s.d 41.1jt
-        (45800000, 0.1600),   # 16% untuk >41.1jt s.d 45.8jt
-        (49500000, 0.1700),   # 17% untuk >45.8jt s.d 49.5jt
-        (53800000, 0.1800),   # 18% untuk >49.5jt s.d 53.8jt
-        (58500000, 0.1900),   # 19% untuk >53.8jt s.d 58.5jt
-        (64000000, 0.2000),   # 20% untuk >58.5jt s.d 64jt
-        (71000000, 0.2100),   # 21% untuk >64jt s.d 71jt
-        (80000000, 0.2200),   # 22% untuk >71jt s.d 80jt
-        (93000000, 0.2300),   # 23% untuk >80jt s.d 93jt
-        (109000000, 0.2400),  # 24% untuk >93jt s.d 109jt
-        (129000000, 0.2500),  # 25% untuk >109jt s.d 129jt
-        (163000000, 0.2600),  # 26% untuk >129jt s.d 163jt
-        (211000000, 0.2700),  # 27% untuk >163jt s.d 211jt
-        (374000000, 0.2800),  # 28% untuk >211jt s.d 374jt
-        (459000000, 0.2900),  # 29% untuk >374jt s.d 459jt
-        (555000000, 0.3000),  # 30% untuk >459jt s.d 555jt
-        (704000000, 0.3100),  # 31% untuk >555jt s.d 704jt
-        (957000000, 0.3200),  # 32% untuk >704jt s.d 957jt
-        (1405000000, 0.3300), # 33% untuk >957jt s.d 1.405miliar
-        (float('inf'), 0.3400) # 34% untuk >1.405miliar
-    ]
-
-    # Tarif TER Bulanan - Kategori C (K/I/0, K/I/1, K/I/2, K/I/3)
-    # Sumber: Sheet1, baris 85-115
-    TER_RATES_C = [
-        (6600000, 0.00),      # 0% untuk <= 6.6 juta
-        (6950000, 0.0025),    # 0.25% untuk >6.6jt s.d 6.95jt
-        (7350000, 0.0050),    # 0.50% untuk >6.95jt s.d 7.35jt
-        (7800000, 0.0075),    # 0.75% untuk >7.35jt s.d 7.8jt
-        (8850000, 0.0100),    # 1% untuk >7.8jt s.d 8.85jt
-        (9800000, 0.0125),    # 1.25% untuk >8.85jt s.d 9.8jt
-        (10950000, 0.0200),   # 2% untuk >9.8jt s.d 10.95jt
-        (11200000, 0.0175),   # 1.75% untuk >10.95jt s.d 11.2jt
-        (12050000, 0.0200),   # 2% untuk >11.2jt s.d 12.05jt
-        (12950000, 0.0300),   # 3% untuk >12.05jt s.d 12.95jt
-        (14150000, 0.0400),   # 4% untuk >12.95jt s.d 14.15jt
-        (15550000, 0.0500),   # 5% untuk >14.15jt s.d 15.55jt
-        (17050000, 0.0600),   # 6% untuk >15.55jt s.d 17.05jt
-        (19500000, 0.0700),   # 7% untuk >17.05jt s.d 19.5jt
-        (22700000, 0.0800),   # 8% untuk >19.5jt s.d 22.7jt
-        (26600000, 0.0900),   # 9% untuk >22.7jt s.d 26.6jt
-        (28100000, 0.1000),   # 10% untuk >26.6jt s.d 28.1jt
-        (30100000, 0.1100),   # 11% untuk >28.1jt s.d 30.1jt
-        (32600000, 0.1200),   # 12% untuk >30.1jt s.d 32.6jt
-        (35400000, 0.1300),   # 13% untuk >32.6jt s.d 35.4jt
-        (38900000, 0.1400),   # 14% untuk >35.4jt s.d 38.9jt
-        (43000000, 0.1500),   # 15% untuk >38.9jt s.d 43jt
-        (47400000, 0.1600),   # 16% untuk >43jt s.d 47.4jt
-        (51200000, 0.1700),   # 17% untuk >47.4jt s.d 51.2jt
-        (55800000, 0.1800),   # 18% untuk >51.2jt s.d 55.8jt
-        (60400000, 0.1900),   # 19% untuk >55.8jt s.d 60.4jt
-        (66700000, 0.2000),   # 20% untuk >60.4jt s.d 66.7jt
-        (74500000, 0.2100),   # 21% untuk >66.7jt s.d 74.5jt
-        (83200000, 0.2200),   # 22% untuk >74.5jt s.d 83.2jt
-        (95600000, 0.2300),   # 23% untuk >83.2jt s.d 95.6jt
-        (110000000, 0.2400),  # 24% untuk >95.6jt s.d 110jt
-        (134000000, 0.2500),  # 25% untuk >110jt s.d 134jt
-        (169000000, 0.2600),  # 26% untuk >134jt s.d 169jt
-        (221000000, 0.2700),  # 27% untuk >169jt s.d 221jt
-        (390000000, 0.2800),  # 28% untuk >221jt s.d 390jt
-        (463000000, 0.2900),  # 29% untuk >390jt s.d 463jt
-        (561000000, 0.3000),  # 30% untuk >463jt s.d 561jt
-        (709000000, 0.3100),  # 31% untuk >561jt s.d 709jt
-        (965000000, 0.3200),  # 32% untuk >709jt s.d 965jt
-        (1419000000, 0.3300), # 33% untuk >965jt s.d 1.419miliar
-        (float('inf'), 0.3400) # 34% untuk >1.419miliar
-    ]
-
     def __init__(self, employee: Employee, num_children: int = 0, has_spouse: bool = False, joint_filing: bool = False):
         self.employee = employee
         self.num_children = min(num_children, 3)  # Maksimal 3 anak (Baris 197)
@@ -210,29 +84,7 @@ class PPh21Calculator:
                 'monthly_tax': 0
             }
         
-        tax_amount = 0
-        remaining_pkp = pkp
-        tax_breakdown = []
-        
-        for bracket_limit, rate in self.TAX_RATES:
-            if remaining_pkp <= 0:
-                break
-                
-            taxable_in_bracket = min(remaining_pkp, bracket_limit)
-            tax_in_bracket = taxable_in_bracket * rate
-            tax_amount += tax_in_bracket
-            remaining_pkp -= taxable_in_bracket
-            
-            tax_breakdown.append({
-                'bracket_limit': bracket_limit,
-                'rate': rate,
-                'taxable_amount': taxable_in_bracket,
-                'tax': tax_in_bracket
-            })
-            
-            if bracket_limit == float('inf'):
-                break
-        
+        tax_amount = self.progressive_tax(pkp)
         monthly_tax = tax_amount / 12
         
         return {
@@ -242,10 +94,66 @@ class PPh21Calculator:
             'ptkp': ptkp,
             'taxable_income': pkp,
             'tax_amount': tax_amount,
-            'monthly_tax': monthly_tax,
-            'breakdown': tax_breakdown
+            'monthly_tax': monthly_tax
         }
     
+    @staticmethod
+    def compile_brackets(tax_rates) -> Tuple[List[float], List[float], List[float]]:
+        """
+        Ubah TAX_RATES (lebar lapisan, tarif) menjadi tabel kumulatif:
+        batas bawah setiap lapisan, pajak kumulatif di batas bawah, dan tarif
+        """
+        lower_bounds = []
+        base_taxes = []
+        rates = []
+        lower = 0
+        cumulative_tax = 0
+        for bracket_limit, rate in tax_rates:
+            lower_bounds.append(lower)
+            base_taxes.append(cumulative_tax)
+            rates.append(rate)
+            if bracket_limit == float('inf'):
+                break
+            cumulative_tax += bracket_limit * rate
+            lower += bracket_limit
+        return lower_bounds, base_taxes, rates
+    
+    @classmethod
+    def _get_bracket_table(cls) -> Tuple[List[float], List[float], List[float]]:
+        key = tuple(cls.TAX_RATES)
+        table = cls._bracket_tables.get(key)
+        if table is None:
+            table = cls._bracket_tables[key] = cls.compile_brackets(cls.TAX_RATES)
+        return table
+    
+    @classmethod
+    def progressive_tax(cls, pkp: float) -> float:
+        """PPh 21 tahunan tarif progresif untuk PKP: satu bisect dan satu perkalian"""
+        if pkp <= 0:
+            return 0
+        lower_bounds, base_taxes, rates = cls._get_bracket_table()
+        index = bisect_left(lower_bounds, pkp) - 1
+        return base_taxes[index] + (pkp - lower_bounds[index]) * rates[index]
+    
+    @classmethod
+    def progressive_breakdown(cls, pkp: float) -> List[Dict[str, float]]:
+        """Rincian pajak per lapisan tarif (hanya dibuat saat ditampilkan)"""
+        breakdown = []
+        if pkp <= 0:
+            return breakdown
+        lower_bounds, _, rates = cls._get_bracket_table()
+        last_index = bisect_left(lower_bounds, pkp) - 1
+        for index in range(last_index + 1):
+            upper = lower_bounds[index + 1] if index < last_index else pkp
+            taxable_in_bracket = upper - lower_bounds[index]
+            breakdown.append({
+                'bracket_limit': cls.TAX_RATES[index][0],
+                'rate': rates[index],
+                'taxable_amount': taxable_in_bracket,
+                'tax': taxable_in_bracket * rates[index]
+            })
+        return breakdown
+    
     def calculate_pph21_tax_ter(self) -> Dict[str, float]:
         """Hitung PPh 21 terutang dengan Tarif Efektif Rata-rata (TER)"""
         gross_income = self.calculate_gross_annual_income()
@@ -260,14 +168,7 @@ class PPh21Calculator:
             ter_rates = self.TER_RATES_A
             
         # Cari tarif efektif berdasarkan penghasilan bulanan
-        effective_rate = 0.0
-        for limit, rate in ter_rates:
-            if monthly_gross <= limit:
-                effective_rate = rate
-                break
-        else:
-            # Jika penghasilan melebihi batas tertinggi
-            effective_rate = ter_rates[-1][1] if ter_rates else 0.0
+        effective_rate = self._find_ter_rate(ter_rates, monthly_gross)
         
         tax_amount = gross_income * effective_rate
         monthly_tax = tax_amount / 12
@@ -290,8 +191,92 @@ class PPh21Calculator:
             'method': 'TER'
         }
     
+    @classmethod
+    def _get_ter_table(cls, ter_rates) -> Tuple[List[float], List[float]]:
+        key = tuple(ter_rates)
+        table = cls._ter_tables.get(key)
+        if table is None:
+            table = cls._ter_tables[key] = ([limit for limit, _ in ter_rates], [rate for _, rate in ter_rates])
+        return table
+    
+    @classmethod
+    def _find_ter_rate(cls, ter_rates, monthly_gross: float) -> float:
+        """Cari tarif efektif TER untuk penghasilan bruto bulanan (bisect pada batas atas)"""
+        limits, rates = cls._get_ter_table(ter_rates)
+        index = bisect_left(limits, monthly_gross)
+        if index < len(rates):
+            return rates[index]
+        # Jika penghasilan melebihi batas tertinggi
+        return rates[-1] if rates else 0.0
+    
+    @classmethod
+    def _result_key(cls, monthly_salary: float, allowances: float, status: Tuple[int, bool, bool],
+                    has_npwp: bool, method: str) -> tuple:
+        num_children, has_spouse, joint_filing = status
+        return (monthly_salary, allowances, has_spouse, joint_filing, min(num_children, 3),
+                has_npwp, method, cls.RATE_TABLE_VERSION)
+    
+    @staticmethod
+    def _rate_attributes(rate_set: RateSet) -> Dict[str, object]:
+        return {
+            'PTKP_DIRI_SENDIRI': rate_set.ptkp_self,
+            'PTKP_ISTRI': rate_set.ptkp_spouse,
+            'PTKP_ANAK': rate_set.ptkp_child,
+            'TAX_RATES': rate_set.tax_rates,
+            'TER_RATES_A': rate_set.ter_rates['A'],
+            'TER_RATES_B': rate_set.ter_rates['B'],
+            'TER_RATES_C': rate_set.ter_rates['C'],
+            'EFFECTIVE_DATE': rate_set.effective_date,
+            'RATE_TABLE_VERSION': rate_set.version
+        }
+    
+    @classmethod
+    def use_rate_set(cls, rate_set: RateSet):
+        """Pasang set tarif ke kelas ini dan kompilasi tabelnya"""
+        for name, value in cls._rate_attributes(rate_set).items():
+            setattr(cls, name, value)
+        cls._get_bracket_table()
+        for ter_rates in (cls.TER_RATES_A, cls.TER_RATES_B, cls.TER_RATES_C):
+            cls._get_ter_table(ter_rates)
+    
+    @classmethod
+    def for_year(cls, year: int) -> type:
+        """Kelas kalkulator dengan set tarif untuk tahun tersebut (dibuat sekali per set tarif)"""
+        rate_set = rate_registry.for_year(year)
+        if rate_set.version == PPh21Calculator.RATE_TABLE_VERSION:
+            return PPh21Calculator
+        calculator = PPh21Calculator._year_classes.get(rate_set.version)
+        if calculator is None:
+            calculator = type(PPh21Calculator.__name__, (PPh21Calculator,), {})
+            calculator.use_rate_set(rate_set)
+            PPh21Calculator._year_classes[rate_set.version] = calculator
+        return calculator
+    
+    @classmethod
+    def invalidate_rate_tables(cls):
+        """Muat ulang registry tarif (mis. setelah pengaturan tarif berubah) dan buang tabel kompilasi serta cache"""
+        rate_registry.reload()
+        PPh21Calculator._bracket_tables.clear()
+        PPh21Calculator._ter_tables.clear()
+        PPh21Calculator._year_classes.clear()
+        PPh21Calculator.result_cache.clear()
+        PPh21Calculator.use_rate_set(rate_registry.current())
+    
+    @classmethod
+    def get_cache_stats(cls) -> Dict[str, float]:
+        stats = cls.result_cache.get_stats()
+        stats['rate_table_version'] = cls.RATE_TABLE_VERSION
+        return stats
+    
     def calculate_with_npwp_discount(self, use_ter: bool = False) -> Dict[str, float]:
         """Hitung PPh 21 dengan diskon 5% untuk yang memiliki NPWP"""
+        key = self._result_key(self.employee.monthly_salary, self.employee.allowances,
+                               (self.num_children, self.has_spouse, self.joint_filing),
+                               bool(self.employee.npwp), 'ter' if use_ter else 'progressive')
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        
         if use_ter:
             result = self.calculate_pph21_tax_ter()
         else:
@@ -307,4 +292,190 @@ class PPh21Calculator:
             result['monthly_final_tax'] = result['tax_amount'] / 12
             
         result['use_ter'] = use_ter
-        return result
\ No newline at end of file
+        self.result_cache.put(key, dict(result))
+        return result
+    
+    @staticmethod
+    def parse_ptkp_status(status: str) -> Tuple[int, bool, bool]:
+        """
+        Ubah status PTKP ("TK/0", "K/1", "K/I/2") menjadi
+        (jumlah tanggungan, has_spouse, joint_filing)
+        """
+        parts = status.strip().upper().split('/')
+        try:
+            if len(parts) == 2 and parts[0] in ('TK', 'K'):
+                return min(int(parts[1]), 3), parts[0] == 'K', False
+            if len(parts) == 3 and parts[0] == 'K' and parts[1] == 'I':
+                return min(int(parts[2]), 3), True, True
+        except ValueError:
+            pass
+        raise ValueError(f"Status PTKP tidak valid: {status}")
+    
+    @classmethod
+    def parse_ptkp_statuses(cls, statuses: Sequence, n: int) -> List[Tuple[int, bool, bool]]:
+        """Normalisasi daftar status PTKP (string atau tuple) untuk n pegawai; default TK/0"""
+        if statuses is None:
+            return [(0, False, False)] * n
+        if len(statuses) != n:
+            raise ValueError("Jumlah status PTKP harus sama dengan jumlah pegawai")
+        return [cls.parse_ptkp_status(s) if isinstance(s, str) else s for s in statuses]
+    
+    @classmethod
+    def ter_rates_batch(cls, monthly_gross: Sequence[float],
+                        statuses: Sequence[Tuple[int, bool, bool]]) -> List[float]:
+        """Tarif TER untuk banyak penghasilan bruto bulanan (status PTKP sudah diparse)"""
+        # Tabel TER dikompilasi sekali per kategori, lalu bisect per pegawai
+        ter_tables = [cls._get_ter_table(t) for t in (cls.TER_RATES_A, cls.TER_RATES_B, cls.TER_RATES_C)]
+        effective_rate = []
+        for (_, has_spouse, joint_filing), g in zip(statuses, monthly_gross):
+            limits, rates = ter_tables[2 if joint_filing else 1 if has_spouse else 0]
+            index = bisect_left(limits, g)
+            effective_rate.append(rates[index] if index < len(rates) else rates[-1])
+        return effective_rate
+    
+    @classmethod
+    def calculate_batch(cls, employees: Sequence[Employee], statuses: Sequence = None,
+                        method: Optional[str] = 'progressive',
+                        gross_income: Sequence[float] = None) -> Dict[str, List[float]]:
+        """
+        Hitung PPh 21 untuk banyak pegawai sekaligus secara kolumnar.
+        `statuses` berisi status PTKP ("TK/0", "K/1", "K/I/2") atau tuple
+        (jumlah tanggungan, has_spouse, joint_filing) per pegawai; default
+        status PTKP yang tersimpan di profil pegawai.
+        `method` adalah 'progressive', 'ter', atau None untuk metode di profil
+        pegawai (pph21_method). `gross_income` opsional menggantikan bruto
+        tahunan (gaji + tunjangan) x 12. Hasilnya dict berisi list sejajar
+        dengan urutan `employees`.
+        """
+        if method is None:
+            return cls._calculate_batch_by_profile(employees, statuses, gross_income)
+        if method not in ('progressive', 'ter'):
+            raise ValueError(f"Metode PPh 21 tidak dikenal: {method}")
+        
+        if statuses is None:
+            statuses = [e.ptkp_status for e in employees]
+        parsed = cls.parse_ptkp_statuses(statuses, len(employees))
+        if gross_income is not None:
+            # Bruto khusus (mis. rekonsiliasi Desember) tidak disimpan di cache
+            return cls._compute_batch(employees, parsed, method, gross_income)
+        
+        # Ambil hasil dari cache; kombinasi yang belum ada dihitung sekali per kombinasi
+        keys = [cls._result_key(e.monthly_salary, e.allowances, status, bool(e.npwp), method)
+                for e, status in zip(employees, parsed)]
+        entries = []
+        found = {}
+        missing = {}
+        for i, key in enumerate(keys):
+            entry = found.get(key)
+            if entry is None:
+                if key in missing:
+                    missing[key].append(i)
+                    entries.append(None)
+                    continue
+                entry = cls.result_cache.get(key)
+                if entry is None:
+                    missing[key] = [i]
+                    entries.append(None)
+                    continue
+                found[key] = entry
+            entries.append(entry)
+        
+        if missing:
+            first = [indexes[0] for indexes in missing.values()]
+            columns = cls._compute_batch([employees[i] for i in first], [parsed[i] for i in first], method)
+            for j, (key, indexes) in enumerate(missing.items()):
+                entry = {field: columns[field][j] for field in cls._RESULT_FIELDS}
+                if method == 'ter':
+                    entry['effective_rate'] = columns['effective_rate'][j]
+                    entry['method'] = 'TER'
+                entry['use_ter'] = method == 'ter'
+                cls.result_cache.put(key, entry)
+                for i in indexes:
+                    entries[i] = entry
+        
+        result = {'employee_id': [e.id for e in employees]}
+        for field in cls._RESULT_FIELDS:
+            result[field] = [entry[field] for entry in entries]
+        if method == 'ter':
+            result['effective_rate'] = [entry['effective_rate'] for entry in entries]
+        return result
+    
+    @classmethod
+    def _calculate_batch_by_profile(cls, employees: Sequence[Employee], statuses: Sequence = None,
+                                    gross_income: Sequence[float] = None) -> Dict[str, List[float]]:
+        """
+        calculate_batch per kelompok metode profil pegawai, digabung kembali
+        sesuai urutan `employees`. Kolom 'method' berisi metode tiap pegawai;
+        'effective_rate' bernilai None untuk pegawai metode progresif.
+        """
+        if statuses is None:
+            statuses = [e.ptkp_status for e in employees]
+        parsed = cls.parse_ptkp_statuses(statuses, len(employees))
+        groups = {}
+        for i, employee in enumerate(employees):
+            groups.setdefault(employee.pph21_method, []).append(i)
+        
+        result = {'method': [e.pph21_method for e in employees]}
+        for method, indexes in groups.items():
+            part = cls.calculate_batch([employees[i] for i in indexes], [parsed[i] for i in indexes], method,
+                                       None if gross_income is None else [gross_income[i] for i in indexes])
+            for field, values in part.items():
+                column = result.setdefault(field, [None] * len(employees))
+                for i, value in zip(indexes, values):
+                    column[i] = value
+        if not employees:
+            result.update({field: [] for field in ('employee_id',) + cls._RESULT_FIELDS})
+        return result
+    
+    @classmethod
+    def _compute_batch(cls, employees: Sequence[Employee], parsed: Sequence[Tuple[int, bool, bool]],
+                       method: str, gross_income: Sequence[float] = None) -> Dict[str, List[float]]:
+        """Perhitungan kolumnar tanpa cache"""
+        # PTKP per pegawai
+        ptkp = [
+            cls.PTKP_DIRI_SENDIRI
+            + (cls.PTKP_ISTRI if has_spouse or joint_filing else 0)
+            + cls.PTKP_ANAK * min(num_children, 3)
+            for num_children, has_spouse, joint_filing in parsed
+        ]
+        
+        if gross_income is None:
+            gross_income = [(e.monthly_salary + e.allowances) * 12 for e in employees]
+        else:
+            gross_income = list(gross_income)
+        biaya_jabatan = [min(g * 0.05, 6000000) for g in gross_income]
+        net_income = [g - b for g, b in zip(gross_income, biaya_jabatan)]
+        taxable_income = [max(0, net - p) for net, p in zip(net_income, ptkp)]
+        
+        if method == 'progressive':
+            effective_rate = None
+            progressive_tax = cls.progressive_tax
+            tax_amount = [progressive_tax(pkp) for pkp in taxable_income]
+        else:
+            effective_rate = cls.ter_rates_batch([g / 12 for g in gross_income], parsed)
+            tax_amount = [g * r for g, r in zip(gross_income, effective_rate)]
+        
+        # Diskon 5% untuk pegawai yang memiliki NPWP
+        discount = [t * 0.05 if e.npwp else 0 for t, e in zip(tax_amount, employees)]
+        final_tax = [t - d for t, d in zip(tax_amount, discount)]
+        
+        result = {
+            'employee_id': [e.id for e in employees],
+            'gross_income': gross_income,
+            'biaya_jabatan': biaya_jabatan,
+            'net_income': net_income,
+            'ptkp': ptkp,
+            'taxable_income': taxable_income,
+            'tax_amount': tax_amount,
+            'monthly_tax': [t / 12 for t in tax_amount],
+            'discount': discount,
+            'final_tax': final_tax,
+            'monthly_final_tax': [t / 12 for t in final_tax]
+        }
+        if effective_rate is not None:
+            result['effective_rate'] = effective_rate
+        return result
+
+
+# Set tarif yang berlaku saat ini, dimuat sekali per proses
+PPh21Calculator.use_rate_set(rate_registry.current())
\ No newline at end of file
@@ -1,48 +1,132 @@
-from typing import List, Dict
+import re
+from operator import add, sub
+from typing import Any, Callable, Iterable, List, Dict, Sequence, Tuple
+from config.database import db_manager
+from config.rate_registry import rate_registry
 from models.transaction import Transaction
+from utils.helpers import get_month_date_range, get_year_date_range
+from utils.money import to_cents, from_cents, apply_rate, apply_rate_many, divide_rate, divide_rate_many
 
 class PPNCalculator:
-    # Tarif PPN standar Indonesia (2024)
-    PPN_RATE = 0.11  # 11%
+    # Nomor seri faktur pajak: 3 digit kode transaksi/status, 3 digit kode cabang,
+    # 2 digit tahun, 8 digit nomor urut (010.000-24.00000001) atau 16 digit tanpa pemisah
+    INVOICE_NUMBER_PATTERN = re.compile(r'\d{3}\.\d{3}-\d{2}\.\d{8}|\d{16}')
+    CREDIT_ISSUES = ('no_invoice', 'malformed_invoice', 'duplicate_invoice', 'out_of_period', 'zero_ppn')
     
-    def __init__(self):
-        pass
+    def __init__(self, year: int = None, on_date: str = None):
+        # Tarif PPN mengikuti tanggal transaksi (on_date, YYYY-MM-DD); `year` hanya untuk
+        # rekap tahunan (set tarif akhir tahun). Tanpa keduanya: set tarif saat ini.
+        self.year = year
+        self.on_date = on_date
+    
+    @property
+    def PPN_RATE(self) -> float:
+        """Tarif PPN dari registry tarif (config/tax_rates.json, override AppSettings)"""
+        if self.on_date:
+            return rate_registry.for_date(self.on_date).ppn_rate
+        if self.year is None:
+            return rate_registry.current().ppn_rate
+        return rate_registry.for_year(self.year).ppn_rate
+    
+    def _apply_by_date(self, values: List[int], dates: Sequence[str],
+                       func: Callable[[List[int], float], List[int]]) -> Tuple[List[int], Any]:
+        """
+        func(nilai, tarif) dengan tarif PPN tanggal transaksi tiap baris: baris
+        dikelompokkan per tarif, hasil dikembalikan ke urutan semula.
+        Mengembalikan (hasil, tarif), tarif None jika baris memakai tarif berbeda.
+        """
+        if dates is None:
+            ppn_rate = self.PPN_RATE
+            return func(values, ppn_rate), ppn_rate
+        if len(dates) != len(values):
+            raise ValueError("Jumlah tanggal harus sama dengan jumlah nilai")
+        
+        rates = {}
+        groups = {}
+        for i, transaction_date in enumerate(dates):
+            ppn_rate = rates.get(transaction_date)
+            if ppn_rate is None:
+                ppn_rate = rates[transaction_date] = rate_registry.for_date(transaction_date).ppn_rate
+            groups.setdefault(ppn_rate, []).append(i)
+        if len(groups) <= 1:
+            ppn_rate = next(iter(groups), self.PPN_RATE)
+            return func(values, ppn_rate), ppn_rate
+        
+        result = [0] * len(values)
+        for ppn_rate, indexes in groups.items():
+            for i, value in zip(indexes, func([values[i] for i in indexes], ppn_rate)):
+                result[i] = value
+        return result, None
     
     def calculate_ppn_from_amount(self, amount: float) -> Dict[str, float]:
         """
-        Hitung PPN dari jumlah transaksi
+        Hitung PPN dari jumlah transaksi (eksak dalam sen, dibulatkan ke sen terdekat)
         """
-        ppn_amount = amount * self.PPN_RATE
-        total_amount = amount + ppn_amount
+        ppn_rate = self.PPN_RATE
+        base_cents = to_cents(amount)
+        ppn_cents = apply_rate(base_cents, ppn_rate)
         
         return {
-            'base_amount': amount,
-            'ppn_amount': ppn_amount,
-            'total_amount': total_amount,
-            'ppn_rate': self.PPN_RATE
+            'base_amount': from_cents(base_cents),
+            'ppn_amount': from_cents(ppn_cents),
+            'total_amount': from_cents(base_cents + ppn_cents),
+            'ppn_rate': ppn_rate
         }
     
     def calculate_base_amount_from_total(self, total_amount: float) -> Dict[str, float]:
         """
         Hitung jumlah dasar dari total (digunakan untuk faktur masukan)
         """
-        base_amount = total_amount / (1 + self.PPN_RATE)
-        ppn_amount = total_amount - base_amount
+        ppn_rate = self.PPN_RATE
+        total_cents = to_cents(total_amount)
+        base_cents = divide_rate(total_cents, ppn_rate)
+        
+        return {
+            'base_amount': from_cents(base_cents),
+            'ppn_amount': from_cents(total_cents - base_cents),
+            'total_amount': from_cents(total_cents),
+            'ppn_rate': ppn_rate
+        }
+    
+    def calculate_ppn_batch(self, amounts_cents: Iterable[int], dates: Sequence[str] = None) -> Dict[str, Any]:
+        """
+        Versi kolom calculate_ppn_from_amount: dasar pengenaan dalam sen ->
+        list dasar, PPN dan total dalam sen, dengan pembulatan yang sama.
+        Dengan `dates` (YYYY-MM-DD per baris) tarif mengikuti tanggal transaksi.
+        """
+        base_cents = list(amounts_cents)
+        ppn_cents, ppn_rate = self._apply_by_date(base_cents, dates, apply_rate_many)
         
         return {
-            'base_amount': base_amount,
-            'ppn_amount': ppn_amount,
-            'total_amount': total_amount,
-            'ppn_rate': self.PPN_RATE
+            'base_cents': base_cents,
+            'ppn_cents': ppn_cents,
+            'total_cents': list(map(add, base_cents, ppn_cents)),
+            'ppn_rate': ppn_rate
         }
     
-    def calculate_monthly_ppn_summary(self, transactions: List[Transaction], month: str = None) -> Dict[str, float]:
+    def calculate_base_batch(self, totals_cents: Iterable[int], dates: Sequence[str] = None) -> Dict[str, Any]:
         """
-        Hitung rekap PPN bulanan
+        Versi kolom calculate_base_amount_from_total: total termasuk PPN dalam
+        sen -> list dasar, PPN dan total dalam sen. `dates` seperti calculate_ppn_batch.
         """
-        ppn_masukan = 0.0
-        ppn_keluaran = 0.0
-        total_transaksi = 0.0
+        total_cents = list(totals_cents)
+        base_cents, ppn_rate = self._apply_by_date(total_cents, dates, divide_rate_many)
+        
+        return {
+            'base_cents': base_cents,
+            'ppn_cents': list(map(sub, total_cents, base_cents)),
+            'total_cents': total_cents,
+            'ppn_rate': ppn_rate
+        }
+    
+    def calculate_monthly_ppn_summary(self, transactions: Iterable[Transaction], month: str = None) -> Dict[str, float]:
+        """
+        Hitung rekap PPN bulanan (transaksi dibaca satu kali, boleh berupa iterator).
+        Dijumlahkan dalam sen sehingga hasilnya tidak bergeser karena pembulatan float.
+        """
+        ppn_masukan = 0
+        ppn_keluaran = 0
+        total_transaksi = 0
         
         for transaction in transactions:
             # Filter berdasarkan bulan jika diperlukan
@@ -50,22 +134,56 @@ class PPNCalculator:
                 continue
                 
             if transaction.type == "penjualan":
-                ppn_keluaran += transaction.ppn_amount
+                ppn_keluaran += transaction.ppn_amount_cents
             elif transaction.type == "belanja":
-                ppn_masukan += transaction.ppn_amount
+                ppn_masukan += transaction.ppn_amount_cents
             
-            total_transaksi += transaction.amount
+            total_transaksi += transaction.amount_cents
         
-        ppn_terutang = ppn_keluaran - ppn_masukan
+        return self._summary_from_cents(total_transaksi, ppn_masukan, ppn_keluaran, month)
         
+    @staticmethod
+    def _summary_from_cents(total_transaksi: int, ppn_masukan: int, ppn_keluaran: int,
+                            month: str = None) -> Dict[str, float]:
         return {
-            'total_transaksi': total_transaksi,
-            'ppn_masukan': ppn_masukan,
-            'ppn_keluaran': ppn_keluaran,
-            'ppn_terutang': ppn_terutang,
+            'total_transaksi': from_cents(total_transaksi),
+            'ppn_masukan': from_cents(ppn_masukan),
+            'ppn_keluaran': from_cents(ppn_keluaran),
+            'ppn_terutang': from_cents(ppn_keluaran - ppn_masukan),
             'month': month
         }
     
+    def summarize_ppn_aggregates(self, rows: Iterable[Dict[str, Any]], month: str = None) -> Dict[str, float]:
+        """
+        Susun rekap PPN dari hasil Transaction.aggregate / PPNLedger.aggregate
+        yang dikelompokkan per jenis
+        """
+        ppn_masukan = 0
+        ppn_keluaran = 0
+        total_transaksi = 0
+        
+        for row in rows:
+            if row['type'] == "penjualan":
+                ppn_keluaran += row['total_ppn_cents']
+            elif row['type'] == "belanja":
+                ppn_masukan += row['total_ppn_cents']
+            
+            total_transaksi += row['total_amount_cents']
+        
+        return self._summary_from_cents(total_transaksi, ppn_masukan, ppn_keluaran, month)
+    
+    def summarize_ppn_aggregates_by_month(self, rows: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+        """
+        Rekap PPN per bulan dari hasil Transaction.aggregate(group_by=('month', 'type'))
+        """
+        monthly_rows = {}
+        for row in rows:
+            monthly_rows.setdefault(row['month'], []).append(row)
+        return {
+            month: self.summarize_ppn_aggregates(month_rows, month)
+            for month, month_rows in sorted(monthly_rows.items())
+        }
+    
     def calculate_ppn_credit_eligibility(self, transaction: Transaction) -> bool:
         """
         Cek apakah transaksi memenuhi syarat untuk dikreditkan (PPN Masukan)
@@ -83,4 +201,99 @@ class PPNCalculator:
             return False
         
         # Bisa ditambahkan syarat lain sesuai ketentuan perpajakan
-        return True
\ No newline at end of file
+        return True
+    
+    def validate_credits_batch(self, rows: Iterable[Tuple[int, str, str, int]]) -> Dict[str, Any]:
+        """
+        Validasi PPN Masukan banyak transaksi belanja dalam satu lintasan.
+        `rows` berisi (id, invoice_number, transaction_date, ppn_amount_cents).
+        Faktur duplikat ditemukan lewat indeks hash nomor faktur yang
+        dinormalisasi: kemunculan pertama tetap dapat dikreditkan, berikutnya
+        ditolak. Faktur di luar periode jika tahun pada nomor seri bukan tahun
+        transaksi, kecuali faktur tahun sebelumnya yang dikreditkan pada
+        Januari-Maret (batas pengkreditan 3 masa pajak).
+        """
+        pattern = self.INVOICE_NUMBER_PATTERN.fullmatch
+        issue_ids = {issue: [] for issue in self.CREDIT_ISSUES}
+        first_seen = {}
+        duplicates = {}
+        checked = eligible = 0
+        eligible_cents = ineligible_cents = 0
+        
+        for trans_id, invoice_number, transaction_date, ppn_cents in rows:
+            checked += 1
+            ok = True
+            if invoice_number:
+                invoice_number = invoice_number.strip()
+            if not invoice_number:
+                issue_ids['no_invoice'].append(trans_id)
+                ok = False
+            elif not pattern(invoice_number):
+                issue_ids['malformed_invoice'].append(trans_id)
+                ok = False
+            else:
+                key = invoice_number.replace('.', '').replace('-', '')
+                first_id = first_seen.setdefault(key, trans_id)
+                if first_id != trans_id:
+                    duplicates.setdefault(key, [first_id]).append(trans_id)
+                    issue_ids['duplicate_invoice'].append(trans_id)
+                    ok = False
+                
+                # Tanggal YYYY-MM-DD; tahun faktur dari digit ke-7 dan ke-8 nomor seri
+                invoice_year = 2000 + int(key[6:8])
+                transaction_date = transaction_date or ''
+                trans_year = int(transaction_date[:4]) if transaction_date[:4].isdigit() else None
+                if trans_year != invoice_year and not (
+                        trans_year == invoice_year + 1 and transaction_date[5:7] <= '03'):
+                    issue_ids['out_of_period'].append(trans_id)
+                    ok = False
+            
+            if not ppn_cents or ppn_cents <= 0:
+                issue_ids['zero_ppn'].append(trans_id)
+                ok = False
+            
+            if ok:
+                eligible += 1
+                eligible_cents += ppn_cents
+            elif ppn_cents:
+                ineligible_cents += ppn_cents
+        
+        return {
+            'checked': checked,
+            'eligible': eligible,
+            'ineligible': checked - eligible,
+            'eligible_ppn_cents': eligible_cents,
+            'ineligible_ppn_cents': ineligible_cents,
+            'eligible_ppn': from_cents(eligible_cents),
+            'ineligible_ppn': from_cents(ineligible_cents),
+            'issues': {issue: len(ids) for issue, ids in issue_ids.items()},
+            'issue_ids': issue_ids,
+            # nomor faktur (16 digit) -> id transaksi, kemunculan pertama di depan
+            'duplicates': duplicates
+        }
+    
+    def validate_period_credits(self, year: int = None, month: int = None) -> Dict[str, Any]:
+        """
+        Validasi PPN Masukan semua transaksi belanja dalam satu periode
+        (tahun, bulan, atau seluruh data). Hanya empat kolom yang dibaca,
+        bertahap per batch, sehingga jutaan baris tidak dimuat sebagai objek.
+        `month` hanya berlaku bersama `year`.
+        """
+        if month and year is None:
+            raise ValueError("Bulan validasi PPN Masukan harus disertai tahun")
+        sql = '''
+            SELECT id, invoice_number, transaction_date, ppn_amount_cents
+            FROM transactions
+            WHERE type = 'belanja'
+        '''
+        params = ()
+        if year is not None:
+            sql += ' AND transaction_date >= ? AND transaction_date < ?'
+            params = get_month_date_range(year, month) if month else get_year_date_range(year)
+        # Urutan indeks (type, transaction_date) tanpa sort tambahan: kemunculan pertama
+        # faktur duplikat adalah transaksi dengan tanggal paling awal
+        sql += ' ORDER BY transaction_date, id'
+        
+        report = self.validate_credits_batch(db_manager.iter_query(sql, params))
+        report['period'] = (f"{year:04d}-{month:02d}" if month else f"{year:04d}") if year else 'semua'
+        return report
\ No newline at end of file
@@ -0,0 +1,68 @@
+import json
+from typing import Any, Callable, Dict, Sequence
+from config.database import db_manager
+from config.rate_registry import rate_registry
+
+class ReportCache:
+    """
+    Hasil laporan per tahun yang disimpan di tabel report_cache (migrasi
+    versi 5). Setiap hasil diberi stamp: versi data tahun tersebut dan
+    data semua tahun (data_versions, dinaikkan trigger transaksi, catatan
+    pajak dan pegawai) ditambah sidik set tarif tahun itu. Hasil dipakai
+    ulang selama stamp sama, juga antar sesi aplikasi.
+    """
+    
+    TABLE = 'report_cache'
+    
+    def __init__(self, report: str, format_version: int = 1):
+        self.report = report
+        # Naikkan jika bentuk hasil laporan berubah agar cache lama tidak dipakai
+        self.format_version = format_version
+    
+    def stamp(self, year: int) -> str:
+        with db_manager.connection() as conn:
+            versions = dict(conn.execute(
+                "SELECT scope, version FROM data_versions WHERE scope IN (?, '*')", (f"{year:04d}",)
+            ).fetchall())
+        return (f"v{self.format_version}:{versions.get(f'{year:04d}', 0)}:{versions.get('*', 0)}:"
+                f"{rate_registry.for_year(year).fingerprint}")
+    
+    def get(self, year: int, stamp: str = None) -> Dict[str, Any]:
+        """Hasil tersimpan jika stamp-nya masih berlaku, selain itu None"""
+        stamp = stamp or self.stamp(year)
+        with db_manager.connection() as conn:
+            row = conn.execute(
+                f'SELECT payload FROM {self.TABLE} WHERE report = ? AND year = ? AND stamp = ?',
+                (self.report, year, stamp)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def put(self, year: int, stamp: str, payload: Dict[str, Any]):
+        with db_manager.transaction() as conn:
+            conn.execute(f'''
+                INSERT INTO {self.TABLE} (report, year, stamp, payload, created_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (report, year) DO UPDATE SET
+                    stamp = excluded.stamp, payload = excluded.payload, created_at = excluded.created_at
+            ''', (self.report, year, stamp, json.dumps(payload)))
+    
+    def get_or_build(self, year: int, build: Callable[[int], Dict[str, Any]],
+                     refresh: bool = False, transient: Sequence[str] = ()) -> Dict[str, Any]:
+        """
+        Ambil hasil dari cache atau bangun dengan build(year) lalu simpan.
+        Kunci `transient` (mis. waktu penyusunan) hanya ada pada hasil yang
+        baru dibangun dan tidak ikut disimpan.
+        Stamp dibaca sebelum membangun: jika data berubah selama laporan
+        dibangun, hasil tersimpan dengan stamp lama dan dibangun ulang berikutnya.
+        """
+        stamp = self.stamp(year)
+        if not refresh:
+            cached = self.get(year, stamp)
+            if cached is not None:
+                cached['cached'] = True
+                return cached
+        
+        result = build(year)
+        self.put(year, stamp, {key: value for key, value in result.items() if key not in transient})
+        result['cached'] = False
+        return result
\ No newline at end of file
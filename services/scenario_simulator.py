@@ -0,0 +1,143 @@
+from itertools import product
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from models.employee import Employee
+from services.pp21_calculator import PPh21Calculator
+
+class Scenario:
+    """
+    Penyesuaian parametrik gaji/tunjangan untuk simulasi PPh 21.
+    Persentase dalam pecahan (0.08 = naik 8%), delta dalam rupiah per bulan.
+    Filter opsional membatasi pegawai yang terkena penyesuaian.
+    """
+    
+    def __init__(self, name: str, salary_pct: float = 0.0, allowance_pct: float = 0.0,
+                 salary_delta: float = 0.0, allowance_delta: float = 0.0,
+                 employment_status: Optional[str] = None, marital_status: Optional[str] = None,
+                 min_salary: Optional[float] = None, max_salary: Optional[float] = None,
+                 method: str = 'progressive'):
+        self.name = name
+        self.salary_pct = salary_pct
+        self.allowance_pct = allowance_pct
+        self.salary_delta = salary_delta
+        self.allowance_delta = allowance_delta
+        self.employment_status = employment_status  # tetap/tidak_tetap
+        self.marital_status = marital_status  # TK/K/K/I
+        self.min_salary = min_salary
+        self.max_salary = max_salary
+        self.method = method
+    
+    def applies_to(self, employee: Employee) -> bool:
+        if self.employment_status and employee.status != self.employment_status:
+            return False
+        if self.marital_status and employee.marital_status != self.marital_status:
+            return False
+        if self.min_salary is not None and employee.monthly_salary < self.min_salary:
+            return False
+        if self.max_salary is not None and employee.monthly_salary > self.max_salary:
+            return False
+        return True
+    
+    def adjust(self, monthly_salary: float, allowances: float) -> float:
+        """Bruto bulanan setelah penyesuaian"""
+        salary = monthly_salary * (1 + self.salary_pct) + self.salary_delta
+        allowance = allowances * (1 + self.allowance_pct) + self.allowance_delta
+        return max(0.0, salary) + max(0.0, allowance)
+
+
+class ScenarioSimulator:
+    """
+    Evaluasi banyak skenario terhadap snapshot pegawai di memori tanpa
+    menyentuh database. Pegawai dengan profil identik (status kepegawaian,
+    gaji, tunjangan, status PTKP, NPWP) dihitung sekali lalu dikalikan jumlahnya.
+    """
+    
+    def __init__(self, employees: Iterable[Employee] = None, calculator=PPh21Calculator):
+        self.calculator = calculator
+        if employees is None:
+            employees = Employee.iter_all()
+        
+        # Kelompokkan snapshot menjadi profil unik beserta jumlah pegawainya
+        profiles = {}
+        for employee in employees:
+            key = (employee.status, employee.marital_status, employee.monthly_salary,
+                   employee.allowances, min(employee.dependants, 3), bool(employee.npwp))
+            if key in profiles:
+                profiles[key][1] += 1
+            else:
+                profiles[key] = [employee, 1]
+        
+        self.profiles: List[Employee] = [p[0] for p in profiles.values()]
+        self.counts: List[int] = [p[1] for p in profiles.values()]
+        self.statuses = self.calculator.parse_ptkp_statuses(
+            [e.ptkp_status for e in self.profiles], len(self.profiles)
+        )
+        self.employee_count = sum(self.counts)
+        self._baseline = {}
+    
+    def _annual_tax(self, indexes: Sequence[int], monthly_gross: Sequence[float], method: str) -> List[float]:
+        result = self.calculator.calculate_batch(
+            [self.profiles[i] for i in indexes],
+            [self.statuses[i] for i in indexes],
+            method,
+            gross_income=[g * 12 for g in monthly_gross]
+        )
+        return result['final_tax']
+    
+    def baseline(self, method: str = 'progressive') -> List[float]:
+        """PPh 21 tahunan per profil tanpa penyesuaian (dihitung sekali per metode)"""
+        if method not in self._baseline:
+            self._baseline[method] = self._annual_tax(
+                range(len(self.profiles)),
+                [e.monthly_salary + e.allowances for e in self.profiles],
+                method
+            )
+        return self._baseline[method]
+    
+    def evaluate(self, scenario: Scenario) -> Dict[str, Any]:
+        """Bandingkan total PPh 21 dan bruto skenario dengan kondisi saat ini"""
+        base_tax = self.baseline(scenario.method)
+        matched = [i for i, e in enumerate(self.profiles) if scenario.applies_to(e)]
+        adjusted_gross = [scenario.adjust(self.profiles[i].monthly_salary, self.profiles[i].allowances)
+                          for i in matched]
+        new_tax = self._annual_tax(matched, adjusted_gross, scenario.method) if matched else []
+        
+        baseline_total = sum(t * c for t, c in zip(base_tax, self.counts))
+        baseline_gross = sum((e.monthly_salary + e.allowances) * 12 * c
+                             for e, c in zip(self.profiles, self.counts))
+        scenario_total = baseline_total
+        scenario_gross = baseline_gross
+        affected = 0
+        for i, gross, tax in zip(matched, adjusted_gross, new_tax):
+            count = self.counts[i]
+            profile = self.profiles[i]
+            affected += count
+            scenario_total += (tax - base_tax[i]) * count
+            scenario_gross += (gross - profile.monthly_salary - profile.allowances) * 12 * count
+        
+        difference = scenario_total - baseline_total
+        return {
+            'scenario': scenario.name,
+            'method': scenario.method,
+            'employees': self.employee_count,
+            'employees_affected': affected,
+            'baseline_gross': baseline_gross,
+            'scenario_gross': scenario_gross,
+            'baseline_total_tax': baseline_total,
+            'scenario_total_tax': scenario_total,
+            'difference': difference,
+            'difference_pct': difference / baseline_total if baseline_total else 0.0
+        }
+    
+    def sweep(self, scenarios: Iterable[Scenario]) -> List[Dict[str, Any]]:
+        """Evaluasi banyak skenario sekaligus terhadap snapshot yang sama"""
+        return [self.evaluate(scenario) for scenario in scenarios]
+    
+    @staticmethod
+    def build_grid(salary_pcts: Sequence[float] = (0.0,), allowance_pcts: Sequence[float] = (0.0,),
+                   **filters) -> List[Scenario]:
+        """Buat skenario untuk setiap kombinasi persentase kenaikan gaji dan tunjangan"""
+        return [
+            Scenario(f"gaji {salary_pct*100:+.1f}% / tunjangan {allowance_pct*100:+.1f}%",
+                     salary_pct=salary_pct, allowance_pct=allowance_pct, **filters)
+            for salary_pct, allowance_pct in product(salary_pcts, allowance_pcts)
+        ]
\ No newline at end of file
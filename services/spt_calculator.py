@@ -1,30 +1,40 @@
-from typing import List, Dict
+from datetime import datetime
+from time import perf_counter
+from typing import Any, Callable, List, Dict, Sequence
 from models.employee import Employee
-from models.transaction import Transaction
+from models.ppn_ledger import PPNLedger
 from models.tax import TaxRecord
 from services.pp21_calculator import PPh21Calculator
 from services.ppn_calculator import PPNCalculator
+from services.report_cache import ReportCache
+from config.rate_registry import rate_registry
+from utils.money import to_cents, from_cents, apply_rate, sum_cents
 
 class SPTCalculator:
     def __init__(self):
         self.pph21_calculator = PPh21Calculator
         self.ppn_calculator = PPNCalculator()
+        # Versi 2: 'timings' tidak lagi disimpan di cache
+        self.report_cache = ReportCache('spt_annual', format_version=2)
     
-    def calculate_annual_income_summary(self, year: int = 2024) -> Dict[str, float]:
+    def load_type_totals(self, year: int) -> Dict[str, Dict[str, Any]]:
+        """Total setahun per jenis transaksi dari ledger bulanan (maksimal 12 baris per jenis)"""
+        return {row['type']: row for row in PPNLedger.aggregate(year=year, group_by=('type',))}
+    
+    def calculate_annual_income_summary(self, year: int = 2024,
+                                        type_totals: Dict[str, Dict[str, Any]] = None) -> Dict[str, float]:
         """
-        Hitung rekap penghasilan tahunan untuk SPT
+        Hitung rekap penghasilan tahunan untuk SPT. `type_totals` (hasil
+        load_type_totals) boleh diberikan agar ledger tidak dibaca ulang.
         """
-        # Ambil semua transaksi untuk tahun tertentu
-        all_transactions = Transaction.get_all()
-        year_transactions = [t for t in all_transactions if t.transaction_date.startswith(str(year))]
-        
-        # Hitung total penjualan
-        total_sales = sum(t.amount for t in year_transactions if t.type == "penjualan")
-        total_sales_ppn = sum(t.ppn_amount for t in year_transactions if t.type == "penjualan")
-        
-        # Hitung total belanja
-        total_purchases = sum(t.amount for t in year_transactions if t.type == "belanja")
-        total_purchases_ppn = sum(t.ppn_amount for t in year_transactions if t.type == "belanja")
+        totals = type_totals if type_totals is not None else self.load_type_totals(year)
+        sales = totals.get("penjualan", {})
+        purchases = totals.get("belanja", {})
+        # Dihitung dalam sen agar selisih penjualan dan belanja eksak
+        total_sales = sales.get('total_amount_cents', 0)
+        total_sales_ppn = sales.get('total_ppn_cents', 0)
+        total_purchases = purchases.get('total_amount_cents', 0)
+        total_purchases_ppn = purchases.get('total_ppn_cents', 0)
         
         # Hitung penghasilan bruto
         gross_income = total_sales
@@ -37,52 +47,47 @@ class SPTCalculator:
         
         return {
             'year': year,
-            'total_sales': total_sales,
-            'total_sales_ppn': total_sales_ppn,
-            'total_purchases': total_purchases,
-            'total_purchases_ppn': total_purchases_ppn,
-            'gross_income': gross_income,
-            'business_expenses': business_expenses,
-            'net_income': net_income
+            'total_sales': from_cents(total_sales),
+            'total_sales_ppn': from_cents(total_sales_ppn),
+            'total_purchases': from_cents(total_purchases),
+            'total_purchases_ppn': from_cents(total_purchases_ppn),
+            'gross_income': from_cents(gross_income),
+            'business_expenses': from_cents(business_expenses),
+            'net_income': from_cents(net_income)
         }
     
-    def calculate_employee_pph21_summary(self, year: int = 2024) -> Dict[str, float]:
+    def calculate_employee_pph21_summary(self, year: int = 2024,
+                                         employees: Sequence[Employee] = None) -> Dict[str, float]:
         """
-        Hitung rekap PPh 21 pegawai untuk SPT
+        Hitung rekap PPh 21 pegawai untuk SPT (pegawai dibaca sekali jika tidak diberikan)
         """
-        employees = Employee.get_all()
-        total_gross_salary = 0
-        total_allowances = 0
-        total_pph21 = 0
-        
-        for employee in employees:
-            # Untuk SPT, gunakan metode progresif sebagai default
-            # Dalam praktiknya, ini bisa disesuaikan berdasarkan metode yang digunakan perusahaan
-            calculator = self.pph21_calculator(employee, 0, False, False)  # Default TK/0
-            pph21_result = calculator.calculate_with_npwp_discount(False)  # Metode progresif
-            total_pph21 += pph21_result['final_tax']
+        if employees is None:
+            employees = list(Employee.iter_all())
+        
+        # Untuk SPT, gunakan metode progresif dengan status PTKP dari profil pegawai
+        # Dalam praktiknya, ini bisa disesuaikan berdasarkan metode yang digunakan perusahaan
+        pph21_batch = self.pph21_calculator.for_year(year).calculate_batch(employees, method='progressive')
             
-            # Tambahkan penghasilan untuk rekap
-            total_gross_salary += employee.monthly_salary * 12
-            total_allowances += employee.allowances * 12
+        total_employees = len(employees)
+        total_gross_salary = sum_cents(e.monthly_salary for e in employees) * 12
+        total_allowances = sum_cents(e.allowances for e in employees) * 12
+        total_pph21 = sum_cents(pph21_batch['final_tax'])
         
         return {
             'year': year,
-            'total_employees': len(employees),
-            'total_gross_salary': total_gross_salary,
-            'total_allowances': total_allowances,
-            'total_pph21_withheld': total_pph21
+            'total_employees': total_employees,
+            'total_gross_salary': from_cents(total_gross_salary),
+            'total_allowances': from_cents(total_allowances),
+            'total_pph21_withheld': from_cents(total_pph21)
         }
     
-    def calculate_ppn_summary(self, year: int = 2024) -> Dict[str, float]:
+    def calculate_ppn_summary(self, year: int = 2024,
+                              type_totals: Dict[str, Dict[str, Any]] = None) -> Dict[str, float]:
         """
-        Hitung rekap PPN untuk SPT
+        Hitung rekap PPN untuk SPT dari total per jenis transaksi (sama dengan rekap penghasilan)
         """
-        all_transactions = Transaction.get_all()
-        year_transactions = [t for t in all_transactions if t.transaction_date.startswith(str(year))]
-        
-        # Gunakan PPN calculator untuk rekap
-        ppn_summary = self.ppn_calculator.calculate_monthly_ppn_summary(year_transactions)
+        totals = type_totals if type_totals is not None else self.load_type_totals(year)
+        ppn_summary = self.ppn_calculator.summarize_ppn_aggregates(totals.values())
         
         return {
             'year': year,
@@ -92,40 +97,76 @@ class SPTCalculator:
             'ppn_payable': ppn_summary['ppn_terutang']
         }
     
+    @staticmethod
+    def _timed(timings: Dict[str, float], section: str, func: Callable, *args) -> Any:
+        start = perf_counter()
+        result = func(*args)
+        timings[section] = round((perf_counter() - start) * 1000, 3)
+        return result
+    
     def generate_spt_annual_report(self, year: int = 2024) -> Dict[str, any]:
         """
-        Generate laporan SPT tahunan lengkap
+        Generate laporan SPT tahunan lengkap. Setiap sumber data dibaca satu
+        kali (ledger transaksi, tabel pegawai) lalu dipakai bersama oleh semua
+        bagian; waktu tiap langkah (ms) dicatat di 'timings'.
         """
-        # Hitung komponen-komponen SPT
-        income_summary = self.calculate_annual_income_summary(year)
-        employee_summary = self.calculate_employee_pph21_summary(year)
-        ppn_summary = self.calculate_ppn_summary(year)
+        timings = {}
+        type_totals = self._timed(timings, 'load_transactions', self.load_type_totals, year)
+        employees = self._timed(timings, 'load_employees', Employee.get_all)
+        
+        # Hitung komponen-komponen SPT dari data yang sudah dimuat
+        income_summary = self._timed(timings, 'income_summary', self.calculate_annual_income_summary,
+                                     year, type_totals)
+        employee_summary = self._timed(timings, 'employee_summary', self.calculate_employee_pph21_summary,
+                                       year, employees)
+        ppn_summary = self._timed(timings, 'ppn_summary', self.calculate_ppn_summary, year, type_totals)
+        tax_calculation = self._timed(timings, 'tax_calculation', self.calculate_tax_payable,
+                                      year, income_summary, employee_summary)
+        timings['total'] = round(sum(timings.values()), 3)
         
-        # Hitung pajak terutang
+        return {
+            'year': year,
+            'income_summary': income_summary,
+            'employee_summary': employee_summary,
+            'ppn_summary': ppn_summary,
+            'tax_calculation': tax_calculation,
+            'timings': timings,
+            'generated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+    
+    def get_spt_annual_report(self, year: int = 2024, refresh: bool = False) -> Dict[str, any]:
+        """
+        Laporan SPT tahunan dari cache selama data tahun tersebut, data pegawai
+        dan tarifnya tidak berubah; selain itu dibangun ulang dan disimpan.
+        'cached' menandai asal hasil, 'generated_at' waktu laporan dibangun.
+        'timings' hanya ada jika laporan baru dibangun pada panggilan ini.
+        """
+        return self.report_cache.get_or_build(year, self.generate_spt_annual_report, refresh,
+                                              transient=('timings',))
+    
+    def calculate_tax_payable(self, year: int, income_summary: Dict[str, float],
+                              employee_summary: Dict[str, float]) -> Dict[str, float]:
+        """
+        Hitung PPh Badan terutang dari rekap penghasilan dan PPh 21 yang sudah dipotong
+        """
         total_taxable_income = income_summary['net_income']
-        # Untuk sederhana, kita asumsikan tarif pajak 25% untuk badan
-        corporate_tax_rate = 0.25
-        corporate_tax_payable = max(0, total_taxable_income * corporate_tax_rate)
+        # Tarif pajak badan dari set tarif tahun tersebut (config/tax_rates.json / AppSettings)
+        corporate_tax_rate = rate_registry.for_year(year).corporate_tax_rate
+        corporate_tax_cents = max(0, apply_rate(to_cents(total_taxable_income), corporate_tax_rate))
+        corporate_tax_payable = from_cents(corporate_tax_cents)
         
         # Hitung pajak yang sudah dibayar (PPh 21 dipotong)
         tax_paid = employee_summary['total_pph21_withheld']
         
         # Hitung pajak terutang bersih
-        net_tax_payable = max(0, corporate_tax_payable - tax_paid)
+        net_tax_payable = from_cents(max(0, corporate_tax_cents - to_cents(tax_paid)))
         
         return {
-            'year': year,
-            'income_summary': income_summary,
-            'employee_summary': employee_summary,
-            'ppn_summary': ppn_summary,
-            'tax_calculation': {
-                'taxable_income': total_taxable_income,
-                'corporate_tax_rate': corporate_tax_rate,
-                'corporate_tax_payable': corporate_tax_payable,
-                'tax_paid': tax_paid,
-                'net_tax_payable': net_tax_payable
-            },
-            'generated_at': __import__('datetime').datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            'taxable_income': total_taxable_income,
+            'corporate_tax_rate': corporate_tax_rate,
+            'corporate_tax_payable': corporate_tax_payable,
+            'tax_paid': tax_paid,
+            'net_tax_payable': net_tax_payable
         }
     
     def get_tax_payment_schedule(self, year: int = 2024) -> List[Dict[str, any]]:
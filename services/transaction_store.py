@@ -0,0 +1,213 @@
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime
+from heapq import nlargest
+from itertools import accumulate, compress, islice
+from operator import itemgetter, le
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from models.transaction import Transaction, TransactionBatch
+from utils.helpers import get_year_date_range
+from utils.money import from_cents
+
+class _DayOrdinals(dict):
+    """
+    Cache tanggal YYYY-MM-DD -> nomor hari; tanggal yang sama hanya diurai sekali.
+    Nilai dengan jam ('YYYY-MM-DD HH:MM:SS') memakai bagian tanggalnya, seperti
+    filter substr(transaction_date, ...) di SQL. Nilai kosong/format lain -> None.
+    """
+    
+    def __missing__(self, value: str) -> Optional[int]:
+        try:
+            day = datetime.strptime(value[:10], '%Y-%m-%d').toordinal()
+        except (TypeError, ValueError):
+            day = None
+        self[value] = day
+        return day
+
+
+class TransactionStore:
+    """
+    Salinan kolom transaksi di memori untuk analitik: tanggal sebagai nomor
+    hari (date.toordinal), jenis sebagai kode kecil, nilai dalam sen (int64).
+    Baris diurutkan per (jenis, tanggal, id) sehingga setiap kelompok
+    jenis/bulan/tahun adalah potongan berurutan yang dicari dengan bisect
+    dan dijumlahkan dari jumlah kumulatif dalam waktu konstan.
+    """
+    
+    _GROUP_KEYS = ('type', 'year', 'month')
+    _VALUE_COLUMNS = ('amount', 'ppn')
+    
+    def __init__(self):
+        self.ids = array('q')
+        self.days = array('l')
+        self.amount_cents = array('q')
+        self.ppn_amount_cents = array('q')
+        self.type_names: List[str] = []  # kode -> nama jenis (urut abjad)
+        self.type_ranges: List[Tuple[int, int]] = []  # kode -> potongan [awal, akhir)
+        self.undated_ids = array('q')  # baris tanpa tanggal valid, tidak ikut rekap
+        self._prefix: Dict[str, array] = {}
+    
+    @classmethod
+    def load(cls, year: int = None, batch_size: int = None) -> 'TransactionStore':
+        """Muat transaksi (opsional satu tahun) lewat Transaction.load_batch"""
+        where = None
+        params = ()
+        if year is not None:
+            where = 'transaction_date >= ? AND transaction_date < ?'
+            params = get_year_date_range(year)
+        # Tanpa ORDER BY: membaca tabel berurutan jauh lebih cepat daripada lewat indeks,
+        # pengurutan dilakukan sekali di memori
+        return cls.from_batch(Transaction.load_batch(where, params, order_by=None, batch_size=batch_size))
+    
+    @classmethod
+    def from_batch(cls, batch: TransactionBatch) -> 'TransactionStore':
+        """
+        Bangun store dari kolom TransactionBatch. Baris dengan tanggal kosong
+        atau berformat lama tidak bisa ditempatkan di potongan waktu: id-nya
+        dicatat di undated_ids dan barisnya dilewati.
+        """
+        ordinals = _DayOrdinals()
+        days = list(map(ordinals.__getitem__, batch.transaction_dates))
+        codes = batch.type_codes
+        undated = [i for i, day in enumerate(days) if day is None]
+        
+        # Susun ulang per jenis (urut abjad), lalu per tanggal di dalam jenis.
+        # Urutan id dari tabel tetap terjaga karena pengurutan stabil; data yang
+        # dicatat kronologis sudah urut tanggal sehingga pengurutan dilewati.
+        store = cls()
+        store.undated_ids = array('q', map(batch.ids.__getitem__, undated))
+        order = []
+        for code, type_name in sorted(enumerate(batch.type_names), key=itemgetter(1)):
+            indexes = list(compress(range(len(codes)), map(code.__eq__, codes)))
+            if undated:
+                indexes = [i for i in indexes if days[i] is not None]
+                if not indexes:
+                    continue
+            type_days = list(map(days.__getitem__, indexes))
+            if not all(map(le, type_days, islice(type_days, 1, None))):
+                indexes = [indexes[i] for i in sorted(range(len(indexes)), key=type_days.__getitem__)]
+            store.type_names.append(type_name)
+            store.type_ranges.append((len(order), len(order) + len(indexes)))
+            order.extend(indexes)
+        
+        store.ids = array('q', map(batch.ids.__getitem__, order))
+        store.days = array('l', map(days.__getitem__, order))
+        store.amount_cents = array('q', map(batch.amount_cents.__getitem__, order))
+        store.ppn_amount_cents = array('q', map(batch.ppn_amount_cents.__getitem__, order))
+        return store
+    
+    def _prefix_sums(self, column: str) -> array:
+        """Jumlah kumulatif kolom nilai (dibuat sekali), sehingga total potongan [lo, hi) = p[hi] - p[lo]"""
+        prefix = self._prefix.get(column)
+        if prefix is None:
+            prefix = array('q', [0])
+            prefix.extend(accumulate(getattr(self, column)))
+            self._prefix[column] = prefix
+        return prefix
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def _segments(self, start: str = None, end: str = None,
+                  type: str = None) -> Iterator[Tuple[str, int, int]]:
+        """Potongan (jenis, awal, akhir) untuk start <= tanggal < end (YYYY-MM-DD)"""
+        start_day = date.fromisoformat(start).toordinal() if start else None
+        end_day = date.fromisoformat(end).toordinal() if end else None
+        for type_name, (lo, hi) in zip(self.type_names, self.type_ranges):
+            if type and type_name != type:
+                continue
+            if start_day is not None:
+                lo = bisect_left(self.days, start_day, lo, hi)
+            if end_day is not None:
+                hi = bisect_left(self.days, end_day, lo, hi)
+            if lo < hi:
+                yield type_name, lo, hi
+    
+    def _split(self, lo: int, hi: int, by: str) -> Iterator[Tuple[str, int, int]]:
+        """Bagi potongan yang urut tanggal menjadi potongan per bulan atau per tahun"""
+        while lo < hi:
+            first = date.fromordinal(self.days[lo])
+            if by == 'year':
+                label = f"{first.year:04d}"
+                boundary = date(first.year + 1, 1, 1)
+            else:
+                label = f"{first.year:04d}-{first.month:02d}"
+                boundary = date(first.year + (first.month == 12), first.month % 12 + 1, 1)
+            end = bisect_left(self.days, boundary.toordinal(), lo, hi)
+            yield label, lo, end
+            lo = end
+    
+    def _group_row(self, keys: Dict[str, str], lo: int, hi: int) -> Dict[str, Any]:
+        amount_prefix = self._prefix_sums('amount_cents')
+        ppn_prefix = self._prefix_sums('ppn_amount_cents')
+        amount = amount_prefix[hi] - amount_prefix[lo]
+        ppn = ppn_prefix[hi] - ppn_prefix[lo]
+        row = dict(keys)
+        row['total_amount_cents'] = amount
+        row['total_ppn_cents'] = ppn
+        row['total_amount'] = from_cents(amount)
+        row['total_ppn'] = from_cents(ppn)
+        row['count'] = hi - lo
+        return row
+    
+    def sum_by(self, group_by: Sequence[str] = ('type',), start: str = None, end: str = None,
+               type: str = None) -> List[Dict[str, Any]]:
+        """
+        Jumlahkan per kelompok dengan bentuk baris yang sama dengan
+        Transaction.aggregate ('type', 'year', 'month', total_*_cents,
+        total_amount, total_ppn, count), diurutkan menurut kolom pengelompokan.
+        """
+        unknown = [g for g in group_by if g not in self._GROUP_KEYS]
+        if unknown:
+            raise ValueError(f"Kolom pengelompokan tidak dikenal: {', '.join(unknown)}")
+        # Pengelompokan waktu yang paling rinci menentukan potongan
+        period = 'month' if 'month' in group_by else 'year' if 'year' in group_by else None
+        
+        groups = {}
+        for type_name, lo, hi in self._segments(start, end, type):
+            parts = self._split(lo, hi, period) if period else [(None, lo, hi)]
+            for label, part_lo, part_hi in parts:
+                keys = {'type': type_name}
+                if period:
+                    keys[period] = label
+                    keys['year'] = label[:4]
+                key = tuple(keys[g] for g in group_by)
+                row = self._group_row(dict(zip(group_by, key)), part_lo, part_hi)
+                if key in groups:
+                    existing = groups[key]
+                    for column in ('total_amount_cents', 'total_ppn_cents', 'count'):
+                        existing[column] += row[column]
+                    existing['total_amount'] = from_cents(existing['total_amount_cents'])
+                    existing['total_ppn'] = from_cents(existing['total_ppn_cents'])
+                else:
+                    groups[key] = row
+        return [groups[key] for key in sorted(groups)]
+    
+    def totals(self, start: str = None, end: str = None, type: str = None) -> Dict[str, Any]:
+        """Total seluruh baris yang lolos filter"""
+        rows = self.sum_by((), start, end, type)
+        if rows:
+            return rows[0]
+        return self._group_row({}, 0, 0)
+    
+    def top_n(self, n: int = 10, by: str = 'amount', start: str = None, end: str = None,
+              type: str = None) -> List[Dict[str, Any]]:
+        """N transaksi terbesar menurut nilai ('amount' atau 'ppn')"""
+        if by not in self._VALUE_COLUMNS:
+            raise ValueError(f"Kolom nilai tidak dikenal: {by}")
+        values = self.amount_cents if by == 'amount' else self.ppn_amount_cents
+        
+        candidates = []
+        for type_name, lo, hi in self._segments(start, end, type):
+            best = nlargest(n, range(lo, hi), key=values.__getitem__)
+            candidates.extend((values[i], type_name, i) for i in best)
+        
+        return [{
+            'id': self.ids[i],
+            'type': type_name,
+            'transaction_date': date.fromordinal(self.days[i]).isoformat(),
+            'amount_cents': self.amount_cents[i],
+            'ppn_amount_cents': self.ppn_amount_cents[i],
+            'amount': from_cents(self.amount_cents[i]),
+            'ppn_amount': from_cents(self.ppn_amount_cents[i])
+        } for _, type_name, i in nlargest(n, candidates)]
\ No newline at end of file
@@ -0,0 +1,63 @@
+import os
+import shutil
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# db_manager membuka tax_manager.db relatif terhadap direktori kerja saat modul diimpor,
+# jadi pindah ke direktori sementara sebelum modul aplikasi diimpor oleh tes
+WORKDIR = tempfile.mkdtemp(prefix='e-pajak-tests-')
+os.makedirs(os.path.join(WORKDIR, 'config'))
+shutil.copy(os.path.join(ROOT, 'config', 'app_settings.json'), os.path.join(WORKDIR, 'config'))
+os.chdir(WORKDIR)
+
+from config.database import db_manager
+
+DATA_TABLES = ('tax_records', 'transactions', 'employees', 'ppn_monthly_ledger', 'report_cache', 'data_versions')
+
+@pytest.fixture
+def db():
+    """db_manager pada database sementara yang sudah dimigrasi, tabel data dikosongkan"""
+    with db_manager.transaction() as conn:
+        for table in DATA_TABLES:
+            conn.execute(f'DELETE FROM {table}')
+    return db_manager
+
+@pytest.fixture
+def traced_sql(db, monkeypatch):
+    """SQL (dengan parameter terisi) yang dijalankan model selama tes"""
+    statements = []
+    connections = set()
+    acquire = db.pool.acquire
+    
+    def traced_acquire():
+        conn = acquire()
+        conn.set_trace_callback(statements.append)
+        connections.add(conn)
+        return conn
+    
+    monkeypatch.setattr(db.pool, 'acquire', traced_acquire)
+    yield statements
+    for conn in connections:
+        conn.set_trace_callback(None)
+
+@pytest.fixture
+def mid_year_rates(tmp_path):
+    """Registry tarif bersama dengan set tambahan PPN 12% yang berlaku mulai 2025-07-01"""
+    import json
+    from config.rate_registry import rate_registry
+    with open(rate_registry.path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['rate_sets'].append(dict(data['rate_sets'][-1], effective_date='2025-07-01', ppn_rate=0.12))
+    path = tmp_path / 'tax_rates.json'
+    path.write_text(json.dumps(data), encoding='utf-8')
+    
+    original = rate_registry.path
+    rate_registry.path = str(path)
+    rate_registry.reload()
+    yield rate_registry
+    rate_registry.path = original
+    rate_registry.reload()
\ No newline at end of file
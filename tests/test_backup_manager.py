@@ -0,0 +1,47 @@
+import os
+import sqlite3
+from models.employee import Employee
+from models.transaction import Transaction
+from utils.backup_manager import BackupManager
+
+# Skema sebelum migrasi versi 1 (PRAGMA user_version = 0)
+LEGACY_SCHEMA = '''
+    CREATE TABLE employees (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, status TEXT NOT NULL,
+        monthly_salary REAL DEFAULT 0, allowances REAL DEFAULT 0, npwp TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT NOT NULL, description TEXT,
+        amount REAL NOT NULL, ppn_amount REAL DEFAULT 0, transaction_date DATE DEFAULT CURRENT_DATE,
+        invoice_number TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE tax_records (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, employee_id INTEGER, period TEXT,
+        gross_income REAL DEFAULT 0, taxable_income REAL DEFAULT 0, tax_amount REAL DEFAULT 0,
+        tax_type TEXT, description TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    INSERT INTO employees (name, status, monthly_salary) VALUES ('Budi', 'tetap', 5000000);
+    INSERT INTO transactions (type, description, amount, ppn_amount, transaction_date)
+    VALUES ('penjualan', 'lama', 1000.5, 110.06, '2023-07-01');
+'''
+
+def test_restore_pre_migration_backup_migrates_schema(db):
+    manager = BackupManager()
+    conn = sqlite3.connect(os.path.join(manager.backup_dir, 'legacy_v0.db'))
+    conn.executescript(LEGACY_SCHEMA)
+    conn.close()
+    
+    # Database tes dipulihkan setelahnya (ANALYZE saat migrasi mengubah statistik query planner)
+    manager.create_backup('before_restore.db')
+    try:
+        assert manager.restore_backup('legacy_v0.db')
+        
+        transactions = Transaction.get_all()
+        assert [(t.description, t.amount, t.ppn_amount) for t in transactions] == [('lama', 1000.5, 110.06)]
+        assert transactions[0].amount_cents == 100050
+        assert Employee.get_all()[0].pph21_method == 'progressive'
+        with db.connection() as conn:
+            assert conn.execute('PRAGMA user_version').fetchone()[0] > 0
+    finally:
+        manager.restore_backup('before_restore.db')
\ No newline at end of file
@@ -0,0 +1,37 @@
+from models.employee import Employee
+
+def test_bulk_upsert_dedupes_new_npwp_within_input(db):
+    ids = Employee.bulk_upsert([Employee(name='A', npwp='99'), Employee(name='B'),
+                                Employee(name='A2', npwp='99', monthly_salary=5000000)])
+    
+    employees = Employee.get_all()
+    assert len(employees) == 2
+    assert ids[0] == ids[2] != ids[1]
+    npwp_employee = Employee.get_by_id(ids[0])
+    assert npwp_employee.name == 'A2'
+    assert npwp_employee.monthly_salary == 5000000
+
+def test_bulk_upsert_matches_existing_npwp(db):
+    [first_id] = Employee.bulk_upsert([Employee(name='Lama', npwp='11')])
+    
+    ids = Employee.bulk_upsert([Employee(name='Baru', npwp='11')])
+    
+    assert ids == [first_id]
+    assert [e.name for e in Employee.get_all()] == ['Baru']
+
+def test_bulk_upsert_inserts_unknown_id(db):
+    [existing_id] = Employee.bulk_upsert([Employee(name='Ada')])
+    
+    ids = Employee.bulk_upsert([Employee(id=12345, name='Baru', monthly_salary=1000),
+                                Employee(id=existing_id, name='Ada Diubah')])
+    
+    assert ids == [12345, existing_id]
+    assert Employee.get_by_id(12345).name == 'Baru'
+    assert Employee.get_by_id(existing_id).name == 'Ada Diubah'
+    assert len(Employee.get_all()) == 2
+
+def test_bulk_upsert_duplicates_across_chunks(db):
+    ids = Employee.bulk_upsert([Employee(name='A', npwp='77'), Employee(name='B', npwp='77')], chunk_size=1)
+    
+    assert ids[0] == ids[1]
+    assert [e.name for e in Employee.get_all()] == ['B']
\ No newline at end of file
@@ -0,0 +1,60 @@
+from models.transaction import Transaction
+from utils.importer import TransactionImporter
+
+def write_csv(tmp_path, text):
+    path = tmp_path / 'pos.csv'
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+def test_short_row_is_padded_not_aborted(db, tmp_path):
+    path = write_csv(tmp_path, "Tanggal,Jumlah,Deskripsi\n2024-01-05,1000,Kopi\n2024-01-06,2000\n")
+    
+    summary = TransactionImporter().import_csv(path)
+    
+    assert summary['imported'] == 2
+    assert summary['skipped'] == 0
+    assert sorted(t.description for t in Transaction.get_all()) == ['', 'Kopi']
+
+def test_short_row_missing_required_column_is_skipped(db, tmp_path):
+    path = write_csv(tmp_path, "Deskripsi,Tanggal,Jumlah\nKopi,2024-01-05,1000\nTeh,2024-01-06\n")
+    
+    summary = TransactionImporter().import_csv(path)
+    
+    assert summary['imported'] == 1
+    assert summary['skipped'] == 1
+    assert summary['errors'][0][0] == 3
+
+def test_non_finite_and_oversized_amounts_are_skipped(db, tmp_path):
+    path = write_csv(tmp_path, "Tanggal,Jumlah\n2024-01-05,1000\n2024-01-06,inf\n"
+                               "2024-01-07,nan\n2024-01-08,-inf\n2024-01-09,1e308\n")
+    
+    summary = TransactionImporter().import_csv(path)
+    
+    assert summary['imported'] == 1
+    assert summary['skipped'] == 4
+    assert [line for line, _ in summary['errors']] == [3, 4, 5, 6]
+    assert summary['total_amount'] == 1000.0
+    assert summary['total_ppn'] == 110.0
+def test_dates_other_than_yyyy_mm_dd_are_skipped(db, tmp_path):
+    path = write_csv(tmp_path, "Tanggal,Jumlah\n2024-01-05,1000\n2024-W01-1,1000\n"
+                               "20240105,1000\n2024-1-5,1000\n2024-02-30,1000\n")
+    
+    summary = TransactionImporter().import_csv(path)
+    
+    assert summary['imported'] == 1
+    assert [line for line, _ in summary['errors']] == [3, 4, 5, 6]
+    assert [t.transaction_date for t in Transaction.get_all()] == ['2024-01-05']
+def test_ppn_rate_follows_each_row_date_across_mid_year_change(db, tmp_path, mid_year_rates):
+    path = write_csv(tmp_path, "Tanggal,Jumlah,Jenis\n2025-06-30,1000,penjualan\n2025-07-01,1000,penjualan\n"
+                               "2025-06-15,1110,belanja\n2025-12-31,1120,belanja\n")
+    
+    TransactionImporter().import_csv(path)
+    
+    rows = sorted((t.transaction_date, t.amount, t.ppn_amount) for t in Transaction.get_all())
+    assert rows == [('2025-06-15', 1110.0, 122.1), ('2025-06-30', 1000.0, 110.0),
+                    ('2025-07-01', 1000.0, 120.0), ('2025-12-31', 1120.0, 134.4)]
+    
+    summary = TransactionImporter().import_csv(
+        write_csv(tmp_path, "Tanggal,Jumlah\n2025-06-15,1110\n2025-12-31,1120\n"), 'belanja', include_ppn=True)
+    assert summary['total_amount'] == 2000.0
+    assert summary['total_ppn'] == 230.0
\ No newline at end of file
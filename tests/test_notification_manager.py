@@ -0,0 +1,15 @@
+from models.transaction import Transaction
+from utils.notification_manager import NotificationManager
+
+def test_ppn_summary_reads_monthly_ledger_not_transactions(db, traced_sql):
+    Transaction.bulk_insert([
+        Transaction(type='penjualan', amount=1000, ppn_amount=110, transaction_date='2024-01-05'),
+        Transaction(type='penjualan', amount=2000, ppn_amount=220, transaction_date='2024-02-05'),
+        Transaction(type='belanja', amount=500, ppn_amount=55.5, transaction_date='2024-02-06'),
+    ])
+    traced_sql.clear()
+    
+    notifications = NotificationManager().get_tax_summary_notifications()
+    
+    assert notifications[1]['description'] == 'PPN terutang: Rp 274'
+    assert not [sql for sql in traced_sql if 'FROM transactions' in sql]
\ No newline at end of file
@@ -0,0 +1,48 @@
+import pytest
+from models.employee import Employee
+from models.tax import TaxRecord
+from services.payroll_engine import PayrollEngine
+from services.pp21_calculator import PPh21Calculator
+
+@pytest.fixture
+def employees():
+    return [
+        Employee(id=1, name='A', monthly_salary=15000000, allowances=1000000, npwp='1',
+                 marital_status='K', dependants=1, pph21_method='ter'),
+        Employee(id=2, name='B', monthly_salary=15000000, allowances=1000000, npwp='2',
+                 marital_status='K', dependants=1, pph21_method='progressive'),
+        Employee(id=3, name='C', monthly_salary=8000000, marital_status='TK', pph21_method='ter'),
+    ]
+
+def test_calculate_batch_uses_method_from_profile(employees):
+    result = PPh21Calculator.calculate_batch(employees, method=None)
+    assert result['method'] == ['ter', 'progressive', 'ter']
+    assert result['employee_id'] == [1, 2, 3]
+    for i, employee in enumerate(employees):
+        single = PPh21Calculator.calculate_batch([employee], method=employee.pph21_method)
+        assert result['final_tax'][i] == single['final_tax'][0]
+        assert result['effective_rate'][i] == single.get('effective_rate', [None])[0]
+    # Profil yang sama dengan metode berbeda menghasilkan pajak berbeda
+    assert result['final_tax'][0] != result['final_tax'][1]
+    assert PPh21Calculator.calculate_batch([], method=None)['final_tax'] == []
+
+def test_notification_estimate_uses_method_from_profile(db, employees):
+    from utils.notification_manager import NotificationManager
+    Employee.bulk_upsert(employees)
+    expected = sum(PPh21Calculator.calculate_batch(employees, method=None)['final_tax'])
+    summary = NotificationManager().get_tax_summary_notifications()[0]
+    assert summary['description'] == f'Total PPh 21 terutang tahun ini: Rp {expected:,.0f}'
+
+def test_monthly_withholding_follows_profile_method(employees):
+    engine = PayrollEngine()
+    records = engine.compute_records(2024, 3, employees, [e.ptkp_status for e in employees], {})
+    assert [r.employee_id for r in records] == [1, 2, 3]
+    
+    calculator = PPh21Calculator.for_year(2024)
+    statuses = calculator.parse_ptkp_statuses([e.ptkp_status for e in employees], 3)
+    rates = calculator.ter_rates_batch([16000000, 16000000, 8000000], statuses)
+    progressive = calculator.calculate_batch([employees[1]], method='progressive')
+    assert records[0].tax_amount == pytest.approx(16000000 * rates[0] * 0.95)
+    assert records[1].tax_amount == pytest.approx(progressive['monthly_final_tax'][0])
+    assert records[2].tax_amount == pytest.approx(8000000 * rates[2])
+    assert all(isinstance(r, TaxRecord) for r in records)
\ No newline at end of file
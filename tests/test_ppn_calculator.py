@@ -0,0 +1,39 @@
+import pytest
+from models.transaction import Transaction
+from services.ppn_calculator import PPNCalculator
+
+def test_rate_follows_transaction_date(mid_year_rates):
+    assert PPNCalculator(on_date='2025-06-30').PPN_RATE == 0.11
+    assert PPNCalculator(on_date='2025-07-01').PPN_RATE == 0.12
+    # Rekap tahunan tetap memakai set tarif akhir tahun
+    assert PPNCalculator(2025).PPN_RATE == 0.12
+
+def test_batch_with_dates_prices_each_row_by_its_date(mid_year_rates):
+    calculator = PPNCalculator(2025)
+    dates = ['2025-06-30', '2025-07-01', '2025-01-15', '2026-02-01']
+    
+    result = calculator.calculate_ppn_batch([100000] * 4, dates)
+    assert result['ppn_cents'] == [11000, 12000, 11000, 12000]
+    assert result['ppn_rate'] is None
+    
+    result = calculator.calculate_base_batch([111000, 112000], ['2025-06-30', '2025-07-01'])
+    assert result['base_cents'] == [100000, 100000]
+    assert result['ppn_cents'] == [11000, 12000]
+    
+    # Satu tarif untuk semua baris
+    assert calculator.calculate_ppn_batch([100000], ['2025-03-01'])['ppn_rate'] == 0.11
+    assert calculator.calculate_ppn_batch([100000])['ppn_cents'] == [12000]
+def test_validate_period_credits_requires_year_with_month(db):
+    Transaction.bulk_insert([
+        Transaction(type='belanja', amount=1000, ppn_amount=110, transaction_date=f'2024-{month:02d}-10',
+                    invoice_number=f'010.000-24.{month:08d}')
+        for month in (3, 4)
+    ])
+    calculator = PPNCalculator()
+    
+    with pytest.raises(ValueError):
+        calculator.validate_period_credits(month=3)
+    
+    report = calculator.validate_period_credits(2024, 3)
+    assert (report['period'], report['checked'], report['eligible']) == ('2024-03', 1, 1)
+    assert calculator.validate_period_credits()['checked'] == 2
\ No newline at end of file
@@ -0,0 +1,71 @@
+import re
+import pytest
+from models.tax import TaxRecord
+from models.transaction import Transaction
+
+@pytest.fixture
+def sample_data(db):
+    Transaction.bulk_insert([
+        Transaction(type=type, description='x', amount=1000, ppn_amount=110,
+                    transaction_date=f'2024-{month:02d}-10', invoice_number=f'010.000-24.{month:08d}')
+        for type in ('penjualan', 'belanja') for month in range(1, 13)
+    ])
+    TaxRecord.bulk_insert([
+        TaxRecord(employee_id=employee_id, period=f'2024-{month:02d}', gross_income=1000,
+                  taxable_income=1000, tax_amount=50, tax_type='pph21')
+        for employee_id in range(1, 4) for month in range(1, 13)
+    ])
+
+def table_plans(db, statements, table):
+    """Baris EXPLAIN QUERY PLAN untuk setiap query model yang membaca/mengubah `table`"""
+    plans = {}
+    for sql in statements:
+        if re.match(r'\s*(SELECT|UPDATE|DELETE)\b', sql, re.I) and re.search(rf'\bFROM {table}\b', sql):
+            plans[sql] = [line for line in db.explain_query_plan(sql) if f' {table}' in line]
+    return plans
+
+FILTERED_TRANSACTION_QUERIES = [
+    lambda: Transaction.get_by_year(2024),
+    lambda: Transaction.get_by_year(2024, 'belanja'),
+    lambda: Transaction.get_by_month(2024, 5),
+    lambda: Transaction.get_by_month(2024, 5, 'penjualan'),
+    lambda: Transaction.get_by_id(1),
+    lambda: Transaction.aggregate(2024),
+    lambda: Transaction.aggregate(2024, 5, 'penjualan', group_by=()),
+    lambda: Transaction.load_batch('transaction_date >= ? AND transaction_date < ?', ('2024-03-01', '2024-04-01')),
+]
+
+TAX_RECORD_QUERIES = [
+    lambda: TaxRecord.get_by_employee(2),
+    lambda: TaxRecord.get_by_period('2024-05'),
+    lambda: TaxRecord.get_employee_ids_for_period('2024-05'),
+    lambda: TaxRecord.sum_by_employee('2024-01', '2024-11'),
+    lambda: TaxRecord.delete_for_period('2024-12', [1, 2]),
+]
+
+@pytest.mark.parametrize('query', FILTERED_TRANSACTION_QUERIES)
+def test_filtered_transaction_queries_search_an_index(db, sample_data, traced_sql, query):
+    query()
+    plans = table_plans(db, traced_sql, 'transactions')
+    
+    assert plans
+    for sql, plan in plans.items():
+        assert plan and all(line.startswith('SEARCH transactions') for line in plan), (sql, plan)
+
+@pytest.mark.parametrize('query', TAX_RECORD_QUERIES)
+def test_tax_record_queries_search_an_index(db, sample_data, traced_sql, query):
+    query()
+    plans = table_plans(db, traced_sql, 'tax_records')
+    
+    assert plans
+    for sql, plan in plans.items():
+        assert plan and all(line.startswith('SEARCH tax_records') for line in plan), (sql, plan)
+        assert not any('TEMP B-TREE FOR ORDER BY' in line for line in db.explain_query_plan(sql)), sql
+
+def test_get_all_reads_transactions_in_index_order(db, sample_data, traced_sql):
+    # Membaca semua baris memang memindai tabel, tetapi urutannya harus dari indeks tanpa sort
+    Transaction.get_all()
+    [(sql, plan)] = table_plans(db, traced_sql, 'transactions').items()
+    
+    assert plan == ['SCAN transactions USING INDEX idx_transactions_date']
+    assert not any('TEMP B-TREE' in line for line in db.explain_query_plan(sql))
\ No newline at end of file
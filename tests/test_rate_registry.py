@@ -0,0 +1,52 @@
+import json
+from datetime import date
+from config.rate_registry import RATES_FILE, RateRegistry
+from config.settings import AppSettings
+
+def write_rates(tmp_path):
+    """File tarif dengan set tambahan PPN 12% yang berlaku mulai hari ini"""
+    with open(RATES_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    newer = dict(data['rate_sets'][-1], effective_date=date.today().isoformat(), ppn_rate=0.12)
+    data['rate_sets'].append(newer)
+    path = tmp_path / 'tax_rates.json'
+    path.write_text(json.dumps(data), encoding='utf-8')
+    return str(path)
+
+def use_settings_file(tmp_path, monkeypatch, settings):
+    (tmp_path / 'config').mkdir()
+    (tmp_path / 'config' / 'app_settings.json').write_text(json.dumps(settings), encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+
+def test_default_settings_do_not_override_rate_file(tmp_path, monkeypatch):
+    rates_path = write_rates(tmp_path)
+    monkeypatch.chdir(tmp_path)  # tanpa file pengaturan: dibuat dari default
+    
+    current = RateRegistry(rates_path).current()
+    
+    assert current.ppn_rate == 0.12
+    assert current.corporate_tax_rate == 0.25
+
+def test_explicit_override_replaces_current_set_only(tmp_path, monkeypatch):
+    rates_path = write_rates(tmp_path)
+    use_settings_file(tmp_path, monkeypatch, {'rate_overrides': {'ppn_rate': 0.1}})
+    
+    registry = RateRegistry(rates_path)
+    
+    assert registry.current().ppn_rate == 0.1
+    assert registry.for_date('2024-06-01').ppn_rate == 0.11
+
+def test_legacy_default_rates_are_dropped(tmp_path, monkeypatch):
+    rates_path = write_rates(tmp_path)
+    use_settings_file(tmp_path, monkeypatch, {'ppn_rate': 0.11, 'corporate_tax_rate': 0.25})
+    
+    assert AppSettings().get('rate_overrides') == {}
+    assert RateRegistry(rates_path).current().ppn_rate == 0.12
+
+def test_legacy_changed_rate_becomes_override(tmp_path, monkeypatch):
+    use_settings_file(tmp_path, monkeypatch, {'ppn_rate': 0.11, 'corporate_tax_rate': 0.22})
+    
+    settings = AppSettings()
+    
+    assert settings.get('rate_overrides') == {'corporate_tax_rate': 0.22}
+    assert settings.get('ppn_rate') is None
\ No newline at end of file
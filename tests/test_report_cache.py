@@ -0,0 +1,22 @@
+from models.transaction import Transaction
+from services.spt_calculator import SPTCalculator
+
+def test_cache_hit_has_no_stale_timings(db):
+    Transaction.bulk_insert([Transaction(type='penjualan', amount=1000, ppn_amount=110,
+                                         transaction_date='2024-05-01')])
+    calculator = SPTCalculator()
+    
+    built = calculator.get_spt_annual_report(2024)
+    assert built['cached'] is False
+    assert 'total' in built['timings']
+    stored = db.iter_query("SELECT payload FROM report_cache WHERE report = 'spt_annual'")
+    assert '"timings"' not in next(stored)[0]
+    
+    hit = calculator.get_spt_annual_report(2024)
+    assert hit['cached'] is True
+    assert 'timings' not in hit
+    assert hit['generated_at'] == built['generated_at']
+    
+    rebuilt = calculator.get_spt_annual_report(2024, refresh=True)
+    assert rebuilt['cached'] is False
+    assert 'timings' in rebuilt
\ No newline at end of file
@@ -0,0 +1,41 @@
+import math
+import pytest
+from config.rate_registry import rate_registry
+from services.pp21_calculator import PPh21Calculator
+
+# Status PTKP hasil parse per kategori TER: A = TK/*, B = K/*, C = K/I/*
+CATEGORY_STATUS = {'A': (0, False, False), 'B': (1, True, False), 'C': (2, True, True)}
+
+def linear_ter_rate(ter_rates, monthly_gross):
+    """Pencarian linear sebelum tabel dikompilasi untuk bisect (acuan tes)"""
+    for limit, rate in ter_rates:
+        if monthly_gross <= limit:
+            return rate
+    return ter_rates[-1][1] if ter_rates else 0.0
+
+def boundary_values(ter_rates):
+    values = {0.0, 1.0}
+    for limit, _ in ter_rates:
+        if math.isinf(limit):
+            values.add(1e12)
+            continue
+        for delta in (-1, -0.01, 0, 0.01, 1):
+            values.add(limit + delta)
+    return sorted(v for v in values if v >= 0)
+
+RATE_SETS = rate_registry.get_all()
+
+@pytest.mark.parametrize('rate_set', RATE_SETS, ids=[s.effective_date for s in RATE_SETS])
+@pytest.mark.parametrize('category', sorted(CATEGORY_STATUS))
+def test_bisect_matches_linear_scan_at_every_boundary(rate_set, category):
+    ter_rates = rate_set.ter_rates[category]
+    values = boundary_values(ter_rates)
+    expected = [linear_ter_rate(ter_rates, v) for v in values]
+    
+    assert [PPh21Calculator._find_ter_rate(ter_rates, v) for v in values] == expected
+    
+    # Kelas kalkulator dengan set tarif ini, seperti yang dibuat PPh21Calculator.for_year
+    calculator = type(PPh21Calculator.__name__, (PPh21Calculator,), {})
+    calculator.use_rate_set(rate_set)
+    statuses = [CATEGORY_STATUS[category]] * len(values)
+    assert calculator.ter_rates_batch(values, statuses) == expected
\ No newline at end of file
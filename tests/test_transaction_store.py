@@ -0,0 +1,42 @@
+import pytest
+from models.transaction import Transaction
+from services.transaction_store import TransactionStore
+
+@pytest.fixture
+def transactions(db):
+    # Tanggal sengaja tidak urut agar pengurutan di memori ikut diuji
+    Transaction.bulk_insert([
+        Transaction(type=type, description='x', amount=year + month * 10 + day, ppn_amount=110 + day,
+                    transaction_date=f'{year}-{month:02d}-{day:02d}')
+        for year in (2024, 2023) for day in (28, 3) for month in (12, 1, 6) for type in ('penjualan', 'belanja')
+    ])
+
+@pytest.mark.parametrize('group_by', [('type',), ('type', 'month'), ('month',), ('year', 'type'), ()])
+def test_sum_by_matches_sql_aggregate(transactions, group_by):
+    store = TransactionStore.load(2024)
+    assert len(store) == 12
+    assert store.sum_by(group_by) == Transaction.aggregate(year=2024, group_by=group_by)
+
+def test_load_all_years_keeps_every_row(transactions):
+    store = TransactionStore.load()
+    assert sorted(store.ids) == sorted(t.id for t in Transaction.iter_all())
+    assert store.type_names == ['belanja', 'penjualan']
+    assert store.sum_by(('year', 'type')) == Transaction.aggregate(group_by=('year', 'type'))
+    top = store.top_n(1, type='penjualan')[0]
+    assert (top['transaction_date'], top['amount']) == ('2024-12-28', 2172.0)
+def test_rows_without_valid_date_are_skipped(db):
+    ids = Transaction.bulk_insert([
+        Transaction(type='penjualan', amount=100, transaction_date='2024-03-05'),
+        Transaction(type='penjualan', amount=200, transaction_date='2024-03-06 10:15:00'),
+        Transaction(type='penjualan', amount=400, transaction_date=''),
+        Transaction(type='belanja', amount=800, transaction_date='06/03/2024'),
+    ])
+    
+    store = TransactionStore.load()
+    
+    assert list(store.undated_ids) == ids[2:]
+    assert store.type_names == ['penjualan']
+    assert store.sum_by(('month',)) == [{'month': '2024-03', 'total_amount_cents': 30000,
+                                         'total_ppn_cents': 0, 'total_amount': 300.0,
+                                         'total_ppn': 0.0, 'count': 2}]
+    assert len(TransactionStore.load(2024)) == 2
\ No newline at end of file
@@ -6,6 +6,8 @@ from datetime import datetime
 from models.employee import Employee
 from models.tax import TaxRecord
 from services.pp21_calculator import PPh21Calculator
+from services.payroll_engine import PayrollEngine
+from utils.money import from_cents
 
 console = Console()
 
@@ -26,6 +28,7 @@ class EmployeeMenu:
                 "[4] 🗑️  Hapus Pegawai",
                 "[5] 💰 Hitung PPh 21",
                 "[6] 📊 Lihat Riwayat Pajak Pegawai",
+                "[7] 🧾 Proses PPh 21 Bulanan (TER/Desember)",
                 "[0] 🔙 Kembali ke Menu Utama"
             ]
             
@@ -33,7 +36,7 @@ class EmployeeMenu:
                 console.print(option)
             
             console.print("=" * 50)
-            choice = Prompt.ask("[bold]Pilih menu[/bold]", choices=["0","1","2","3","4","5","6"])
+            choice = Prompt.ask("[bold]Pilih menu[/bold]", choices=["0","1","2","3","4","5","6","7"])
             
             if choice == "0":
                 break
@@ -49,6 +52,8 @@ class EmployeeMenu:
                 self.calculate_pph21()
             elif choice == "6":
                 self.view_tax_history()
+            elif choice == "7":
+                self.run_monthly_payroll()
     
     def list_employees(self):
         console.clear()
@@ -69,6 +74,7 @@ class EmployeeMenu:
         table.add_column("Gaji Bulanan", justify="right")
         table.add_column("Tunjangan", justify="right")
         table.add_column("NPWP", width=15)
+        table.add_column("PTKP", width=7)
         table.add_column("Tgl Dibuat", width=12)
         
         for emp in employees:
@@ -79,6 +85,7 @@ class EmployeeMenu:
                 f"Rp {emp.monthly_salary:,.0f}",
                 f"Rp {emp.allowances:,.0f}",
                 emp.npwp or "-",
+                emp.ptkp_status,
                 emp.created_at[:10] if emp.created_at else "-"
             )
         
@@ -96,6 +103,7 @@ class EmployeeMenu:
             monthly_salary = FloatPrompt.ask("Gaji pokok bulanan (Rp)")
             allowances = FloatPrompt.ask("Tunjangan bulanan (Rp)", default=0.0)
             npwp = Prompt.ask("Nomor NPWP (opsional)", default="")
+            marital_status, dependants, pph21_method = self.ask_tax_profile(Employee())
             
             if not npwp:
                 npwp = None
@@ -105,7 +113,10 @@ class EmployeeMenu:
                 status=status,
                 monthly_salary=monthly_salary,
                 allowances=allowances,
-                npwp=npwp
+                npwp=npwp,
+                marital_status=marital_status,
+                dependants=dependants,
+                pph21_method=pph21_method
             )
             employee.save()
             
@@ -117,6 +128,14 @@ class EmployeeMenu:
         
         input("\nTekan Enter untuk kembali...")
     
+    def ask_tax_profile(self, employee):
+        """Tanyakan profil pajak pegawai (status kawin, tanggungan, metode PPh 21)"""
+        marital_status = Prompt.ask("Status kawin", choices=["TK", "K", "K/I"], default=employee.marital_status)
+        dependants = IntPrompt.ask("Jumlah tanggungan (maksimal 3)", default=min(employee.dependants, 3),
+                                   choices=["0","1","2","3"])
+        pph21_method = Prompt.ask("Metode PPh 21", choices=["progressive", "ter"], default=employee.pph21_method)
+        return marital_status, dependants, pph21_method
+    
     def edit_employee(self):
         console.clear()
         console.print("[bold yellow]✏️  EDIT DATA PEGAWAI[/bold yellow]")
@@ -149,6 +168,7 @@ class EmployeeMenu:
             monthly_salary = FloatPrompt.ask("Gaji pokok bulanan (Rp)", default=employee.monthly_salary)
             allowances = FloatPrompt.ask("Tunjangan bulanan (Rp)", default=employee.allowances)
             npwp = Prompt.ask("Nomor NPWP (opsional)", default=employee.npwp or "")
+            marital_status, dependants, pph21_method = self.ask_tax_profile(employee)
             
             if not npwp:
                 npwp = None
@@ -159,6 +179,9 @@ class EmployeeMenu:
             employee.monthly_salary = monthly_salary
             employee.allowances = allowances
             employee.npwp = npwp
+            employee.marital_status = marital_status
+            employee.dependants = dependants
+            employee.pph21_method = pph21_method
             employee.save()
             
             console.print("[bold green]✅ Data pegawai berhasil diperbarui![/bold green]")
@@ -237,16 +260,22 @@ class EmployeeMenu:
             console.print(f"\n[bold]Perhitungan PPh 21 untuk: {employee.name}[/bold]")
             console.print("-" * 50)
             
-            # Input data tambahan untuk perhitungan
-            status_kawin = Prompt.ask("Status kawin", choices=["TK", "K", "K/I"], default="TK")
-            jumlah_tanggungan = IntPrompt.ask("Jumlah tanggungan (maksimal 3)", default=0, choices=["0","1","2","3"])
+            # Data tambahan untuk perhitungan, default dari profil pajak pegawai
+            status_kawin, jumlah_tanggungan, pph21_method = self.ask_tax_profile(employee)
             
             # Tentukan status pernikahan dan joint filing
             has_spouse = status_kawin in ["K", "K/I"]
             joint_filing = status_kawin == "K/I"
+            use_ter = pph21_method == "ter"
             
-            # Pilihan metode perhitungan
-            use_ter = Confirm.ask("Gunakan metode Tarif Efektif Rata-rata (TER)?", default=False)
+            # Perbarui profil jika berbeda, agar laporan dan payroll memakai status yang sama
+            if (status_kawin, jumlah_tanggungan, pph21_method) != \
+                    (employee.marital_status, employee.dependants, employee.pph21_method):
+                if Confirm.ask("Simpan status PTKP dan metode ini ke profil pegawai?", default=True):
+                    employee.marital_status = status_kawin
+                    employee.dependants = jumlah_tanggungan
+                    employee.pph21_method = pph21_method
+                    employee.save()
             
             # Hitung PPh 21
             calculator = PPh21Calculator(employee, jumlah_tanggungan, has_spouse, joint_filing)
@@ -300,11 +329,34 @@ class EmployeeMenu:
         console.print(f"[bold green]PPh 21 Per Bulan           : Rp {result['monthly_final_tax']:,.0f}[/bold green]")
         
         # Tampilkan breakdown perhitungan (hanya untuk metode progresif)
-        if not result.get('use_ter', False) and 'breakdown' in result and result['breakdown']:
+        if not result.get('use_ter', False) and result['taxable_income'] > 0:
             console.print(f"\n[bold]🧮 Breakdown Perhitungan:[/bold]")
-            for bracket in result['breakdown']:
+            for bracket in PPh21Calculator.progressive_breakdown(result['taxable_income']):
                 console.print(f"  • {bracket['rate']*100:,.1f}% dari Rp {bracket['taxable_amount']:,.0f} = Rp {bracket['tax']:,.0f}")
 
+    def run_monthly_payroll(self):
+        console.clear()
+        console.print("[bold yellow]🧾 PROSES PPH 21 BULANAN[/bold yellow]")
+        console.print("=" * 60)
+        console.print("Januari-November memakai tarif TER, Desember rekonsiliasi tarif progresif.")
+        console.print("Pegawai yang sudah diproses pada periode tersebut akan dilewati.\n")
+        
+        try:
+            year = IntPrompt.ask("Tahun", default=datetime.now().year)
+            month = IntPrompt.ask("Bulan (1-12)", default=datetime.now().month)
+            recompute = Confirm.ask("Hitung ulang pegawai yang sudah diproses?", default=False)
+            
+            summary = PayrollEngine().run_month(year, month, recompute=recompute)
+            
+            console.print(f"\n[bold]Periode       :[/bold] {summary['period']} ({summary['method']})")
+            console.print(f"Diproses      : {summary['processed']} pegawai")
+            console.print(f"Dilewati      : {summary['skipped']} pegawai")
+            console.print(f"[bold green]Total PPh 21  : Rp {summary['total_tax']:,.0f}[/bold green]")
+        except Exception as e:
+            console.print(f"[bold red]❌ Error: {e}[/bold red]")
+        
+        input("\nTekan Enter untuk kembali...")
+    
     def view_tax_history(self):
         console.clear()
         console.print("[bold cyan]📊 RIWAYAT PAJAK PEGAWAI[/bold cyan]")
@@ -361,10 +413,10 @@ class EmployeeMenu:
                     record.description[:25],
                     record.created_at[:10] if record.created_at else "-"
                 )
-                total_tax += record.tax_amount
+                total_tax += record.tax_amount_cents
             
             console.print(table)
-            console.print(f"\n[bold green]Total Pajak Terutang: Rp {total_tax:,.0f}[/bold green]")
+            console.print(f"\n[bold green]Total Pajak Terutang: Rp {from_cents(total_tax):,.0f}[/bold green]")
             
         except Exception as e:
             console.print(f"[bold red]❌ Error: {e}[/bold red]")
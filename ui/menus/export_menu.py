@@ -140,7 +140,7 @@ class ExportMenu:
             
             # Generate data SPT
             spt_calculator = SPTCalculator()
-            spt_data = spt_calculator.generate_spt_annual_report(year)
+            spt_data = spt_calculator.get_spt_annual_report(year)
             
             # Ekspor ke Excel
             filename = self.exporter.export_spt_summary_to_excel(spt_data)
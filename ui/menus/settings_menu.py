@@ -4,6 +4,7 @@ from rich.panel import Panel
 from rich.prompt import Prompt, Confirm, FloatPrompt, IntPrompt
 from rich import print as rprint
 import os
+from config.rate_registry import rate_registry
 from config.settings import AppSettings
 from utils.backup_manager import BackupManager
 from utils.notification_manager import NotificationManager
@@ -95,22 +96,43 @@ class SettingsMenu:
         
         input("\nTekan Enter untuk kembali...")
     
+    def _save_rate_overrides(self, overrides):
+        if self.settings.update_settings({'rate_overrides': overrides}):
+            # Muat ulang set tarif agar kalkulator memakai tarif baru
+            from services.pp21_calculator import PPh21Calculator
+            PPh21Calculator.invalidate_rate_tables()
+            console.print("[bold green]✅ Pengaturan pajak berhasil diperbarui![/bold green]")
+        else:
+            console.print("[bold red]❌ Gagal memperbarui pengaturan![/bold red]")
+    
     def tax_settings(self):
         console.clear()
         console.print("[bold yellow]💰 PENGATURAN PAJAK[/bold yellow]")
         console.print("=" * 50)
         
-        # Tampilkan pengaturan saat ini
+        # Tampilkan tarif yang berlaku (set tarif saat ini, ditambah tarif manual jika ada)
+        current = rate_registry.current()
+        overrides = dict(self.settings.get('rate_overrides') or {})
+        file_source = f"tax_rates.json, berlaku {current.effective_date}"
         console.print("[bold]Pengaturan Pajak Saat Ini:[/bold]")
-        console.print(f"Tarif PPN       : {self.settings.get('ppn_rate')*100:.1f}%")
-        console.print(f"Tarif Pajak Badan: {self.settings.get('corporate_tax_rate')*100:.1f}%")
+        console.print(f"Tarif PPN       : {current.ppn_rate*100:.1f}% "
+                      f"({'manual' if 'ppn_rate' in overrides else file_source})")
+        console.print(f"Tarif Pajak Badan: {current.corporate_tax_rate*100:.1f}% "
+                      f"({'manual' if 'corporate_tax_rate' in overrides else file_source})")
+        console.print(f"[dim]Tarif manual hanya mengganti set tarif yang berlaku sejak {current.effective_date}; "
+                      f"transaksi sebelum tanggal itu memakai tarif set masing-masing.[/dim]")
         
         console.print("\n" + "-" * 30)
         
         try:
+            if overrides and Confirm.ask("Hapus tarif manual dan pakai tarif dari tax_rates.json?", default=False):
+                self._save_rate_overrides({})
+                input("\nTekan Enter untuk kembali...")
+                return
+            
             # Input data baru
-            ppn_rate = FloatPrompt.ask("Tarif PPN (%)", default=self.settings.get('ppn_rate')*100)
-            corporate_tax_rate = FloatPrompt.ask("Tarif Pajak Badan (%)", default=self.settings.get('corporate_tax_rate')*100)
+            ppn_rate = FloatPrompt.ask("Tarif PPN (%)", default=current.ppn_rate*100)
+            corporate_tax_rate = FloatPrompt.ask("Tarif Pajak Badan (%)", default=current.corporate_tax_rate*100)
             
             # Validasi input
             if not (0 <= ppn_rate <= 100):
@@ -123,16 +145,12 @@ class SettingsMenu:
                 input("\nTekan Enter untuk kembali...")
                 return
             
-            # Simpan pengaturan
-            new_settings = {
-                'ppn_rate': ppn_rate / 100,
-                'corporate_tax_rate': corporate_tax_rate / 100
-            }
-            
-            if self.settings.update_settings(new_settings):
-                console.print("[bold green]✅ Pengaturan pajak berhasil diperbarui![/bold green]")
-            else:
-                console.print("[bold red]❌ Gagal memperbarui pengaturan![/bold red]")
+            # Hanya tarif yang diubah yang disimpan sebagai tarif manual
+            if ppn_rate / 100 != current.ppn_rate:
+                overrides['ppn_rate'] = ppn_rate / 100
+            if corporate_tax_rate / 100 != current.corporate_tax_rate:
+                overrides['corporate_tax_rate'] = corporate_tax_rate / 100
+            self._save_rate_overrides(overrides)
             
         except Exception as e:
             console.print(f"[bold red]❌ Error: {e}[/bold red]")
@@ -422,11 +440,12 @@ class SettingsMenu:
         try:
             # Statistik data
             from models.employee import Employee
-            from models.transaction import Transaction
+            from models.ppn_ledger import PPNLedger
             from models.tax import TaxRecord
             
             employee_count = len(Employee.get_all())
-            transaction_count = len(Transaction.get_all())
+            # Jumlah transaksi dari ledger bulanan, tanpa memuat semua transaksi
+            transaction_count = sum(row['count'] for row in PPNLedger.aggregate(group_by=()))
             tax_record_count = len(TaxRecord.get_all())
             
             console.print("[bold]📊 Statistik Data:[/bold]")
@@ -437,14 +456,33 @@ class SettingsMenu:
             # Pengaturan aplikasi
             console.print(f"\n[bold]⚙️  Pengaturan Aplikasi:[/bold]")
             console.print(f"   Nama Perusahaan: {self.settings.get('company_name')}")
-            console.print(f"   Tarif PPN      : {self.settings.get('ppn_rate')*100:.1f}%")
-            console.print(f"   Tarif Pajak    : {self.settings.get('corporate_tax_rate')*100:.1f}%")
+            current_rates = rate_registry.current()
+            console.print(f"   Tarif PPN      : {current_rates.ppn_rate*100:.1f}%")
+            console.print(f"   Tarif Pajak    : {current_rates.corporate_tax_rate*100:.1f}%")
             
             # Informasi sistem
             console.print(f"\n[bold]🖥️  Informasi Sistem:[/bold]")
             console.print(f"   Direktori Kerja: {os.getcwd()}")
             console.print(f"   Auto Backup    : {'Aktif' if self.settings.get('auto_backup') else 'Nonaktif'}")
             
+            # Statistik pool koneksi database
+            from config.database import db_manager
+            pool_stats = db_manager.get_pool_stats()
+            console.print(f"\n[bold]🗄️  Pool Koneksi Database:[/bold]")
+            console.print(f"   Profil PRAGMA  : {db_manager.pragma_profile} (journal {db_manager.pragmas['journal_mode']})")
+            console.print(f"   Koneksi Dibuka : {pool_stats['opened']} (maks {pool_stats['max_size']})")
+            console.print(f"   Dipakai Ulang  : {pool_stats['reused']} kali")
+            console.print(f"   Waktu Tunggu   : {pool_stats['wait_time']*1000:.1f} ms ({pool_stats['waits']} kali)")
+            
+            # Statistik cache hasil PPh 21
+            from services.pp21_calculator import PPh21Calculator
+            cache_stats = PPh21Calculator.get_cache_stats()
+            console.print(f"\n[bold]🧮 Cache PPh 21:[/bold]")
+            console.print(f"   Entri          : {cache_stats['size']} (maks {cache_stats['max_size']})")
+            console.print(f"   Hit / Miss     : {cache_stats['hits']} / {cache_stats['misses']} ({cache_stats['hit_rate']*100:.1f}%)")
+            console.print(f"   Eviction       : {cache_stats['evictions']}")
+            console.print(f"   Versi Tarif    : {cache_stats['rate_table_version']}")
+            
         except Exception as e:
             console.print(f"[bold red]❌ Error: {e}[/bold red]")
         
@@ -461,6 +499,8 @@ class SettingsMenu:
         confirm = Confirm.ask("\nLanjutkan reset pengaturan?")
         if confirm:
             if self.settings.reset_to_default():
+                from services.pp21_calculator import PPh21Calculator
+                PPh21Calculator.invalidate_rate_tables()
                 console.print("[bold green]✅ Pengaturan berhasil direset ke default![/bold green]")
             else:
                 console.print("[bold red]❌ Gagal mereset pengaturan![/bold red]")
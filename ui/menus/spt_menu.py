@@ -56,11 +56,12 @@ class SPTMenu:
         
         try:
             year = IntPrompt.ask("Tahun pelaporan", default=datetime.now().year - 1)
-            report = self.spt_calculator.generate_spt_annual_report(year)
+            report = self.spt_calculator.get_spt_annual_report(year)
             
             # Header laporan
             console.print(Panel(f"[bold]LAPORAN SPT TAHUNAN {year}[/bold]", expand=False))
-            console.print(f"Dibuat pada: {report['generated_at']}")
+            source = " (dari cache, data tidak berubah)" if report['cached'] else ""
+            console.print(f"Dibuat pada: {report['generated_at']}{source}")
             console.print("=" * 80)
             
             # Section 1: Ringkasan Penghasilan
@@ -114,6 +115,11 @@ class SPTMenu:
             else:
                 console.print(f"   Anda memiliki kelebihan pembayaran pajak sebesar [bold]Rp {abs(tax['net_tax_payable']):,.0f}[/bold]")
             
+            # Waktu penyusunan hanya berarti untuk laporan yang baru dibangun
+            if not report['cached']:
+                timings = ', '.join(f"{section} {ms:.1f}" for section, ms in report['timings'].items())
+                console.print(f"\n[dim]Waktu penyusunan (ms): {timings}[/dim]")
+            
         except Exception as e:
             console.print(f"[bold red]❌ Error: {e}[/bold red]")
         
@@ -159,7 +165,10 @@ class SPTMenu:
         
         try:
             year = IntPrompt.ask("Tahun", default=datetime.now().year - 1)
-            summary = self.spt_calculator.calculate_employee_pph21_summary(year)
+            # Pegawai dibaca sekali untuk ringkasan dan detail
+            from models.employee import Employee
+            employees = Employee.get_all()
+            summary = self.spt_calculator.calculate_employee_pph21_summary(year, employees)
             
             console.print(f"\n[bold]Ringkasan Tahun {year}:[/bold]")
             console.print("-" * 40)
@@ -169,9 +178,6 @@ class SPTMenu:
             console.print(f"[bold]Total PPh 21 Dipotong : Rp {summary['total_pph21_withheld']:,.0f}[/bold]")
             
             # Detail per pegawai
-            from models.employee import Employee
-            employees = Employee.get_all()
-            
             if employees:
                 console.print(f"\n[bold underline]Detail Per Pegawai:[/bold underline]")
                 table = Table(show_header=True, header_style="bold green")
@@ -180,15 +186,13 @@ class SPTMenu:
                 table.add_column("Gaji/Tahun", justify="right")
                 table.add_column("PPh 21/Tahun", justify="right")
                 
-                for emp in employees:
-                    calculator = self.spt_calculator.pph21_calculator(emp, 0, False)
-                    pph21_result = calculator.calculate_with_npwp_discount()
-                    
+                pph21_batch = self.spt_calculator.pph21_calculator.for_year(year).calculate_batch(employees)
+                for emp, final_tax in zip(employees, pph21_batch['final_tax']):
                     table.add_row(
                         emp.name,
                         emp.status.title(),
                         f"Rp {((emp.monthly_salary + emp.allowances) * 12):,.0f}",
-                        f"Rp {pph21_result['final_tax']:,.0f}"
+                        f"Rp {final_tax:,.0f}"
                     )
                 
                 console.print(table)
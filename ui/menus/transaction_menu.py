@@ -1,10 +1,13 @@
 from rich.console import Console
 from rich.table import Table
-from rich.prompt import Prompt, FloatPrompt, Confirm
+from rich.prompt import Prompt, IntPrompt, FloatPrompt, Confirm
 from rich import print as rprint
 from datetime import datetime
 from models.transaction import Transaction
+from models.ppn_ledger import PPNLedger
 from services.ppn_calculator import PPNCalculator
+from services.transaction_store import TransactionStore
+from utils.money import from_cents
 
 console = Console()
 
@@ -26,6 +29,8 @@ class TransactionMenu:
                 "[5] 🗑️  Hapus Transaksi",
                 "[6] 📊 Rekap PPN Bulanan",
                 "[7] 📋 Lihat Faktur Pajak",
+                "[8] 📈 Analitik Transaksi Tahunan",
+                "[9] ✅ Validasi Kredit PPN Masukan",
                 "[0] 🔙 Kembali ke Menu Utama"
             ]
             
@@ -33,7 +38,7 @@ class TransactionMenu:
                 console.print(option)
             
             console.print("=" * 50)
-            choice = Prompt.ask("[bold]Pilih menu[/bold]", choices=["0","1","2","3","4","5","6","7"])
+            choice = Prompt.ask("[bold]Pilih menu[/bold]", choices=["0","1","2","3","4","5","6","7","8","9"])
             
             if choice == "0":
                 break
@@ -51,6 +56,10 @@ class TransactionMenu:
                 self.show_ppn_summary()
             elif choice == "7":
                 self.view_tax_invoices()
+            elif choice == "8":
+                self.show_transaction_analytics()
+            elif choice == "9":
+                self.validate_input_tax_credits()
     
     def list_transactions(self):
         console.clear()
@@ -78,7 +87,7 @@ class TransactionMenu:
         total_ppn = 0
         
         for trans in transactions:
-            total_with_ppn = trans.amount + trans.ppn_amount
+            total_with_ppn = from_cents(trans.amount_cents + trans.ppn_amount_cents)
             table.add_row(
                 str(trans.id),
                 trans.transaction_date,
@@ -89,12 +98,12 @@ class TransactionMenu:
                 f"Rp {total_with_ppn:,.0f}",
                 trans.invoice_number or "-"
             )
-            total_amount += trans.amount
-            total_ppn += trans.ppn_amount
+            total_amount += trans.amount_cents
+            total_ppn += trans.ppn_amount_cents
         
         console.print(table)
-        console.print(f"\n[bold]Total Transaksi: Rp {total_amount:,.0f}[/bold]")
-        console.print(f"[bold]Total PPN: Rp {total_ppn:,.0f}[/bold]")
+        console.print(f"\n[bold]Total Transaksi: Rp {from_cents(total_amount):,.0f}[/bold]")
+        console.print(f"[bold]Total PPN: Rp {from_cents(total_ppn):,.0f}[/bold]")
         input("\nTekan Enter untuk kembali...")
     
     def record_sale_transaction(self):
@@ -287,14 +296,15 @@ class TransactionMenu:
         console.print("[bold cyan]📊 REKAP PPN BULANAN[/bold cyan]")
         console.print("=" * 70)
         
-        transactions = Transaction.get_all()
-        if not transactions:
+        # Total per bulan dan jenis transaksi dibaca dari ledger bulanan
+        monthly_totals = PPNLedger.aggregate(group_by=('month', 'type'))
+        if not monthly_totals:
             console.print("[yellow]⚠️  Belum ada data transaksi[/yellow]")
             input("\nTekan Enter untuk kembali...")
             return
         
         # Hitung rekap PPN
-        ppn_summary = self.ppn_calculator.calculate_monthly_ppn_summary(transactions)
+        ppn_summary = self.ppn_calculator.summarize_ppn_aggregates(monthly_totals)
         
         console.print(f"\n[bold]REKAP PPN KESELURUHAN[/bold]")
         console.print("-" * 50)
@@ -305,13 +315,7 @@ class TransactionMenu:
         
         # Tampilkan rekap per bulan
         console.print(f"\n[bold]REKAP PER BULAN:[/bold]")
-        monthly_data = {}
-        
-        for trans in transactions:
-            month_key = trans.transaction_date[:7]  # YYYY-MM
-            if month_key not in monthly_data:
-                monthly_data[month_key] = []
-            monthly_data[month_key].append(trans)
+        monthly_data = self.ppn_calculator.summarize_ppn_aggregates_by_month(monthly_totals)
         
         if monthly_data:
             table = Table(show_header=True, header_style="bold blue")
@@ -321,8 +325,7 @@ class TransactionMenu:
             table.add_column("PPN Keluar", justify="right")
             table.add_column("PPN Terutang", justify="right")
             
-            for month, trans_list in sorted(monthly_data.items()):
-                month_summary = self.ppn_calculator.calculate_monthly_ppn_summary(trans_list, month)
+            for month, month_summary in monthly_data.items():
                 table.add_row(
                     month,
                     f"Rp {month_summary['total_transaksi']:,.0f}",
@@ -335,6 +338,49 @@ class TransactionMenu:
         
         input("\nTekan Enter untuk kembali...")
     
+    def show_transaction_analytics(self):
+        console.clear()
+        console.print("[bold cyan]📈 ANALITIK TRANSAKSI TAHUNAN[/bold cyan]")
+        console.print("=" * 70)
+        
+        try:
+            year = IntPrompt.ask("Tahun", default=datetime.now().year)
+            # Satu kali baca ke kolom bertipe, semua rekap di bawah dihitung dari memori
+            store = TransactionStore.load(year)
+            if not len(store):
+                console.print(f"[yellow]⚠️  Belum ada data transaksi tahun {year}[/yellow]")
+                input("\nTekan Enter untuk kembali...")
+                return
+            
+            table = Table(show_header=True, header_style="bold blue")
+            table.add_column("Bulan", width=10)
+            table.add_column("Jenis", width=12)
+            table.add_column("Jumlah Trx", justify="right")
+            table.add_column("Total", justify="right")
+            table.add_column("PPN", justify="right")
+            for row in store.sum_by(('month', 'type')):
+                table.add_row(
+                    row['month'],
+                    row['type'].title(),
+                    f"{row['count']:,}",
+                    f"Rp {row['total_amount']:,.0f}",
+                    f"Rp {row['total_ppn']:,.0f}"
+                )
+            console.print(table)
+            if store.undated_ids:
+                console.print(f"[yellow]⚠️  {len(store.undated_ids):,} transaksi tanpa tanggal valid "
+                              f"tidak ikut dihitung[/yellow]")
+            
+            for type_name in store.type_names:
+                console.print(f"\n[bold]5 {type_name.title()} Terbesar:[/bold]")
+                for item in store.top_n(5, type=type_name):
+                    console.print(f"  #{item['id']:<8} {item['transaction_date']}  Rp {item['amount']:,.0f}")
+                    
+        except Exception as e:
+            console.print(f"[bold red]❌ Error: {e}[/bold red]")
+        
+        input("\nTekan Enter untuk kembali...")
+    
     def view_tax_invoices(self):
         console.clear()
         console.print("[bold purple]📋 DAFTAR FAKTUR PAJAK[/bold purple]")
@@ -369,4 +415,57 @@ class TransactionMenu:
         
         console.print(table)
         console.print(f"\n[bold]Total Faktur Pajak: {len(tax_invoices)}[/bold]")
+        input("\nTekan Enter untuk kembali...")
+    
+    def validate_input_tax_credits(self):
+        console.clear()
+        console.print("[bold cyan]✅ VALIDASI KREDIT PPN MASUKAN[/bold cyan]")
+        console.print("=" * 70)
+        
+        issue_labels = {
+            'no_invoice': "Tanpa nomor faktur",
+            'malformed_invoice': "Format nomor faktur salah",
+            'duplicate_invoice': "Nomor faktur duplikat",
+            'out_of_period': "Faktur di luar periode",
+            'zero_ppn': "PPN nol"
+        }
+        
+        try:
+            year = IntPrompt.ask("Tahun", default=datetime.now().year)
+            month = IntPrompt.ask("Bulan (0 = setahun)", default=0)
+            if not 0 <= month <= 12:
+                console.print("[bold red]❌ Bulan tidak valid[/bold red]")
+                input("\nTekan Enter untuk kembali...")
+                return
+            
+            report = self.ppn_calculator.validate_period_credits(year, month or None)
+            if not report['checked']:
+                console.print(f"[yellow]⚠️  Belum ada transaksi belanja periode {report['period']}[/yellow]")
+                input("\nTekan Enter untuk kembali...")
+                return
+            
+            console.print(f"\n[bold]PERIODE {report['period']}[/bold]")
+            console.print("-" * 50)
+            console.print(f"Transaksi Belanja    : {report['checked']:,}")
+            console.print(f"Dapat Dikreditkan    : {report['eligible']:,} (Rp {report['eligible_ppn']:,.0f})")
+            console.print(f"Tidak Dapat Dikredit : {report['ineligible']:,} (Rp {report['ineligible_ppn']:,.0f})")
+            
+            table = Table(show_header=True, header_style="bold blue")
+            table.add_column("Masalah", width=28)
+            table.add_column("Jumlah", justify="right")
+            table.add_column("Contoh ID Transaksi")
+            for issue, count in report['issues'].items():
+                if count:
+                    sample = ', '.join(str(i) for i in report['issue_ids'][issue][:5])
+                    table.add_row(issue_labels[issue], f"{count:,}", sample)
+            console.print(table)
+            
+            if report['duplicates']:
+                console.print(f"\n[bold]Faktur Duplikat ({len(report['duplicates']):,}):[/bold]")
+                for invoice_number, ids in list(report['duplicates'].items())[:10]:
+                    console.print(f"  {invoice_number}: transaksi {', '.join(str(i) for i in ids)}")
+                    
+        except Exception as e:
+            console.print(f"[bold red]❌ Error: {e}[/bold red]")
+        
         input("\nTekan Enter untuk kembali...")
\ No newline at end of file
@@ -4,6 +4,7 @@ import os
 from datetime import datetime
 from typing import List, Dict
 from config.settings import AppSettings
+from config.database import db_manager
 
 class BackupManager:
     def __init__(self, db_path: str = "tax_manager.db"):
@@ -24,6 +25,8 @@ class BackupManager:
         backup_path = os.path.join(self.backup_dir, backup_name)
         
         try:
+            # Pindahkan isi file -wal ke database utama agar salinan lengkap
+            db_manager.checkpoint('TRUNCATE')
             shutil.copy2(self.db_path, backup_path)
             return backup_path
         except Exception as e:
@@ -37,7 +40,15 @@ class BackupManager:
             raise Exception("File backup tidak ditemukan")
         
         try:
+            # Tutup koneksi di pool agar tidak ada yang memegang file lama
+            db_manager.close_all()
+            # File -wal/-shm lama tidak boleh diterapkan ke database hasil restore
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(self.db_path + suffix):
+                    os.remove(self.db_path + suffix)
             shutil.copy2(backup_path, self.db_path)
+            # Backup lama bisa berskema versi sebelumnya: migrasikan sebelum pool dipakai lagi
+            db_manager.init_database()
             return True
         except Exception as e:
             raise Exception(f"Gagal restore backup: {e}")
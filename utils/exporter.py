@@ -1,10 +1,12 @@
 import csv
 import json
 from datetime import datetime
-from typing import List, Dict
+from itertools import chain
+from typing import Iterator, List, Dict
 from models.employee import Employee
 from models.transaction import Transaction
 from models.tax import TaxRecord
+from utils.money import from_cents
 import os
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
@@ -17,12 +19,20 @@ class ReportExporter:
         if not os.path.exists(self.export_dir):
             os.makedirs(self.export_dir)
     
+    def _require_rows(self, rows: Iterator, message: str) -> Iterator:
+        """Pastikan iterator tidak kosong tanpa memuat seluruh data ke memori"""
+        first = next(rows, None)
+        if first is None:
+            raise Exception(message)
+        return chain([first], rows)
+    
+    def _employee_names(self) -> Dict[int, str]:
+        """Peta id -> nama pegawai (satu query, bukan satu query per catatan pajak)"""
+        return {emp.id: emp.name for emp in Employee.iter_all()}
+    
     def export_employees_to_csv(self) -> str:
         """Ekspor data pegawai ke CSV"""
-        employees = Employee.get_all()
-        
-        if not employees:
-            raise Exception("Tidak ada data pegawai untuk diekspor")
+        employees = self._require_rows(Employee.iter_all(), "Tidak ada data pegawai untuk diekspor")
         
         # Buat nama file dengan timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -51,10 +61,7 @@ class ReportExporter:
     
     def export_employees_to_excel(self) -> str:
         """Ekspor data pegawai ke Excel"""
-        employees = Employee.get_all()
-        
-        if not employees:
-            raise Exception("Tidak ada data pegawai untuk diekspor")
+        employees = self._require_rows(Employee.iter_all(), "Tidak ada data pegawai untuk diekspor")
         
         # Buat nama file dengan timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -108,10 +115,7 @@ class ReportExporter:
     
     def export_transactions_to_csv(self) -> str:
         """Ekspor data transaksi ke CSV"""
-        transactions = Transaction.get_all()
-        
-        if not transactions:
-            raise Exception("Tidak ada data transaksi untuk diekspor")
+        transactions = self._require_rows(Transaction.iter_all(), "Tidak ada data transaksi untuk diekspor")
         
         # Buat nama file dengan timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -126,7 +130,7 @@ class ReportExporter:
             writer.writeheader()
             
             for trans in transactions:
-                total_amount = trans.amount + trans.ppn_amount
+                total_amount = from_cents(trans.amount_cents + trans.ppn_amount_cents)
                 writer.writerow({
                     'ID': trans.id,
                     'Jenis': trans.type,
@@ -143,10 +147,7 @@ class ReportExporter:
     
     def export_transactions_to_excel(self) -> str:
         """Ekspor data transaksi ke Excel"""
-        transactions = Transaction.get_all()
-        
-        if not transactions:
-            raise Exception("Tidak ada data transaksi untuk diekspor")
+        transactions = self._require_rows(Transaction.iter_all(), "Tidak ada data transaksi untuk diekspor")
         
         # Buat nama file dengan timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -172,7 +173,7 @@ class ReportExporter:
         
         # Data
         for trans in transactions:
-            total_amount = trans.amount + trans.ppn_amount
+            total_amount = from_cents(trans.amount_cents + trans.ppn_amount_cents)
             ws.append([
                 trans.id,
                 trans.type.title(),
@@ -203,10 +204,8 @@ class ReportExporter:
     
     def export_tax_records_to_csv(self) -> str:
         """Ekspor data catatan pajak ke CSV"""
-        tax_records = TaxRecord.get_all()
-        
-        if not tax_records:
-            raise Exception("Tidak ada data catatan pajak untuk diekspor")
+        tax_records = self._require_rows(TaxRecord.iter_all(), "Tidak ada data catatan pajak untuk diekspor")
+        employee_names = self._employee_names()
         
         # Buat nama file dengan timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -222,11 +221,7 @@ class ReportExporter:
             
             for record in tax_records:
                 # Dapatkan nama pegawai jika ada
-                employee_name = "-"
-                if record.employee_id:
-                    employee = Employee.get_by_id(record.employee_id)
-                    if employee:
-                        employee_name = employee.name
+                employee_name = employee_names.get(record.employee_id, "-")
                 
                 writer.writerow({
                     'ID': record.id,
@@ -244,10 +239,8 @@ class ReportExporter:
     
     def export_tax_records_to_excel(self) -> str:
         """Ekspor data catatan pajak ke Excel"""
-        tax_records = TaxRecord.get_all()
-        
-        if not tax_records:
-            raise Exception("Tidak ada data catatan pajak untuk diekspor")
+        tax_records = self._require_rows(TaxRecord.iter_all(), "Tidak ada data catatan pajak untuk diekspor")
+        employee_names = self._employee_names()
         
         # Buat nama file dengan timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -274,11 +267,7 @@ class ReportExporter:
         # Data
         for record in tax_records:
             # Dapatkan nama pegawai jika ada
-            employee_name = "-"
-            if record.employee_id:
-                employee = Employee.get_by_id(record.employee_id)
-                if employee:
-                    employee_name = employee.name
+            employee_name = employee_names.get(record.employee_id, "-")
             
             ws.append([
                 record.id,
@@ -383,8 +372,7 @@ class ReportExporter:
             cell.alignment = Alignment(horizontal="center")
         
         # Data pegawai
-        employees = Employee.get_all()
-        for emp in employees:
+        for emp in Employee.iter_all():
             ws2.append([
                 emp.id,
                 emp.name,
@@ -423,15 +411,14 @@ class ReportExporter:
             cell.alignment = Alignment(horizontal="center")
         
         # Data transaksi
-        transactions = Transaction.get_all()
-        for trans in transactions:
+        for trans in Transaction.iter_all():
             ws3.append([
                 trans.transaction_date,
                 trans.type.title(),
                 trans.description,
                 trans.amount,
                 trans.ppn_amount,
-                trans.amount + trans.ppn_amount,
+                from_cents(trans.amount_cents + trans.ppn_amount_cents),
                 trans.invoice_number or '-'
             ])
         
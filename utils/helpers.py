@@ -1,4 +1,6 @@
 from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
 import os
 
 def format_currency(amount: float) -> str:
@@ -17,6 +19,16 @@ def get_current_month() -> str:
     """Dapatkan bulan saat ini dalam format YYYY-MM"""
     return datetime.now().strftime("%Y-%m")
 
+def get_year_date_range(year: int) -> Tuple[str, str]:
+    """Rentang tanggal setengah terbuka [awal, akhir) untuk satu tahun (YYYY-MM-DD)"""
+    return f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+
+def get_month_date_range(year: int, month: int) -> Tuple[str, str]:
+    """Rentang tanggal setengah terbuka [awal, akhir) untuk satu bulan (YYYY-MM-DD)"""
+    if month == 12:
+        return f"{year:04d}-12-01", f"{year + 1:04d}-01-01"
+    return f"{year:04d}-{month:02d}-01", f"{year:04d}-{month + 1:02d}-01"
+
 def create_directory_if_not_exists(directory: str) -> None:
     """Buat direktori jika belum ada"""
     if not os.path.exists(directory):
@@ -37,4 +49,13 @@ def validate_date(date_str: str) -> bool:
         datetime.strptime(date_str, "%Y-%m-%d")
         return True
     except ValueError:
-        return False
\ No newline at end of file
+        return False
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    """Bagi iterable menjadi list berukuran maksimal `size`"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
\ No newline at end of file
@@ -0,0 +1,123 @@
+import csv
+import math
+from itertools import count
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from models.transaction import Transaction
+from services.ppn_calculator import PPNCalculator
+from utils.helpers import chunked, validate_date
+from utils.money import CENTS_PER_RUPIAH, to_cents, from_cents
+
+class TransactionImporter:
+    """
+    Impor transaksi massal dari CSV (mis. ekspor POS). Header mengikuti
+    ekspor transaksi: Tanggal dan Jumlah wajib, Jenis, Deskripsi dan
+    No_Faktur opsional. PPN dihitung per potongan baris sekaligus
+    (PPNCalculator.calculate_*_batch) lalu disimpan dalam satu transaksi database.
+    """
+    
+    TYPES = ('penjualan', 'belanja')
+    REQUIRED_COLUMNS = ('Tanggal', 'Jumlah')
+    OPTIONAL_COLUMNS = ('Jenis', 'Deskripsi', 'No_Faktur')
+    MAX_ERRORS = 20  # Jumlah baris bermasalah yang dicatat di ringkasan
+    MAX_AMOUNT_CENTS = 2 ** 62  # Batas INTEGER SQLite (2^63) dengan ruang untuk PPN
+    
+    def __init__(self, chunk_size: int = 10000):
+        self.chunk_size = chunk_size
+        self.ppn_calculator = PPNCalculator()
+    
+    def import_csv(self, path: str, type: str = 'penjualan', include_ppn: bool = False,
+                   delimiter: str = ',') -> Dict[str, Any]:
+        """
+        Impor file CSV. Jumlah adalah dasar pengenaan, atau total termasuk PPN
+        jika `include_ppn` (faktur masukan). Kolom Jenis, jika terisi, menimpa `type`.
+        Baris dengan jenis, tanggal atau jumlah tidak valid dilewati dan dicatat.
+        """
+        if type not in self.TYPES:
+            raise ValueError(f"Jenis transaksi tidak dikenal: {type}")
+        
+        summary = {'imported': 0, 'skipped': 0, 'total_amount_cents': 0, 'total_ppn_cents': 0, 'errors': []}
+        with open(path, newline='', encoding='utf-8-sig') as csvfile:
+            reader = csv.reader(csvfile, delimiter=delimiter)
+            header = next(reader, None)
+            if header is None:
+                raise ValueError("File CSV kosong")
+            columns = self._column_indexes(header)
+            rows = self._value_rows(reader, columns, len(header), type, include_ppn, summary)
+            summary['imported'] = len(Transaction.bulk_insert_values(rows, self.chunk_size))
+        
+        summary['total_amount'] = from_cents(summary['total_amount_cents'])
+        summary['total_ppn'] = from_cents(summary['total_ppn_cents'])
+        return summary
+    
+    def _column_indexes(self, header: List[str]) -> Dict[str, int]:
+        index = {name.strip(): i for i, name in enumerate(header)}
+        missing = [name for name in self.REQUIRED_COLUMNS if name not in index]
+        if missing:
+            raise ValueError(f"Kolom wajib tidak ada: {', '.join(missing)}")
+        return {name: index.get(name) for name in self.REQUIRED_COLUMNS + self.OPTIONAL_COLUMNS}
+    
+    def _value_rows(self, reader: Iterable[List[str]], columns: Dict[str, int], width: int,
+                    default_type: str, include_ppn: bool, summary: Dict[str, Any]) -> Iterator[tuple]:
+        """
+        Baris CSV -> tuple nilai Transaction.bulk_insert_values, per potongan.
+        Baris yang lebih pendek dari header dianggap berisi kolom kosong di akhir.
+        """
+        type_col = columns['Jenis']
+        description_col = columns['Deskripsi']
+        amount_col = columns['Jumlah']
+        date_col = columns['Tanggal']
+        invoice_col = columns['No_Faktur']
+        valid_dates = set()
+        errors = summary['errors']
+        
+        # Baris 1 adalah header
+        for chunk in chunked(zip(count(2), reader), self.chunk_size):
+            types, descriptions, amounts, dates, invoices = [], [], [], [], []
+            for line, fields in chunk:
+                if len(fields) < width:
+                    fields = fields + [''] * (width - len(fields))
+                try:
+                    trans_type = (fields[type_col].strip() if type_col is not None else '') or default_type
+                    if trans_type not in self.TYPES:
+                        raise ValueError(f"jenis tidak dikenal '{trans_type}'")
+                    transaction_date = fields[date_col].strip()
+                    if transaction_date not in valid_dates:
+                        # strptime, bukan date.fromisoformat: yang terakhir juga menerima
+                        # tanggal minggu ISO ('2024-W01-1') dan format tanpa pemisah
+                        if len(transaction_date) != 10 or not validate_date(transaction_date):
+                            raise ValueError(f"tanggal bukan YYYY-MM-DD '{transaction_date}'")
+                        valid_dates.add(transaction_date)
+                    amount_value = float(fields[amount_col])
+                    # float() menerima 'inf'/'nan', dan nilai sangat besar tidak muat di INTEGER SQLite
+                    if (not math.isfinite(amount_value)
+                            or abs(amount_value) * CENTS_PER_RUPIAH >= self.MAX_AMOUNT_CENTS):
+                        raise ValueError(f"jumlah di luar batas '{fields[amount_col]}'")
+                    amount = to_cents(amount_value)
+                    description = fields[description_col] if description_col is not None else ''
+                    invoice_number = (fields[invoice_col].strip() or None) if invoice_col is not None else None
+                except (ValueError, IndexError) as e:
+                    summary['skipped'] += 1
+                    if len(errors) < self.MAX_ERRORS:
+                        errors.append((line, str(e)))
+                    continue
+                
+                types.append(trans_type)
+                descriptions.append(description)
+                amounts.append(amount)
+                dates.append(transaction_date)
+                invoices.append(invoice_number)
+            
+            base_cents, ppn_cents = self._compute_ppn(dates, amounts, include_ppn)
+            summary['total_amount_cents'] += sum(base_cents)
+            summary['total_ppn_cents'] += sum(ppn_cents)
+            yield from zip(types, descriptions, map(from_cents, base_cents), map(from_cents, ppn_cents),
+                           base_cents, ppn_cents, dates, invoices)
+    
+    def _compute_ppn(self, dates: List[str], amounts: List[int],
+                     include_ppn: bool) -> Tuple[List[int], List[int]]:
+        """Dasar dan PPN (sen) per baris dengan tarif yang berlaku pada tanggal transaksi"""
+        if include_ppn:
+            result = self.ppn_calculator.calculate_base_batch(amounts, dates)
+        else:
+            result = self.ppn_calculator.calculate_ppn_batch(amounts, dates)
+        return result['base_cents'], result['ppn_cents']
\ No newline at end of file
@@ -0,0 +1,64 @@
+from fractions import Fraction
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+# Nilai uang disimpan sebagai bilangan bulat sen (1 rupiah = 100 sen)
+CENTS_PER_RUPIAH = 100
+
+def to_cents(amount: float) -> int:
+    """Konversi rupiah (float/int) ke sen, dibulatkan setengah menjauhi nol seperti ROUND() SQLite"""
+    if isinstance(amount, int):
+        return amount * CENTS_PER_RUPIAH
+    cents = amount * CENTS_PER_RUPIAH
+    if cents >= 0:
+        return int(cents + 0.5)
+    return -int(0.5 - cents)
+
+def from_cents(cents: int) -> float:
+    """Konversi sen ke rupiah (float terdekat, hanya untuk tampilan/kompatibilitas)"""
+    return cents / CENTS_PER_RUPIAH
+
+@lru_cache(maxsize=64)
+def rate_ratio(rate: float) -> Tuple[int, int]:
+    """Tarif desimal sebagai pecahan bulat (pembilang, penyebut), mis. 0.11 -> (11, 100)"""
+    ratio = Fraction(str(rate))
+    return ratio.numerator, ratio.denominator
+
+def apply_rate(cents: int, rate: float) -> int:
+    """Kalikan jumlah sen dengan tarif secara eksak, dibulatkan setengah menjauhi nol ke sen"""
+    numerator, denominator = rate_ratio(rate)
+    scaled = cents * numerator * 2
+    if scaled >= 0:
+        return (scaled + denominator) // (denominator * 2)
+    return -((denominator - scaled) // (denominator * 2))
+
+def apply_rate_many(amounts_cents: Iterable[int], rate: float) -> List[int]:
+    """apply_rate untuk banyak nilai sekaligus (pecahan tarif dihitung sekali)"""
+    numerator, denominator = rate_ratio(rate)
+    numerator *= 2
+    divisor = denominator * 2
+    return [(c * numerator + denominator) // divisor if c >= 0
+            else -((denominator - c * numerator) // divisor)
+            for c in amounts_cents]
+
+def divide_rate(total_cents: int, rate: float) -> int:
+    """Dasar pengenaan dari total termasuk pajak: total / (1 + tarif), dibulatkan ke sen"""
+    numerator, denominator = rate_ratio(rate)
+    if total_cents < 0:
+        return -divide_rate(-total_cents, rate)
+    divisor = denominator + numerator
+    return (total_cents * denominator * 2 + divisor) // (divisor * 2)
+
+def divide_rate_many(totals_cents: Iterable[int], rate: float) -> List[int]:
+    """divide_rate untuk banyak nilai sekaligus (pecahan tarif dihitung sekali)"""
+    numerator, denominator = rate_ratio(rate)
+    divisor = denominator + numerator
+    scale = denominator * 2
+    double_divisor = divisor * 2
+    return [(t * scale + divisor) // double_divisor if t >= 0
+            else -((divisor - t * scale) // double_divisor)
+            for t in totals_cents]
+
+def sum_cents(amounts: Iterable[float]) -> int:
+    """Jumlahkan nilai rupiah secara eksak dalam sen"""
+    return sum(to_cents(amount) for amount in amounts)
\ No newline at end of file
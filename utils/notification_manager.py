@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta
 from typing import List, Dict
-from models.transaction import Transaction
+from models.ppn_ledger import PPNLedger
 from models.tax import TaxRecord
 from config.settings import AppSettings
 
@@ -66,15 +66,11 @@ class NotificationManager:
         
         # Hitung total PPh 21 yang belum dibayar
         from models.employee import Employee
+        from services.pp21_calculator import PPh21Calculator
         employees = Employee.get_all()
-        total_pph21_withheld = 0
         
-        for employee in employees:
-            # Hitung PPh 21 untuk setiap pegawai (simplified)
-            from services.pp21_calculator import PPh21Calculator
-            calculator = PPh21Calculator(employee, 0, False)
-            result = calculator.calculate_with_npwp_discount()
-            total_pph21_withheld += result['final_tax']
+        # Hitung PPh 21 semua pegawai sekaligus (status PTKP dan metode dari profil pegawai)
+        total_pph21_withheld = sum(PPh21Calculator.calculate_batch(employees, method=None)['final_tax'])
         
         notifications.append({
             'type': 'Ringkasan Pajak',
@@ -82,11 +78,10 @@ class NotificationManager:
             'priority': 'info'
         })
         
-        # Hitung PPN terutang
-        transactions = Transaction.get_all()
-        ppn_masukan = sum(t.ppn_amount for t in transactions if t.type == "belanja")
-        ppn_keluaran = sum(t.ppn_amount for t in transactions if t.type == "penjualan")
-        ppn_terutang = ppn_keluaran - ppn_masukan
+        # Hitung PPN terutang dari ledger bulanan (satu baris per bulan/jenis, bukan per transaksi)
+        from services.ppn_calculator import PPNCalculator
+        totals = PPNLedger.aggregate(group_by=('type',))
+        ppn_terutang = PPNCalculator().summarize_ppn_aggregates(totals)['ppn_terutang']
         
         notifications.append({
             'type': 'Ringkasan Pajak',